@@ -0,0 +1,71 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Compare the per-instruction generation of riscv_rand_instr_stream.gen_instr with the batch
+# generation (--batch_gen_instr) for several instruction counts.
+# The per-instruction mode is only run up to --serial_max_cnt instructions.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_batch_gen_bench.py --target=rv32imc \
+#       --sizes=10000,100000,1000000 --disable_compressed_instr=1
+
+import sys
+import time
+import random
+import logging
+import argparse
+sys.path.append("pygen/")
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--sizes', help = 'instruction counts', default = "10000,100000,1000000")
+parse.add_argument('--serial_max_cnt', help = 'largest instruction count of the '
+                   'per-instruction mode', type = int, default = 10000)
+args, sys.argv[1:] = parse.parse_known_args()
+
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import *  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+from pygen_src.riscv_instr_stream import riscv_rand_instr_stream  # NOQA
+
+
+def gen_stream(instr_cnt, batch_gen_instr):
+    cfg.batch_gen_instr = batch_gen_instr
+    random.seed(1)
+    stream = riscv_rand_instr_stream()
+    stream.initialize_instr_list(instr_cnt)
+    start_time = time.time()
+    stream.gen_instr()
+    gen_time = time.time() - start_time
+    start_time = time.time()
+    instr_list = stream.instr_list
+    return gen_time, time.time() - start_time, len(instr_list)
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    riscv_instr.create_instr_list(cfg)
+    print("target: {}".format(cfg.argv.target))
+    for instr_cnt in [int(size) for size in args.sizes.split(",")]:
+        if instr_cnt <= args.serial_max_cnt:
+            gen_time, _, _ = gen_stream(instr_cnt, 0)
+            print("{:>8} instr, gen_instr:       {:8.2f}s".format(instr_cnt, gen_time))
+        gen_time, list_time, cnt = gen_stream(instr_cnt, 1)
+        print("{:>8} instr, batch_gen_instr: {:8.2f}s + {:.2f}s to create {} objects".format(
+              instr_cnt, gen_time, list_time, cnt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Compare the post process and the asm generation of a main instruction sequence stored as a
+# list of instruction records and stored in columns (--columnar_instr_list). The instruction
+# streams are generated with --batch_gen_instr, both modes must produce the same program.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_columnar_instr_bench.py --target=rv32imc --sizes=10000,100000
+
+import sys
+import time
+import random
+import logging
+import argparse
+sys.path.append("pygen/")
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--sizes', help = 'instruction counts', default = "10000,100000")
+args, sys.argv[1:] = parse.parse_known_args()
+
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import *  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+from pygen_src.riscv_instr_sequence import riscv_instr_sequence  # NOQA
+
+
+def gen_sequence(instr_cnt, columnar_instr_list):
+    cfg.columnar_instr_list = columnar_instr_list
+    random.seed(1)
+    seq = riscv_instr_sequence()
+    seq.instr_cnt = instr_cnt
+    seq.label_name = "main"
+    seq.gen_instr(is_main_program = 1)
+    result = {}
+    start_time = time.time()
+    seq.instr_stream.instr_list
+    result["create"] = time.time() - start_time
+    start_time = time.time()
+    seq.post_process_instr()
+    result["post_process_instr"] = time.time() - start_time
+    start_time = time.time()
+    seq.generate_instr_stream()
+    result["generate_instr_stream"] = time.time() - start_time
+    return result, seq.instr_string_list
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    riscv_instr.create_instr_list(cfg)
+    cfg.batch_gen_instr = 1
+    print("target: {}".format(cfg.argv.target))
+    for instr_cnt in [int(size) for size in args.sizes.split(",")]:
+        result = {}
+        program = {}
+        for columnar_instr_list in [0, 1]:
+            result[columnar_instr_list], program[columnar_instr_list] = gen_sequence(
+                instr_cnt, columnar_instr_list)
+        for step in result[0]:
+            print("{:>8} instr, {:<22} list: {:6.2f}s, columns: {:6.2f}s".format(
+                  instr_cnt, step, result[0][step], result[1][step]))
+        print("{:>8} instr, same program: {}".format(instr_cnt, program[0] == program[1]))
+
+
+if __name__ == "__main__":
+    main()
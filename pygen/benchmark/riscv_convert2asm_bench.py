@@ -0,0 +1,86 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Measure riscv_instr.convert2asm on random instruction records, and check the assembly
+# text against a golden file: the file is written by the first run (e.g. before a change of
+# the assembly templates) and compared by the next runs, the text must be the same byte for
+# byte.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_convert2asm_bench.py --target=rv32imc --instr_cnt=100000 \
+#       --golden_file=out/convert2asm_golden.txt
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+sys.path.append("pygen/")
+# --golden_file is removed from the command line options parsed by riscv_instr_gen_config
+parse = argparse.ArgumentParser()
+parse.add_argument('--golden_file', help = 'golden_file', default = "")
+args, sys.argv[1:] = parse.parse_known_args()
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import riscv_reg_t, riscv_fpr_t  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+
+
+# Random records of all the supported instructions with random operands, immediate strings
+# and comments
+def gen_instr_list(instr_cnt):
+    reg = list(riscv_reg_t)
+    fpr = list(riscv_fpr_t)
+    instr_list = []
+    for _ in range(instr_cnt):
+        instr = riscv_instr.get_rand_instr_record()
+        for field in instr.record_fields:
+            if field in ["rd", "rs1", "rs2", "rs3"]:
+                setattr(instr, field, random.choice(reg))
+            elif field in ["fd", "fs1", "fs2", "fs3"]:
+                setattr(instr, field, random.choice(fpr))
+        instr.imm_str = random.choice([str(random.randrange(-2048, 2048)), "1f", "Sub_1"])
+        instr.csr = random.randrange(4096)
+        instr.comment = random.choice(["", "Comment"])
+        instr_list.append(instr)
+    return instr_list
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    riscv_instr.create_instr_list(cfg)
+    instr_list = gen_instr_list(cfg.argv.instr_cnt)
+    start_time = time.time()
+    asm_list = [instr.convert2asm() for instr in instr_list]
+    convert_time = time.time() - start_time
+    print("convert2asm: {} instructions in {:.3f}s, {:.0f} instr/s".format(
+          len(asm_list), convert_time, len(asm_list) / convert_time))
+    if args.golden_file:
+        text = "\n".join(asm_list) + "\n"
+        if os.path.exists(args.golden_file):
+            with open(args.golden_file) as golden_file:
+                golden = golden_file.read()
+            print("same as golden file: {}".format(text == golden))
+            if text != golden:
+                sys.exit(1)
+        else:
+            with open(args.golden_file, "w") as golden_file:
+                golden_file.write(text)
+            print("golden file written: {}".format(args.golden_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Measure riscv_instr.convert2bin on a random instruction stream, and with --check_asm=1
+# compare the encoding of each instruction with the assembler: the assembly of the stream is
+# compiled with $RISCV_GCC and converted to a binary with $RISCV_OBJCOPY, as in run.py.
+# The branch and jump instructions are encoded but not compared, their targets are labels in
+# the generated programs.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_convert2bin_bench.py --target=rv32imc --instr_cnt=100000 \
+#       --check_asm=1 --isa=rv32imc --mabi=ilp32
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import subprocess
+sys.path.append("pygen/")
+sys.path.append("scripts/")
+# --check_asm, --isa and --mabi are removed from the command line options parsed by
+# riscv_instr_gen_config
+parse = argparse.ArgumentParser()
+parse.add_argument('--check_asm', help = 'compare with the assembler', choices = [0, 1],
+                   type = int, default = 0)
+parse.add_argument('--isa', help = 'ISA variant passed to GCC', default = "")
+parse.add_argument('--mabi', help = 'MABI variant passed to GCC', default = "")
+args, sys.argv[1:] = parse.parse_known_args()
+from importlib import import_module  # NOQA
+from lib import get_env_var  # NOQA
+from pygen_src.riscv_instr_pkg import pkg_ins, riscv_instr_category_t, riscv_instr_name_t  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+from pygen_src.riscv_instr_stream import riscv_rand_instr_stream  # NOQA
+
+
+# ISA and MABI of the target, e.g. rv32imc and ilp32
+def get_isa_mabi():
+    isa = args.isa
+    if isa == "":
+        extensions = "".join(sorted(set("".join(isa.name[4:].lower()
+                                                for isa in rcs.supported_isa)),
+                                    key = "imafdcb".find))
+        isa = "rv{}{}".format(rcs.XLEN, extensions)
+    mabi = args.mabi
+    if mabi == "":
+        mabi = "ilp32" if rcs.XLEN == 32 else "lp64"
+    return isa, mabi
+
+
+def is_checked(instr):
+    return (instr.category not in [riscv_instr_category_t.BRANCH,
+                                   riscv_instr_category_t.JUMP] and
+            instr.instr_name not in [riscv_instr_name_t.C_J, riscv_instr_name_t.C_JAL])
+
+
+# Encode the instructions with the assembler, one binary per instruction
+def assemble(instr_list):
+    isa, mabi = get_isa_mabi()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asm = os.path.join(tmp_dir, "convert2bin.S")
+        elf = os.path.join(tmp_dir, "convert2bin.o")
+        binary = os.path.join(tmp_dir, "convert2bin.bin")
+        with open(asm, "w") as asm_file:
+            asm_file.write(".option norelax\n")
+            for instr in instr_list:
+                # The other instructions must not be compressed by the assembler
+                asm_file.write(".option {}\n".format("rvc" if instr.get_instr_size() == 2
+                                                     else "norvc"))
+                asm_file.write("{}{}\n".format(pkg_ins.indent, instr.convert2asm()))
+        subprocess.run("{} -march={} -mabi={} -c {} -o {}".format(
+                       get_env_var("RISCV_GCC"), isa, mabi, asm, elf), shell = True, check = True)
+        subprocess.run("{} -O binary -j .text {} {}".format(
+                       get_env_var("RISCV_OBJCOPY"), elf, binary), shell = True, check = True)
+        with open(binary, "rb") as binary_file:
+            data = binary_file.read()
+    bin_list = []
+    offset = 0
+    for instr in instr_list:
+        size = instr.get_instr_size()
+        bin_list.append(int.from_bytes(data[offset:offset + size], "little"))
+        offset += size
+    return bin_list
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    cfg.batch_gen_instr = 1
+    riscv_instr.create_instr_list(cfg)
+    stream = riscv_rand_instr_stream()
+    stream.initialize_instr_list(cfg.argv.instr_cnt)
+    stream.gen_instr()
+    instr_list = list(stream.instr_list)
+    start_time = time.time()
+    bin_list = [instr.convert2bin() for instr in instr_list]
+    convert_time = time.time() - start_time
+    print("convert2bin: {} instructions in {:.3f}s, {:.0f} instr/s".format(
+          len(bin_list), convert_time, len(bin_list) / convert_time))
+    start_time = time.time()
+    data = b"".join([binary.to_bytes(instr.get_instr_size(), "little")
+                     for instr, binary in zip(instr_list, bin_list)])
+    print("binary image: {} bytes in {:.3f}s".format(len(data), time.time() - start_time))
+    if args.check_asm:
+        checked = [(instr, binary) for instr, binary in zip(instr_list, bin_list)
+                   if is_checked(instr)]
+        asm_bin_list = assemble([instr for instr, _ in checked])
+        mismatch = 0
+        for (instr, binary), asm_binary in zip(checked, asm_bin_list):
+            if binary != asm_binary:
+                mismatch += 1
+                print("mismatch: {:<40} convert2bin 0x{:08x} assembler 0x{:08x}".format(
+                      instr.convert2asm(), binary, asm_binary))
+        print("same as assembler: {} of {} instructions".format(
+              len(checked) - mismatch, len(checked)))
+        if mismatch:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Check that the data pages of riscv_data_page_gen are the ones of the byte by byte
+# generation, for memory regions of several sizes (including the regions of one byte) and
+# for each data pattern: the .word lines, the random state after the generation and the
+# memory image of the .incbin files.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_data_page_check.py --sizes=1,2,31,32,33,100,4096
+
+import os
+import sys
+import random
+import logging
+import argparse
+import tempfile
+sys.path.append("pygen/")
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--sizes', help = 'sizes of the memory regions',
+                   default = "1,2,3,4,5,31,32,33,100,4096")
+args, sys.argv[1:] = parse.parse_known_args()
+
+from pygen_src.riscv_instr_pkg import pkg_ins, data_pattern_t, mem_region_t  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg  # NOQA
+from pygen_src.riscv_data_page_gen import riscv_data_page_gen  # NOQA
+
+
+# .word lines of a region generated byte by byte, 32 bytes per line and size - 1 bytes for
+# the regions smaller than 32 bytes (at least one byte)
+def gen_reference_lines(pattern, size):
+    num_of_bytes = max(1, min(32, size - 1))
+    lines = []
+    for idx in range(0, size, 32):
+        data = []
+        for i in range(num_of_bytes):
+            if pattern == data_pattern_t.RAND_DATA:
+                data.append(random.randrange(0, (2**8) - 1))
+            elif pattern == data_pattern_t.INCR_VAL:
+                data.append((idx + i) % 256)
+            else:
+                data.append(0)
+        lines.append(pkg_ins.format_string(".word {}".format(pkg_ins.format_data(data)),
+                                           pkg_ins.LABEL_STR_LEN))
+    return lines
+
+
+# Memory content of .word lines, the values are truncated to words as by the assembler
+def get_lines_image(lines):
+    image = bytearray()
+    for line in lines:
+        for word in line.split(".word ")[1].split(", "):
+            image += (int(word, 16) & 0xffffffff).to_bytes(4, "little")
+    return bytes(image)
+
+
+def main():
+    logging.disable(logging.INFO)
+    cfg.use_push_data_section = 0
+    failed = 0
+    with tempfile.TemporaryDirectory() as out_dir:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            # The region is set as a Python list, the pyvsc lists of objects are not cleared
+            object.__setattr__(cfg, "mem_region", [mem_region_t(
+                name = "region_{}".format(size), size_in_bytes = size, xwr = 8)])
+            for pattern in data_pattern_t:
+                random.seed(size)
+                reference = gen_reference_lines(pattern, size)
+                reference_state = random.getstate()
+                page_gen = riscv_data_page_gen()
+                random.seed(size)
+                page_gen.gen_data_page(0, pattern)
+                lines = page_gen.data_page_str[2:]
+                state = random.getstate()
+                random.seed(size)
+                page_gen.gen_data_page(0, pattern, incbin_prefix = os.path.join(out_dir, "t"))
+                with open(page_gen.data_page_str[-1].split("\"")[1], "rb") as data_file:
+                    image = data_file.read()
+                mismatches = [name for name, result in [
+                    ("lines", lines == reference), ("random state", state == reference_state),
+                    ("incbin", image == get_lines_image(reference))] if not result]
+                failed += bool(mismatches)
+                print("size {:>5} {:<10}: {} lines, {}".format(
+                    size, pattern.name, len(lines),
+                    "mismatch: " + ", ".join(mismatches) if mismatches else "identical"))
+    if failed:
+        print("{} data pages different from the byte by byte generation".format(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
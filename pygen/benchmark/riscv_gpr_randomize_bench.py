@@ -0,0 +1,101 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Measure the random instruction throughput of riscv_rand_instr_stream with the
+# constraint solver based GPR randomization and with the direct GPR sampling, and the time
+# and the failures of the randomization of load/store hazard streams, whose mixed
+# instructions are randomized with the avail_regs and the reserved_rd of the stream. The
+# share of the GPR operands of the hazard streams which are in their avail_regs is reported.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_gpr_randomize_bench.py --target=rv32imc --instr_cnt=2000 \
+#       --num_of_tests=50
+
+import sys
+import time
+import random
+import logging
+sys.path.append("pygen/")
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import *  # NOQA
+from pygen_src.riscv_instr_pkg import riscv_reg_t  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+from pygen_src.riscv_instr_stream import riscv_rand_instr_stream  # NOQA
+from pygen_src.riscv_load_store_instr_lib import riscv_load_store_hazard_instr_stream  # NOQA
+
+
+def gen_stream(instr_cnt):
+    stream = riscv_rand_instr_stream()
+    stream.initialize_instr_list(instr_cnt)
+    stream.setup_allowed_instr(0, 0)
+    start_time = time.time()
+    stream.gen_instr()
+    return time.time() - start_time
+
+
+# Randomize stream_cnt load/store hazard streams, return the time, the failure count and the
+# number of GPR operands of the streams and of these operands in avail_regs
+def gen_hazard_streams(stream_cnt):
+    failed = 0
+    operand_cnt = 0
+    avail_cnt = 0
+    hazard_time = 0
+    for i in range(stream_cnt):
+        stream = riscv_load_store_hazard_instr_stream()
+        stream.label = "hazard_{}".format(i)
+        start_time = time.time()
+        try:
+            stream.randomize()
+        except SystemExit:
+            failed += 1
+            continue
+        finally:
+            hazard_time += time.time() - start_time
+        avail_regs = {riscv_reg_t(reg) for reg in stream.avail_regs}
+        for instr in stream.instr_list:
+            for operand in ["rs1", "rs2", "rd"]:
+                if getattr(instr, "has_" + operand):
+                    operand_cnt += 1
+                    avail_cnt += getattr(instr, operand) in avail_regs
+    return hazard_time, failed, operand_cnt, avail_cnt
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    riscv_instr.create_instr_list(cfg)
+    instr_cnt = cfg.argv.instr_cnt
+    result = {}
+    for fast_gpr_randomize in [0, 1]:
+        cfg.fast_gpr_randomize = fast_gpr_randomize
+        random.seed(1)
+        result[fast_gpr_randomize] = gen_stream(instr_cnt)
+        print("fast_gpr_randomize={}: {} instructions in {:.2f}s, {:.1f} instr/s".format(
+              fast_gpr_randomize, instr_cnt, result[fast_gpr_randomize],
+              instr_cnt / result[fast_gpr_randomize]))
+    print("speedup: {:.1f}x".format(result[0] / result[1]))
+    stream_cnt = cfg.argv.num_of_tests
+    for fast_gpr_randomize in [0, 1]:
+        cfg.fast_gpr_randomize = fast_gpr_randomize
+        random.seed(1)
+        hazard_time, failed, operand_cnt, avail_cnt = gen_hazard_streams(stream_cnt)
+        print("fast_gpr_randomize={}: {} load/store hazard streams in {:.2f}s, {} failed, "
+              "{:.0%} of the operands in avail_regs".format(
+                  fast_gpr_randomize, stream_cnt, hazard_time, failed,
+                  avail_cnt / max(operand_cnt, 1)))
+
+
+if __name__ == "__main__":
+    main()
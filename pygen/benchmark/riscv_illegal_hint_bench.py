@@ -0,0 +1,63 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Measure the injection of the illegal and HINT instructions in the instruction strings of a
+# program (riscv_instr_sequence.insert_illegal_hint_instr) with --illegal_instr_ratio and
+# --hint_instr_ratio. The strings inserted one by one with list.insert are compared with
+# riscv_instr_sequence.merge_instr_string, both must give the same program. The whole
+# insert_illegal_hint_instr is then timed, with the encodings drawn from the illegal
+# instruction encoding pools (riscv_illegal_instr_pool).
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_illegal_hint_bench.py --target=rv32imc --instr_cnt=100000 \
+#       --illegal_instr_ratio=100 --hint_instr_ratio=100
+
+import sys
+import time
+import random
+import logging
+sys.path.append("pygen/")
+from pygen_src.riscv_instr_pkg import pkg_ins  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg  # NOQA
+from pygen_src.riscv_instr_sequence import riscv_instr_sequence  # NOQA
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(1)
+    instr_cnt = cfg.argv.instr_cnt
+    seq = riscv_instr_sequence()
+    string_list = ["{}instr_{}".format(pkg_ins.indent, i) for i in range(instr_cnt)]
+    insert_list = []
+    for ratio, size in [(cfg.illegal_instr_ratio, 4), (cfg.hint_instr_ratio, 2)]:
+        for i in range(int(instr_cnt * ratio / 1000)):
+            insert_str = "{}.{}byte 0x{:x} # illegal_{}".format(pkg_ins.indent, size, i, i)
+            insert_list.append((random.randrange(0, instr_cnt + len(insert_list)), insert_str))
+    print("{} instructions, {} illegal/HINT instructions".format(instr_cnt, len(insert_list)))
+    start_time = time.time()
+    insert_result = list(string_list)
+    for idx, insert_str in insert_list:
+        insert_result.insert(idx, insert_str)
+    print("list.insert:        {:.3f}s".format(time.time() - start_time))
+    start_time = time.time()
+    merge_result = seq.merge_instr_string(string_list, insert_list)
+    print("merge_instr_string: {:.3f}s".format(time.time() - start_time))
+    print("same program: {}".format(insert_result == merge_result))
+    seq.instr_cnt = instr_cnt
+    seq.instr_string_list = list(string_list)
+    start_time = time.time()
+    seq.insert_illegal_hint_instr()
+    print("insert_illegal_hint_instr: {:.3f}s, {} instructions".format(
+          time.time() - start_time, len(seq.instr_string_list)))
+
+
+if __name__ == "__main__":
+    main()
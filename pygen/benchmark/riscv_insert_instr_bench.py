@@ -0,0 +1,85 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Measure the insertion of directed instruction streams in a long random instruction stream
+# with riscv_instr_stream.insert_instr_stream. The pending insertions are merged once when
+# instr_list is read; reading instr_list after each insertion gives the cost of rebuilding the
+# list for every directed stream. Both must give the same instruction list.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_insert_instr_bench.py --target=rv32imc \
+#       --instr_cnt=100000 --stream_cnt=64
+
+import sys
+import time
+import random
+import logging
+import argparse
+sys.path.append("pygen/")
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--stream_cnt', help = 'number of directed instruction streams',
+                   type = int, default = 64)
+parse.add_argument('--stream_len', help = 'instruction count of a directed instruction stream',
+                   type = int, default = 20)
+args, sys.argv[1:] = parse.parse_known_args()
+
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import *  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+from pygen_src.riscv_instr_stream import riscv_rand_instr_stream  # NOQA
+from pygen_src.riscv_directed_instr_lib import riscv_directed_instr_stream  # NOQA
+
+
+def insert_streams(instr_cnt, merge_each_insertion):
+    random.seed(1)
+    stream = riscv_rand_instr_stream()
+    stream.initialize_instr_list(instr_cnt)
+    stream.gen_instr()
+    stream.instr_list
+    directed_streams = []
+    for i in range(args.stream_cnt):
+        directed_stream = riscv_directed_instr_stream()
+        directed_stream.name = "directed_{}".format(i)
+        directed_stream.initialize_instr_list(args.stream_len)
+        directed_stream.gen_instr()
+        directed_stream.post_randomize()
+        directed_streams.append(directed_stream)
+    start_time = time.time()
+    for directed_stream in directed_streams:
+        stream.insert_instr_stream(directed_stream.instr_list)
+        if merge_each_insertion:
+            stream.instr_list
+    instr_list = stream.instr_list
+    return time.time() - start_time, [instr.comment for instr in instr_list]
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    riscv_instr.create_instr_list(cfg)
+    cfg.batch_gen_instr = 1
+    instr_cnt = cfg.argv.instr_cnt
+    each_time, each_list = insert_streams(instr_cnt, 1)
+    once_time, once_list = insert_streams(instr_cnt, 0)
+    print("{} directed streams of {} instructions in {} instructions".format(
+          args.stream_cnt, args.stream_len, instr_cnt))
+    print("merge after each insertion: {:.3f}s".format(each_time))
+    print("merge once:                 {:.3f}s".format(once_time))
+    print("same instruction list: {}".format(each_list == once_list))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Measure the memory used per random instruction with tracemalloc, for copies of the
+# instruction templates (riscv_instr.get_rand_instr) and for the lightweight instruction
+# records (riscv_instr.get_rand_instr_record).
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_instr_memory_bench.py --target=rv32imc --instr_cnt=500
+
+import sys
+import random
+import logging
+import tracemalloc
+sys.path.append("pygen/")
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import *  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+
+
+def measure(get_instr, instr_cnt):
+    random.seed(1)
+    instr_list = []
+    tracemalloc.start()
+    start_size = tracemalloc.get_traced_memory()[0]
+    for _ in range(instr_cnt):
+        instr_list.append(get_instr(include_instr = riscv_instr.basic_instr))
+    size = tracemalloc.get_traced_memory()[0] - start_size
+    tracemalloc.stop()
+    return size / instr_cnt
+
+
+def main():
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    riscv_instr.create_instr_list(cfg)
+    instr_cnt = cfg.argv.instr_cnt
+    copy_size = measure(riscv_instr.get_rand_instr, instr_cnt)
+    record_size = measure(riscv_instr.get_rand_instr_record, instr_cnt)
+    print("get_rand_instr:        {:.0f} bytes/instr".format(copy_size))
+    print("get_rand_instr_record: {:.0f} bytes/instr".format(record_size))
+    print("reduction: {:.1f}x".format(copy_size / record_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Check that the memoized boilerplate sections of riscv_asm_program_gen (see
+# riscv_section_cache) are the same as the sections generated from scratch, for the
+# configurations randomized with a sample of seeds. The sections are generated without the
+# cache, then from the memory cache (miss and hit) and from the cache directory (disk hit).
+# The sections of programs with page tables are also generated, the trap handlers reading
+# them are not cached and the programs add no entries to the cache.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_section_cache_check.py --target=multi_harts \
+#       --seeds=0,1,2,3,4,5,6,7 --enable_nested_interrupt=1
+
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+sys.path.append("pygen/")
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--seeds', help = 'seeds of the configurations', default = "0,1,2,3,4,5,6,7")
+args, sys.argv[1:] = parse.parse_known_args()
+
+from pygen_src.riscv_instr_pkg import *  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+from pygen_src.riscv_asm_program_gen import riscv_asm_program_gen  # NOQA
+
+
+# Lines of the boilerplate sections of all the harts, and the generation time
+def gen_sections(memoize_sections, page_table_list = []):
+    cfg.memoize_sections = memoize_sections
+    program = riscv_asm_program_gen()
+    program.page_table_list = page_table_list
+    start_time = time.time()
+    program.gen_program_header()
+    for hart in range(cfg.num_of_harts):
+        program.trap_vector_init(hart)
+        program.gen_all_trap_handler(hart)
+        for mode in rcs.supported_privileged_mode:
+            program.gen_interrupt_handler_section(mode, hart)
+        program.gen_stack_section(hart)
+        program.gen_kernel_stack_section(hart)
+    return program.instr_stream, time.time() - start_time
+
+
+def main():
+    logging.disable(logging.INFO)
+    section_cache = riscv_asm_program_gen.section_cache
+    failed = 0
+    print("target: {}".format(cfg.argv.target))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cfg.section_cache = cache_dir
+        for seed in [int(seed) for seed in args.seeds.split(",")]:
+            random.seed(seed)
+            cfg.randomize()
+            fresh, fresh_time = gen_sections(0)
+            section_cache.stats.clear()
+            miss, _ = gen_sections(1)
+            hit, hit_time = gen_sections(1)
+            # The entries of the configuration are read back from the cache directory
+            section_cache.entries.clear()
+            disk_hit, _ = gen_sections(1)
+            results = [("miss", miss), ("hit", hit), ("disk hit", disk_hit)]
+            mismatches = [name for name, lines in results if lines != fresh]
+            # The page table objects are not part of the keys, the sections of the programs with
+            # other page tables add no entries
+            page_table_fresh, _ = gen_sections(0, [object()])
+            page_table, _ = gen_sections(1, [object()])
+            entry_cnt = len(section_cache.entries)
+            page_table_hit, _ = gen_sections(1, [object()])
+            if (page_table != page_table_fresh or page_table_hit != page_table_fresh or
+                    len(section_cache.entries) != entry_cnt):
+                mismatches.append("page tables")
+            failed += bool(mismatches)
+            print("seed {:>4}: {} lines, {}, fresh {:.2f}ms, hit {:.2f}ms, "
+                  "lookups {}".format(seed, len(fresh),
+                                      "mismatch: " + ", ".join(mismatches) if mismatches
+                                      else "identical", fresh_time * 1e3, hit_time * 1e3,
+                                      dict(section_cache.stats)))
+    if failed:
+        print("{} configurations with different cached sections".format(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
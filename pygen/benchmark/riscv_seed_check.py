@@ -0,0 +1,84 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Check that the tests generated with a seed (--seed, see riscv_seed) are the same for any
+# number of workers: the tests are generated with each worker count, used for the test
+# workers (--num_of_workers) and the hart workers (--hart_workers), and the generated files
+# are compared with the ones of the first worker count. The check is run for each flow of
+# --flows, the default flow and the CSR flows which change the state kept by the workers
+# between their tests. The other options are passed to the generator, e.g.
+# --main_program_segments=8 or --main_program_window=500.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_seed_check.py --target=multi_harts --workers=1,4,16 \
+#       --num_of_tests=16 --instr_cnt=2000
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--workers', help = 'worker counts', default = "1,4,16")
+parse.add_argument('--seed', help = 'seed of the tests', type = int, default = 1)
+parse.add_argument('--flows', help = 'generator options of each flow, separated by ";"',
+                   default = ";--enable_illegal_csr_instruction=1;"
+                             "--enable_access_invalid_csr_level=1")
+args, sys.argv[1:] = parse.parse_known_args()
+
+
+# Contents of the files generated by the tests with the given worker count
+def gen_tests(out_dir, workers, flow):
+    for file_name in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, file_name))
+    start_time = time.time()
+    subprocess.run([sys.executable, "pygen/pygen_src/test/riscv_instr_base_test.py",
+                    "--seed={}".format(args.seed), "--num_of_workers={}".format(workers),
+                    "--hart_workers={}".format(workers),
+                    "--asm_file_name={}".format(os.path.join(out_dir, "riscv_seed_check")),
+                    "--log_file_name={}".format(os.path.join(out_dir, "..", "generator.log"))] +
+                   flow.split() + sys.argv[1:], stdout = subprocess.DEVNULL, check = True)
+    files = {}
+    for file_name in sorted(os.listdir(out_dir)):
+        with open(os.path.join(out_dir, file_name), "rb") as file:
+            files[file_name] = file.read()
+    return files, time.time() - start_time
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The tests are generated in the same directory, the paths of the data page binaries
+        # are the same for all the worker counts
+        out_dir = os.path.join(tmp_dir, "out")
+        os.mkdir(out_dir)
+        for flow in args.flows.split(";"):
+            print("flow: {}".format(flow or "default"))
+            reference = None
+            for workers in [int(workers) for workers in args.workers.split(",")]:
+                files, gen_time = gen_tests(out_dir, workers, flow)
+                if reference is None:
+                    reference = files
+                mismatches = sorted(set(files) ^ set(reference) |
+                                    {name for name in files if files[name] != reference.get(name)})
+                failed += bool(mismatches)
+                print("  workers {:>3}: {} files, {}, {:.1f}s".format(
+                    workers, len(files), "mismatch: " + ", ".join(mismatches) if mismatches
+                    else "identical", gen_time))
+    if failed:
+        print("{} worker counts with different tests".format(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
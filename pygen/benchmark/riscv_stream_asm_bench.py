@@ -0,0 +1,87 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Peak RSS and wall time of the generation of one program of several main program instruction
+# counts, with the lines of the main program kept in memory and with the streaming emission
+# (--stream_asm). Each program is generated in its own process, the other options are passed
+# to the generator, e.g. --main_program_window=10000 to generate the main program by windows
+# or --main_program_segments=32 to generate it in 32 parallel processes.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_stream_asm_bench.py --target=rv32imc \
+#       --sizes=1000000,5000000 --batch_gen_instr=1 --columnar_instr_list=1
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import subprocess
+import tempfile
+sys.path.append("pygen/")
+
+parse = argparse.ArgumentParser()
+parse.add_argument('--sizes', help = 'main program instruction counts',
+                   default = "1000000,5000000")
+parse.add_argument('--size', help = 'instruction count of the generator process', type = int,
+                   default = 0)
+args, sys.argv[1:] = parse.parse_known_args()
+
+
+# Generate one program in this process, print the generation time and the peak RSS
+def gen_program(instr_cnt):
+    from importlib import import_module
+    from pygen_src.riscv_instr_pkg import riscv_instr_pkg  # NOQA
+    from pygen_src.riscv_instr_gen_config import cfg, rcs
+    for isa in rcs.supported_isa:
+        import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+    from pygen_src.isa.riscv_instr import riscv_instr
+    from pygen_src.riscv_asm_program_gen import riscv_asm_program_gen
+    logging.disable(logging.INFO)
+    random.seed(0)
+    cfg.randomize()
+    cfg.main_program_instr_cnt = instr_cnt
+    riscv_instr.create_instr_list(cfg)
+    start_time = time.time()
+    asm = riscv_asm_program_gen()
+    asm.test_name = cfg.argv.asm_file_name
+    asm.gen_program()
+    asm.gen_test_file(asm.test_name)
+    print(json.dumps({"time": time.time() - start_time,
+                      "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def main():
+    if args.size:
+        gen_program(args.size)
+        return
+    print("{:>10} {:>10} {:>10} {:>10} {:>8}".format(
+        "instr", "stream_asm", "time (s)", "peak RSS", "size"))
+    with tempfile.TemporaryDirectory() as out_dir:
+        asm_file_name = os.path.join(out_dir, "stream_asm_bench.S")
+        for instr_cnt in [int(size) for size in args.sizes.split(",")]:
+            for stream_asm in [0, 1]:
+                process = subprocess.run([sys.executable, __file__, "--size={}".format(instr_cnt),
+                                          "--stream_asm={}".format(stream_asm),
+                                          "--asm_file_name={}".format(asm_file_name)] +
+                                         sys.argv[1:], stdout = subprocess.PIPE,
+                                         universal_newlines = True, check = True)
+                result = json.loads(process.stdout.splitlines()[-1])
+                print("{:>10} {:>10} {:>10.1f} {:>7.0f}MB {:>6.0f}MB".format(
+                    instr_cnt, stream_asm, result["time"], result["rss"] / 1024,
+                    os.path.getsize(asm_file_name) / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
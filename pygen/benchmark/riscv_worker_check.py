@@ -0,0 +1,89 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# Check the worker processes of the hart sections (--hart_workers) and of the main program
+# segments (--main_program_segments) when the generator runs as a library (riscv_gen_context):
+# the exit status of another child of the process is left to its owner, and a failing segment
+# terminates the other segments of the main program instead of waiting for them.
+# Usage (from the repository root):
+#   python3 pygen/benchmark/riscv_worker_check.py
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import subprocess
+sys.path.append("pygen/")
+# The test module generates the tests of the global configuration when it's imported
+sys.argv[1:] = ["--num_of_tests=0"]
+
+from pygen_src.riscv_gen_context import riscv_gen_context  # NOQA
+from pygen_src.riscv_asm_program_gen import riscv_asm_program_gen  # NOQA
+
+
+def gen_test(out_dir, options):
+    context = riscv_gen_context(["--target=multi_harts", "--num_of_tests=1",
+                                 "--num_of_workers=1", "--instr_cnt=2000", "--seed=1",
+                                 "--asm_file_name={}".format(os.path.join(out_dir, "t")),
+                                 "--log_file_name={}".format(os.path.join(out_dir, "log"))] +
+                                options)
+    try:
+        context.gen_tests()
+    except SystemExit as exit_status:
+        return exit_status.code or 0
+    return 0
+
+
+# Another child of the process exits while the harts and the segments are generated
+def check_other_child(out_dir):
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.2); exit(3)"])
+    status = gen_test(out_dir, ["--hart_workers=2", "--main_program_segments=4"])
+    returncode = child.wait()
+    print("other child: test status {}, child exit status {} (expected 3)".format(
+        status, returncode))
+    return status == 0 and returncode == 3
+
+
+# The first segment fails, the other ones would run for segment_time seconds
+def check_failed_segment(out_dir, segment_time = 30):
+    gen_main_program_segment = riscv_asm_program_gen.gen_main_program_segment
+
+    def failing_segment(self, hart, k, *args):
+        if k == 0:
+            raise RuntimeError("failing segment")
+        time.sleep(segment_time)
+        gen_main_program_segment(self, hart, k, *args)
+
+    riscv_asm_program_gen.gen_main_program_segment = failing_segment
+    start_time = time.time()
+    try:
+        status = gen_test(out_dir, ["--main_program_segments=4"])
+    finally:
+        riscv_asm_program_gen.gen_main_program_segment = gen_main_program_segment
+    gen_time = time.time() - start_time
+    print("failed segment: test status {}, {:.1f}s (the other segments take {}s)".format(
+        status, gen_time, segment_time))
+    return status != 0 and gen_time < segment_time
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as out_dir:
+        results = [check_other_child(out_dir), check_failed_segment(out_dir)]
+    if not all(results):
+        print("{} worker checks failed".format(results.count(False)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,8 @@ from pygen_src.riscv_instr_pkg import pkg_ins, riscv_instr_name_t, riscv_instr_g
 
 @vsc.randobj
 class riscv_amo_instr(riscv_instr):
+    record_fields = riscv_instr.record_fields + ("aq", "rl")
+
     def __init__(self):
         super().__init__()
         self.aq = vsc.rand_bit_t(1)
@@ -29,6 +31,9 @@ class riscv_amo_instr(riscv_instr):
     def aq_rl_c(self):
         self.aq & self.rl == 0
 
+    def has_extra_constraint(self):
+        return 1
+
     def get_instr_name(self):
         get_instr_name = self.instr_name.name
         if self.group == riscv_instr_group_t.RV32A:
@@ -53,19 +58,20 @@ class riscv_amo_instr(riscv_instr):
             sys.exit(1)
         return get_instr_name
 
-    # Convert the instruction to assembly code
-    def convert2asm(self, prefix = ""):
+    # The instruction name depends on the aq and rl bits
+    def get_asm_template_key(self):
+        return (self.instr_name, self.aq, self.rl)
+
+    # Assembly format of the instruction, see riscv_instr.get_asm_format
+    def get_asm_format(self):
         asm_str = pkg_ins.format_string(self.get_instr_name(), pkg_ins.MAX_INSTR_STR_LEN)
         if self.group in [riscv_instr_group_t.RV32A, riscv_instr_group_t.RV64A]:
             if self.instr_name in [riscv_instr_name_t.LR_W, riscv_instr_name_t.LR_D]:
-                asm_str = "{} {}, ({})".format(asm_str, self.rd.name, self.rs1.name)
+                asm_str = asm_str + " {rd}, ({rs1})"
             else:
-                asm_str = "{} {}, {}, ({})".format(asm_str, self.rd.name, self.rs2.name,
-                                                   self.rs1.name)
+                asm_str = asm_str + " {rd}, {rs2}, ({rs1})"
         else:
             logging.critical("Unexpected amo instr group: {} / {}"
                              .format(self.group.name, self.instr_name.name))
             sys.exit(1)
-        if self.comment != "":
-            asm_str = "{} #{}".format(asm_str, self.comment)
-        return asm_str.lower()
+        return asm_str, 1
@@ -0,0 +1,71 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+from string import Formatter
+from operator import attrgetter
+from pygen_src.riscv_instr_pkg import riscv_reg_t, riscv_fpr_t
+
+# Lowercase register names
+reg_name = {reg: reg.name.lower() for reg in riscv_reg_t}
+fpr_name = {fpr: fpr.name.lower() for fpr in riscv_fpr_t}
+
+# Operand fields of the assembly formats: instruction attribute and conversion to text
+operand_field = {
+    "rd": ("rd", reg_name.__getitem__),
+    "rs1": ("rs1", reg_name.__getitem__),
+    "rs2": ("rs2", reg_name.__getitem__),
+    "rs3": ("rs3", reg_name.__getitem__),
+    "fd": ("fd", fpr_name.__getitem__),
+    "fs1": ("fs1", fpr_name.__getitem__),
+    "fs2": ("fs2", fpr_name.__getitem__),
+    "fs3": ("fs3", fpr_name.__getitem__),
+    "imm": ("imm_str", str.lower),
+    "csr": ("csr", "{}".format)
+}
+
+
+# Precompiled assembly template of an instruction, created once per opcode from the format
+# returned by riscv_instr.get_asm_format, e.g. "add       {rd}, {rs1}, {rs2}".
+# The text of the format is lowercased once, the operands are converted to lowercase text,
+# so the assembly string is the same as the lowercased string of the original convert2asm.
+# has_comment tells whether the comment of the instruction is appended.
+class riscv_asm_template:
+    def __init__(self, asm_format, has_comment = 1):
+        text = []
+        attrs = []
+        self.convert_operand = []
+        for literal, field, _, _ in Formatter().parse(asm_format):
+            text.append(literal.lower().replace("{", "{{").replace("}", "}}"))
+            if field is not None:
+                attr, convert_operand = operand_field[field]
+                attrs.append(attr)
+                self.convert_operand.append(convert_operand)
+                text.append("{}")
+        self.text = "".join(text)
+        self.has_comment = has_comment
+        self.size = len(attrs)
+        self.attrs = tuple(attrs)
+        self.get_operands = attrgetter(*attrs) if attrs else None
+
+    def convert(self, instr):
+        if self.size == 0:
+            asm_str = self.text.format()
+        elif self.size == 1:
+            asm_str = self.text.format(self.convert_operand[0](self.get_operands(instr)))
+        else:
+            asm_str = self.text.format(*[convert_operand(operand) for convert_operand, operand
+                                         in zip(self.convert_operand, self.get_operands(instr))])
+        if self.has_comment:
+            comment = instr.comment
+            if comment != "":
+                asm_str = asm_str + " #" + comment.lower()
+        return asm_str
@@ -17,6 +17,7 @@ import logging
 import vsc
 from importlib import import_module
 from pygen_src.isa.riscv_instr import riscv_instr
+from pygen_src.isa.riscv_instr_encoding import riscv_instr_encoding
 from pygen_src.riscv_instr_pkg import (pkg_ins, riscv_instr_category_t, riscv_reg_t,
                                        riscv_instr_name_t, riscv_instr_group_t,
                                        riscv_instr_format_t)
@@ -26,6 +27,8 @@ rcs = import_module("pygen_src.target." + cfg.argv.target + ".riscv_core_setting
 
 @vsc.randobj
 class riscv_b_instr(riscv_instr):
+    record_fields = riscv_instr.record_fields + ("rs3",)
+
     def __init__(self):
         super().__init__()
         self.rs3 = vsc.rand_enum_t(riscv_reg_t)
@@ -58,6 +61,9 @@ class riscv_b_instr(riscv_instr):
         with vsc.raw_mode():
             self.rs3.rand_mode = bool(self.has_rs3)
 
+    def has_extra_constraint(self):
+        return 1
+
     def set_imm_len(self):
         if self.format == riscv_instr_format_t.I_FORMAT:
             if self.category in [riscv_instr_category_t.SHIFT, riscv_instr_category_t.LOGICAL]:
@@ -74,51 +80,34 @@ class riscv_b_instr(riscv_instr):
                 self.imm_len = 12
         self.imm_mask = self.imm_mask << self.imm_len
 
-    # Convert the instruction to assembly code
-    def convert2asm(self, prefix = " "):
+    # Assembly format of the instruction, see riscv_instr.get_asm_format
+    def get_asm_format(self):
         asm_str_final = ""
         asm_str = ""
         asm_str = pkg_ins.format_string(self.get_instr_name(), pkg_ins.MAX_INSTR_STR_LEN)
         if self.format == riscv_instr_format_t.I_FORMAT:
             if self.instr_name in [riscv_instr_name_t.FSRI,
                                    riscv_instr_name_t.FSRIW]:  # instr rd, rs1, rs3, imm
-                asm_str_final = "{}{}, {}, {}, {}".format(asm_str, self.rd.name, self.rs1.name,
-                                                          self.rs3.name, self.get_imm())
+                asm_str_final = asm_str + "{rd}, {rs1}, {rs3}, {imm}"
         elif self.format == riscv_instr_format_t.R_FORMAT:   # instr rd, rs1
             if not self.has_rs2:
-                asm_str_final = "{}{}, {}".format(asm_str, self.rd.name, self.rs1.name)
+                asm_str_final = asm_str + "{rd}, {rs1}"
 
         elif self.format == riscv_instr_format_t.R4_FORMAT:  # instr rd, rs1, rs2, rs3
-            asm_str_final = "{}{}, {}, {}, {}".format(asm_str, self.rd.name, self.rs1.name,
-                                                      self.rs2.name, self.rs3.name)
+            asm_str_final = asm_str + "{rd}, {rs1}, {rs2}, {rs3}"
         else:
             logging.info("Unsupported format {}".format(self.format))
         if asm_str_final == "":
-            return super().convert2asm(prefix)
-
-        if self.comment != "":
-            asm_str_final = asm_str_final + " #" + self.comment
-        return asm_str_final.lower()
-
-    def get_opcode(self):
-        # TODO
-        pass
-
-    def get_func3(self):
-        # TODO
-        pass
+            return riscv_instr.get_asm_format(self)
+        return asm_str_final, 1
 
+    # The opcode, func3 and binary encoding are inherited from riscv_instr, func5 and func2
+    # are the fields [31:27] and [26:25] of the R4 and shift instructions
     def get_func5(self):
-        # TODO
-        pass
+        return (riscv_instr_encoding.get(self.instr_name).match >> 27) & 0x1f
 
     def get_func2(self):
-        # TODO
-        pass
-
-    # Convert the instruction to assembly code
-    def convert2bin(self, prefix):
-        pass
+        return (riscv_instr_encoding.get(self.instr_name).match >> 25) & 0x3
 
     def is_supported(self, cfg):
         return (cfg.enable_b_extension and
@@ -14,6 +14,7 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 import logging
 import vsc
 from pygen_src.isa.riscv_instr import riscv_instr
+from pygen_src.isa.riscv_instr_encoding import riscv_instr_encoding
 from pygen_src.riscv_instr_pkg import (riscv_instr_name_t, riscv_instr_format_t,
                                        riscv_instr_category_t, riscv_reg_t, imm_t, pkg_ins)
 
@@ -98,6 +99,52 @@ class riscv_compressed_instr(riscv_instr):
         with vsc.if_then(self.instr_name == riscv_instr_name_t.C_LUI):
             self.rd != riscv_reg_t.SP
 
+    # Registers which satisfy rvc_csr_c and no_hint_illegal_instr_c among the registers of pool
+    def get_gpr_pool(self, operand, pool):
+        if self.format in [riscv_instr_format_t.CIW_FORMAT, riscv_instr_format_t.CL_FORMAT,
+                           riscv_instr_format_t.CS_FORMAT, riscv_instr_format_t.CB_FORMAT,
+                           riscv_instr_format_t.CA_FORMAT]:
+            pool = [reg for reg in pool if reg in [riscv_reg_t.S0, riscv_reg_t.S1,
+                                                   riscv_reg_t.A0, riscv_reg_t.A1,
+                                                   riscv_reg_t.A2, riscv_reg_t.A3,
+                                                   riscv_reg_t.A4, riscv_reg_t.A5]]
+        if operand == "rd":
+            if self.instr_name == riscv_instr_name_t.C_ADDI16SP:
+                pool = [reg for reg in pool if reg == riscv_reg_t.SP]
+            if self.instr_name in [riscv_instr_name_t.C_ADDI, riscv_instr_name_t.C_ADDIW,
+                                   riscv_instr_name_t.C_LI, riscv_instr_name_t.C_LUI,
+                                   riscv_instr_name_t.C_SLLI, riscv_instr_name_t.C_SLLI64,
+                                   riscv_instr_name_t.C_LQSP, riscv_instr_name_t.C_LDSP,
+                                   riscv_instr_name_t.C_MV, riscv_instr_name_t.C_ADD,
+                                   riscv_instr_name_t.C_LWSP]:
+                pool = [reg for reg in pool if reg != riscv_reg_t.ZERO]
+            if self.instr_name == riscv_instr_name_t.C_LUI:
+                pool = [reg for reg in pool if reg != riscv_reg_t.SP]
+        elif operand == "rs1":
+            if self.instr_name in [riscv_instr_name_t.C_JR, riscv_instr_name_t.C_JALR]:
+                pool = [reg for reg in pool if reg != riscv_reg_t.ZERO]
+        elif operand == "rs2":
+            if self.instr_name in [riscv_instr_name_t.C_JR, riscv_instr_name_t.C_JALR]:
+                pool = [riscv_reg_t.ZERO]
+            if self.instr_name in [riscv_instr_name_t.C_ADD, riscv_instr_name_t.C_MV]:
+                pool = [reg for reg in pool if reg != riscv_reg_t.ZERO]
+        return pool
+
+    # imm_val_c
+    def get_imm_rand_mask(self):
+        if self.imm_type in [imm_t.NZIMM, imm_t.NZUIMM]:
+            if self.instr_name in [riscv_instr_name_t.C_LUI, riscv_instr_name_t.C_SRAI,
+                                   riscv_instr_name_t.C_SRLI, riscv_instr_name_t.C_SLLI]:
+                return 0x1f
+            if self.instr_name == riscv_instr_name_t.C_ADDI4SPN:
+                return 0xfffffffc
+        return 0xffffffff
+
+    def get_imm_nonzero_mask(self):
+        if self.imm_type in [imm_t.NZIMM, imm_t.NZUIMM]:
+            return 0x3f
+        return 0
+
     def set_imm_len(self):
         if self.format in [riscv_instr_format_t.CI_FORMAT, riscv_instr_format_t.CSS_FORMAT]:
             self.imm_len = 6
@@ -131,8 +178,8 @@ class riscv_compressed_instr(riscv_instr):
 
     def extend_imm(self):
         if self.instr_name != riscv_instr_name_t.C_LUI:
-            super().extend_imm()
-            self.imm = self.imm << self.imm_align
+            riscv_instr.extend_imm(self)
+            self.imm = (self.imm << self.imm_align) & self.shift_t
 
     def set_rand_mode(self):
         if self.format in [riscv_instr_format_t.CR_FORMAT]:
@@ -163,7 +210,7 @@ class riscv_compressed_instr(riscv_instr):
                 self.has_rd = 0
             self.has_rs2 = 0
 
-    def convert2asm(self, prefix=""):
+    def get_asm_format(self):
         asm_str = pkg_ins.format_string(string=self.get_instr_name(),
                                         length=pkg_ins.MAX_INSTR_STR_LEN)
         if self.category != riscv_instr_category_t.SYSTEM:
@@ -171,39 +218,37 @@ class riscv_compressed_instr(riscv_instr):
                 if self.instr_name is riscv_instr_name_t.C_NOP:
                     asm_str = "c.nop"
                 elif self.instr_name is riscv_instr_name_t.C_ADDI16SP:
-                    asm_str = "{} sp, {}".format(asm_str, self.get_imm())
+                    asm_str = asm_str + " sp, {imm}"
                 elif self.instr_name is riscv_instr_name_t.C_ADDI4SPN:
-                    asm_str = "{} {}, sp, {}".format(asm_str, self.rd.name, self.get_imm())
+                    asm_str = asm_str + " {rd}, sp, {imm}"
                 elif self.instr_name in [riscv_instr_name_t.C_LDSP, riscv_instr_name_t.C_LWSP,
                                          riscv_instr_name_t.C_LQSP]:
-                    asm_str = "{} {}, {}(sp)".format(asm_str, self.rd.name, self.get_imm())
+                    asm_str = asm_str + " {rd}, {imm}(sp)"
                 else:
-                    asm_str = "{} {}, {}".format(asm_str, self.rd.name, self.get_imm())
+                    asm_str = asm_str + " {rd}, {imm}"
             elif self.format is riscv_instr_format_t.CL_FORMAT:
-                asm_str = "{} {}, {}({})".format(
-                    asm_str, self.rd.name, self.get_imm(), self.rs1.name)
+                asm_str = asm_str + " {rd}, {imm}({rs1})"
             elif self.format is riscv_instr_format_t.CS_FORMAT:
                 if self.category is riscv_instr_category_t.STORE:
-                    asm_str = "{} {}, {}({})".format(
-                        asm_str, self.rs2.name, self.get_imm(), self.rs1.name)
+                    asm_str = asm_str + " {rs2}, {imm}({rs1})"
                 else:
-                    asm_str = "{} {}, {}".format(asm_str, self.rs1.name, self.rs2.name)
+                    asm_str = asm_str + " {rs1}, {rs2}"
             elif self.format is riscv_instr_format_t.CA_FORMAT:
-                asm_str = "{} {}, {}".format(asm_str, self.rd.name, self.rs2.name)
+                asm_str = asm_str + " {rd}, {rs2}"
             elif self.format is riscv_instr_format_t.CB_FORMAT:
-                asm_str = "{} {}, {}".format(asm_str, self.rs1.name, self.get_imm())
+                asm_str = asm_str + " {rs1}, {imm}"
             elif self.format is riscv_instr_format_t.CSS_FORMAT:
                 if self.category is riscv_instr_category_t.STORE:
-                    asm_str = "{} {}, {}(sp)".format(asm_str, self.rs2.name, self.get_imm())
+                    asm_str = asm_str + " {rs2}, {imm}(sp)"
                 else:
-                    asm_str = "{} {}, {}".format(asm_str, self.rs2.name, self.get_imm())
+                    asm_str = asm_str + " {rs2}, {imm}"
             elif self.format is riscv_instr_format_t.CR_FORMAT:
                 if self.instr_name in [riscv_instr_name_t.C_JR, riscv_instr_name_t.C_JALR]:
-                    asm_str = "{} {}".format(asm_str, self.rs1.name)
+                    asm_str = asm_str + " {rs1}"
                 else:
-                    asm_str = "{} {}, {}".format(asm_str, self.rd.name, self.rs2.name)
+                    asm_str = asm_str + " {rd}, {rs2}"
             elif self.format is riscv_instr_format_t.CJ_FORMAT:
-                asm_str = "{} {}".format(asm_str, self.get_imm())
+                asm_str = asm_str + " {imm}"
             else:
                 logging.info("Unsupported format {}".format(self.format.name))
         else:
@@ -211,18 +256,12 @@ class riscv_compressed_instr(riscv_instr):
             # This is needed to resume execution from epc+4 after ebreak handling
             if self.instr_name is riscv_instr_name_t.C_EBREAK:
                 asm_str = "c.ebreak;c.nop;"
-            if self.comment != "":
-                asm_str = asm_str + " #" + self.comment
-        return asm_str.lower()
-
-    # TODO
-    def conver2bin(self, prefix=""):
-        pass
+        # The comment is only appended to the SYSTEM instructions
+        return asm_str, self.category == riscv_instr_category_t.SYSTEM
 
-    # TODO
+    # The binary encoding is inherited from riscv_instr.convert2bin
     def get_c_opcode(self):
-        pass
+        return riscv_instr_encoding.get(self.instr_name).match & 0x3
 
-    # TODO
     def get_func3(self):
-        pass
+        return (riscv_instr_encoding.get(self.instr_name).match >> 13) & 0x7
@@ -20,6 +20,8 @@ from pygen_src.riscv_instr_pkg import (pkg_ins, riscv_fpr_t, riscv_instr_format_
 
 @vsc.randobj
 class riscv_floating_point_instr(riscv_instr):
+    record_fields = riscv_instr.record_fields + ("fs1", "fs2", "fs3", "fd")
+
     def __init__(self):
         super().__init__()
         self.fs1 = vsc.rand_enum_t(riscv_fpr_t)
@@ -31,45 +33,43 @@ class riscv_floating_point_instr(riscv_instr):
         self.has_fs3 = vsc.bit_t(1)
         self.has_fd = vsc.bit_t(1, 1)
 
-    def convert2asm(self, prefix = " "):
+    def get_asm_format(self):
         asm_str = pkg_ins.format_string(string = self.get_instr_name(),
                                         length = pkg_ins.MAX_INSTR_STR_LEN)
         if self.format == riscv_instr_format_t.I_FORMAT:
             if self.category == riscv_instr_category_t.LOAD:
-                asm_str = "{}{}, {}({})".format(asm_str, self.fd.name,
-                                                self.get_imm(), self.rs1.name)
+                asm_str = asm_str + "{fd}, {imm}({rs1})"
             elif self.instr_name.name in ['FMV_X_W', 'FMV_X_D', 'FCVT_W_S', 'FCVT_WU_S',
                                           'FCVT_L_S', 'FCVT_LU_S', 'FCVT_L_D', 'FCVT_LU_D',
                                           'FCVT_W_D', 'FCVT_WU_D']:
-                asm_str = "{}{}, {}".format(asm_str, self.rd.name, self.fs1.name)
+                asm_str = asm_str + "{rd}, {fs1}"
             elif self.instr_name.name in ['FMV_W_X', 'FMV_D_X', 'FCVT_S_W', 'FCVT_S_WU',
                                           'FCVT_S_L', 'FCVT_D_L', 'FCVT_S_LU', 'FCVT_D_W',
                                           'FCVT_D_LU', 'FCVT_D_WU']:
-                asm_str = "{}{}, {}".format(asm_str, self.fd.name, self.rs1.name)
+                asm_str = asm_str + "{fd}, {rs1}"
             else:
-                asm_str = "{}{}, {}".format(asm_str, self.fd.name, self.fs1.name)
+                asm_str = asm_str + "{fd}, {fs1}"
         elif self.format == riscv_instr_format_t.S_FORMAT:
-            asm_str = "{}{}, {}({})".format(asm_str, self.fs2.name, self.get_imm(), self.rs1.name)
+            asm_str = asm_str + "{fs2}, {imm}({rs1})"
         elif self.format == riscv_instr_format_t.R_FORMAT:
             if self.category == riscv_instr_category_t.COMPARE:
-                asm_str = "{}{}, {}, {}".format(asm_str, self.rd.name, self.fs1.name, self.fs2.name)
+                asm_str = asm_str + "{rd}, {fs1}, {fs2}"
             elif self.instr_name.name in ['FCLASS_S', 'FCLASS_D']:
-                asm_str = "{}{}, {}".format(asm_str, self.rd.name, self.fs1.name)
+                asm_str = asm_str + "{rd}, {fs1}"
             else:
-                asm_str = "{}{}, {}, {}".format(asm_str, self.fd.name, self.fs1.name, self.fs2.name)
+                asm_str = asm_str + "{fd}, {fs1}, {fs2}"
         elif self.format == riscv_instr_format_t.R4_FORMAT:
-            asm_str = "{}{}, {}, {}, {}".format(
-                asm_str, self.fd.name, self.fs1.name, self.fs2.name, self.fs3.name)
+            asm_str = asm_str + "{fd}, {fs1}, {fs2}, {fs3}"
         elif self.format == riscv_instr_format_t.CL_FORMAT:
-            asm_str = "{}{}, {}({})".format(asm_str, self.fd.name, self.get_imm(), self.rs1.name)
+            asm_str = asm_str + "{fd}, {imm}({rs1})"
         elif self.format == riscv_instr_format_t.CS_FORMAT:
-            asm_str = "{}{}, {}({})".format(asm_str, self.fs2.name,
-                                            self.get_imm(), self.rs1.name)
+            asm_str = asm_str + "{fs2}, {imm}({rs1})"
         else:
             logging.error("Unsupported floating point format: %0s", self.format.name)
-        if self.comment != "":
-            asm_str = asm_str + " #" + self.comment
-        return asm_str.lower()
+        return asm_str, 1
+
+    def has_extra_constraint(self):
+        return 1
 
     def set_rand_mode(self):
         self.has_rs1 = 0
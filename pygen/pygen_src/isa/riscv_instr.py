@@ -10,25 +10,31 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 
+import os
+import glob
 import logging
 import copy
+import functools
 import sys
 import random
 import vsc
-from imp import reload
+from vsc.model.rand_state import RandState
 from collections import defaultdict
-from bitstring import BitArray
 from importlib import import_module
 from pygen_src.riscv_instr_pkg import (pkg_ins, riscv_instr_category_t, riscv_reg_t,
                                        riscv_instr_name_t, riscv_instr_format_t,
-                                       riscv_instr_group_t, imm_t)
+                                       riscv_instr_group_t, imm_t, privileged_reg_t)
 from pygen_src.riscv_instr_gen_config import cfg
+from pygen_src.isa.riscv_instr_record import riscv_instr_desc, riscv_instr_record
+from pygen_src.isa.riscv_asm_template import riscv_asm_template
+from pygen_src.isa.riscv_instr_encoding import riscv_instr_encoding
+from pygen_src.isa.riscv_instr_list_cache import riscv_instr_list_cache
+from pygen_src.riscv_instr_dist import riscv_instr_dist
 rcs = import_module("pygen_src.target." + cfg.argv.target + ".riscv_core_setting")
-reload(logging)
 logging.basicConfig(filename='{}'.format(cfg.argv.log_file_name),
                     filemode='w',
                     format="%(asctime)s %(filename)s %(lineno)s %(levelname)s %(message)s",
-                    level=logging.DEBUG)
+                    level=logging.DEBUG, force=True)
 
 
 @vsc.randobj
@@ -44,11 +50,35 @@ class riscv_instr:
     instr_category = defaultdict(list)
     basic_instr = []
     instr_template = {}
+    # Shared opcode descriptors of the lightweight instruction records
+    instr_desc = {}
+    # Precompiled assembly templates (riscv_asm_template), see get_asm_template_key
+    asm_templates = {}
+    # Assembly names of the instructions, see get_instr_name
+    instr_name_str = {}
+    # Seed of the random states of the template instructions and templates given a random
+    # state derived from it, see seed_templates
+    template_seed = None
+    seeded_templates = set()
+
+    # Per-instruction values copied to the instruction records
+    record_fields = ("csr", "rs2", "rs1", "rd", "imm", "imm_str")
 
     # Privileged CSR filter
     exclude_reg = []
     include_reg = []
 
+    # Instruction lists of create_instr_list, per target and configuration
+    instr_list_cache = riscv_instr_list_cache()
+    # Configuration fields read by create_instr_list, they are part of the key of the cache
+    # with the reservation of SP (cfg.reserved_regs)
+    instr_list_cfg_fields = ("disable_compressed_instr", "enable_floating_point",
+                             "enable_sfence", "enable_b_extension",
+                             "enable_bitmanip_groups", "no_ebreak", "no_dret", "no_fence",
+                             "no_csr_instr", "no_wfi", "init_privileged_mode",
+                             "enable_illegal_csr_instruction", "enable_access_invalid_csr_level",
+                             "invalid_priv_mode_csrs")
+
     def __init__(self):
         # Instruction attributes
         self.group = vsc.enum_t(riscv_instr_group_t)
@@ -119,19 +149,118 @@ class riscv_instr:
         cls.instr_registry[instr_name] = instr_group
         return 1
 
+    # Create the template instructions of the registry, or of the instructions of names, they
+    # do not depend on the configuration and are created once per process
+    @classmethod
+    def create_instr_templates(cls, names=None):
+        for instr_name in cls.instr_registry if names is None else names:
+            if (instr_name in rcs.unsupported_instr or instr_name in cls.instr_template or
+                    instr_name not in cls.instr_registry):
+                continue
+            instr_inst = cls.create_instr(instr_name, cls.instr_registry[instr_name])
+            # pyvsc selects the fields to randomize before pre_randomize sets their rand_mode,
+            # the rand_mode is set on the template so that the first randomization of the
+            # instruction randomizes the same fields as the next ones
+            instr_inst.pre_randomize()
+            cls.instr_template[instr_name] = instr_inst
+            cls.instr_desc[instr_name] = riscv_instr_desc.create(instr_inst)
+            cls.asm_templates[instr_inst.get_asm_template_key()] = riscv_asm_template(
+                *instr_inst.get_asm_format())
+
+    # Give each template instruction a random state derived from seed and its name, the
+    # instructions copied from a template share its random state (see get_instr). The random
+    # states of the templates do not depend on the order the templates are created and used in,
+    # they are set when the templates are used (see get_template). None to keep the random
+    # states of the templates.
+    @classmethod
+    def seed_templates(cls, seed):
+        cls.template_seed = seed
+        cls.seeded_templates = set()
+
+    # Template instruction of name, for the copies of the template
+    @classmethod
+    def get_template(cls, name):
+        instr_inst = cls.instr_template[name]
+        if cls.template_seed is not None and name not in cls.seeded_templates:
+            instr_inst.set_randstate(RandState.mkFromSeed(cls.template_seed, name.name))
+            cls.seeded_templates.add(name)
+        return instr_inst
+
     # Create the list of instructions based on the supported ISA extensions and configuration
-    # of the generator
+    # of the generator. The lists are built once per target and configuration, see
+    # riscv_instr_list_cache, only the template instructions of the cached lists are created.
     @classmethod
     def create_instr_list(cls, cfg):
+        cls.get_instr_candidates.cache_clear()
+        cls.get_instr_dist.cache_clear()
+        cls.instr_list_cache.path = cfg.instr_list_cache
+        key = cls.get_instr_list_key(cfg)
+        entry = cls.instr_list_cache.get(key, cfg.argv.target)
+        if entry is None:
+            cls.build_instr_list(cfg)
+            cls.instr_list_cache.put(key, cls.get_instr_list_entry())
+        else:
+            cls.set_instr_list_entry(entry)
+            cls.create_instr_templates(cls.instr_names + cls.basic_instr)
+
+    # Key of the instruction lists in riscv_instr_list_cache: the core setting, the registered
+    # instructions of the supported ISA, the configuration fields read by build_instr_list and
+    # a digest of the isa sources and of the core setting file
+    @classmethod
+    def get_instr_list_key(cls, cfg):
+        values = {field: getattr(cfg, field) for field in cls.instr_list_cfg_fields}
+        values["sp_reserved"] = riscv_reg_t.SP in cfg.reserved_regs
+        values["sources"] = riscv_instr_list_cache.get_source_digest(tuple(
+            glob.glob(os.path.join(os.path.dirname(os.path.realpath(__file__)), "*.py")) +
+            [os.path.realpath(rcs.__file__)]))
+        values["target"] = cfg.argv.target
+        values["XLEN"] = rcs.XLEN
+        values["supported_isa"] = [isa.name for isa in rcs.supported_isa]
+        values["unsupported_instr"] = [instr.name for instr in rcs.unsupported_instr]
+        values["implemented_csr"] = [csr.name for csr in rcs.implemented_csr]
+        values["registry"] = sorted(name.name for name, group in cls.instr_registry.items()
+                                    if group in rcs.supported_isa)
+        return riscv_instr_list_cache.get_key(values)
+
+    # Instruction lists as names, the CSRs of the filters are [name, is privileged_reg_t]
+    @classmethod
+    def get_instr_list_entry(cls):
+        return {"instr_names": [name.name for name in cls.instr_names],
+                "instr_group": {group: [name.name for name in names]
+                                for group, names in cls.instr_group.items()},
+                "instr_category": {category: [name.name for name in names]
+                                   for category, names in cls.instr_category.items()},
+                "basic_instr": [name.name for name in cls.basic_instr],
+                "include_reg": [[getattr(csr, "name", csr), isinstance(csr, privileged_reg_t)]
+                                for csr in cls.include_reg],
+                "exclude_reg": [[getattr(csr, "name", csr), isinstance(csr, privileged_reg_t)]
+                                for csr in cls.exclude_reg]}
+
+    @classmethod
+    def set_instr_list_entry(cls, entry):
+        cls.instr_names[:] = [riscv_instr_name_t[name] for name in entry["instr_names"]]
+        cls.instr_group.clear()
+        for group, names in entry["instr_group"].items():
+            cls.instr_group[group] = [riscv_instr_name_t[name] for name in names]
+        cls.instr_category.clear()
+        for category, names in entry["instr_category"].items():
+            cls.instr_category[category] = [riscv_instr_name_t[name] for name in names]
+        cls.basic_instr = [riscv_instr_name_t[name] for name in entry["basic_instr"]]
+        cls.include_reg = [privileged_reg_t[csr] if is_enum else csr
+                           for csr, is_enum in entry["include_reg"]]
+        cls.exclude_reg = [privileged_reg_t[csr] if is_enum else csr
+                           for csr, is_enum in entry["exclude_reg"]]
+
+    @classmethod
+    def build_instr_list(cls, cfg):
         cls.instr_names.clear()
         cls.instr_group.clear()
         cls.instr_category.clear()
-        for instr_name, instr_group in cls.instr_registry.items():
+        cls.create_instr_templates()
+        for instr_name in cls.instr_registry:
             if instr_name in rcs.unsupported_instr:
                 continue
-            instr_inst = cls.create_instr(instr_name, instr_group)
-            cls.instr_template[instr_name] = instr_inst
-
+            instr_inst = cls.instr_template[instr_name]
             if not instr_inst.is_supported(cfg):
                 continue
             # C_JAL is RV32C only instruction
@@ -170,35 +299,64 @@ class riscv_instr:
     def is_supported(self, cfg):
         return 1
 
+    # Return 1 if the instruction has constraints other than the GPR selection rules of
+    # riscv_rand_instr_stream. Such instruction is randomized with the constraint solver,
+    # otherwise its operands can be sampled directly from the legal register pools.
+    def has_extra_constraint(self):
+        return self.category == riscv_instr_category_t.CSR
+
+    # Mask of the random immediate bits, it implements imm_c for the instructions randomized
+    # without the constraint solver
+    def get_imm_rand_mask(self):
+        if self.instr_name in [riscv_instr_name_t.SLLIW, riscv_instr_name_t.SRLIW,
+                               riscv_instr_name_t.SRAIW]:
+            return 0xfffff01f
+        if self.instr_name in [riscv_instr_name_t.SLLI, riscv_instr_name_t.SRLI,
+                               riscv_instr_name_t.SRAI]:
+            if self.XLEN == 32:
+                return 0xfffff01f
+            return 0xfffff03f
+        return 0xffffffff
+
+    # Mask of the immediate bits which must not be all zero
+    def get_imm_nonzero_mask(self):
+        return 0
+
+    # Registers of pool which can be used as the operand ("rs1", "rs2" or "rd") of the
+    # instruction randomized without the constraint solver
+    def get_gpr_pool(self, operand, pool):
+        return pool
+
     @classmethod
     def build_basic_instruction_list(cls, cfg):
         cls.basic_instr = (cls.instr_category["SHIFT"] + cls.instr_category["ARITHMETIC"] +
                            cls.instr_category["LOGICAL"] + cls.instr_category["COMPARE"])
         if cfg.no_ebreak == 0:
-            cls.basic_instr.append("EBREAK")
+            cls.basic_instr.append(riscv_instr_name_t.EBREAK)
             for _ in rcs.supported_isa:
                 if(riscv_instr_group_t.RV32C in rcs.supported_isa and
                    not(cfg.disable_compressed_instr)):
-                    cls.basic_instr.append("C_EBREAK")
+                    cls.basic_instr.append(riscv_instr_name_t.C_EBREAK)
                     break
         if cfg.no_dret == 0:
-            cls.basic_instr.append("DRET")
+            cls.basic_instr.append(riscv_instr_name_t.DRET)
         if cfg.no_fence == 0:
-            cls.basic_instr.append(cls.instr_category["SYNCH"])
+            cls.basic_instr.extend(cls.instr_category["SYNCH"])
         if(cfg.no_csr_instr == 0 and cfg.init_privileged_mode == "MACHINE_MODE"):
-            cls.basic_instr.append(cls.instr_category["CSR"])
+            cls.basic_instr.extend(cls.instr_category["CSR"])
         if cfg.no_wfi == 0:
-            cls.basic_instr.append("WFI")
+            cls.basic_instr.append(riscv_instr_name_t.WFI)
 
     @classmethod
     def create_csr_filter(cls, cfg):
         cls.include_reg.clear()
         cls.exclude_reg.clear()
 
+        # Copies, the lists are cleared by the next call in the same process
         if cfg.enable_illegal_csr_instruction:
-            cls.exclude_reg = rcs.implemented_csr
+            cls.exclude_reg = list(rcs.implemented_csr)
         elif cfg.enable_access_invalid_csr_level:
-            cls.include_reg = cfg.invalid_priv_mode_csrs
+            cls.include_reg = list(cfg.invalid_priv_mode_csrs)
         else:
             if cfg.init_privileged_mode == "MACHINE_MODE":      # Machine Mode
                 cls.include_reg.append("MSCRATCH")
@@ -211,57 +369,96 @@ class riscv_instr:
     def get_rand_instr(cls, include_instr=[], exclude_instr=[],
                        include_category=[], exclude_category=[],
                        include_group=[], exclude_group=[]):
-        idx = BitArray(uint = 0, length = 32)
-        name = ""
-        allowed_instr = []
-        disallowed_instr = []
-        # allowed_categories = []
+        name = cls.get_rand_instr_name(include_instr, exclude_instr,
+                                       include_category, exclude_category,
+                                       include_group, exclude_group)
+        # rs1 rs2 values are overwriting and the last generated values are
+        # getting assigned for a particular instruction hence creating different
+        # object address and id to ratain the randomly generated values.
+        instr_h = copy.deepcopy(cls.get_template(name))
+        return instr_h
+
+    # Same as get_rand_instr, but return a lightweight riscv_instr_record sharing the opcode
+    # descriptor instead of a copy of the instruction template
+    @classmethod
+    def get_rand_instr_record(cls, include_instr=[], exclude_instr=[],
+                              include_category=[], exclude_category=[],
+                              include_group=[], exclude_group=[], category_dist={}):
+        name = cls.get_rand_instr_name(include_instr, exclude_instr,
+                                       include_category, exclude_category,
+                                       include_group, exclude_group, category_dist)
+        return riscv_instr_record.create(cls.instr_desc[name])
+
+    # When category_dist is not empty, the category of the instruction is drawn with the
+    # weights of category_dist, otherwise all the candidate instructions have the same weight
+    @classmethod
+    def get_rand_instr_name(cls, include_instr=[], exclude_instr=[],
+                            include_category=[], exclude_category=[],
+                            include_group=[], exclude_group=[], category_dist={}):
+        candidates = cls.get_instr_candidates(tuple(include_instr), tuple(exclude_instr),
+                                              tuple(include_category), tuple(exclude_category),
+                                              tuple(include_group), tuple(exclude_group))
+        if len(candidates) == 0:
+            logging.critical("[%s] Cannot generate random instruction", riscv_instr.__name__)
+            sys.exit(1)
+        if len(category_dist) > 0:
+            return cls.get_instr_dist(tuple(category_dist.items()), candidates).sample()
+        return random.choice(candidates)
+
+    # Weighted sampler of the candidate instructions, built once per distinct
+    # (category_dist, candidates) combination
+    @classmethod
+    @functools.lru_cache(maxsize = 64)
+    def get_instr_dist(cls, category_dist, candidates):
+        return riscv_instr_dist(dict(category_dist), candidates,
+                                [cls.instr_desc[name].category.name for name in candidates])
+
+    # Return the instructions matching the filters of get_rand_instr. The filtering is done
+    # once per distinct combination of filters, the result is kept in a bounded LRU cache
+    # which is cleared by create_instr_list.
+    @classmethod
+    @functools.lru_cache(maxsize = 64)
+    def get_instr_candidates(cls, include_instr, exclude_instr, include_category,
+                             exclude_category, include_group, exclude_group):
+        allowed_instr = set()
+        disallowed_instr = set(cls.get_instr_name_enum(exclude_instr))
         for items in include_category:
-            allowed_instr.extend(cls.instr_category[items])
+            allowed_instr.update(cls.instr_category[cls.get_enum_name(items)])
         for items in exclude_category:
-            if items in cls.instr_category:
-                disallowed_instr.extend(cls.instr_category[items])
+            disallowed_instr.update(cls.instr_category[cls.get_enum_name(items)])
         for items in include_group:
-            allowed_instr.extend(cls.instr_group[items])
+            allowed_instr.update(cls.instr_group[cls.get_enum_name(items)])
         for items in exclude_group:
-            if items in cls.instr_group:
-                disallowed_instr.extend(cls.instr_group[items])
-
-        disallowed_instr.extend(exclude_instr)
-
-        # TODO Randomization logic needs to be frame with PyVSC library
-        if len(disallowed_instr) == 0:
-            try:
-                if len(include_instr) > 0:
-                    if len(include_instr) == 1:
-                        idx = 0
-                    else:
-                        idx = random.randrange(0, len(include_instr) - 1)
-                    name = include_instr[idx]
-                elif len(allowed_instr) > 0:
-                    idx = random.randrange(0, len(allowed_instr) - 1)
-                    name = allowed_instr[idx]
-                else:
-                    idx = random.randrange(0, len(cls.instr_names) - 1)
-                    name = cls.instr_names[idx]
-            except Exception:
-                logging.critical("[%s] Cannot generate random instruction", riscv_instr.__name__)
-                sys.exit(1)
+            disallowed_instr.update(cls.instr_group[cls.get_enum_name(items)])
+        if len(include_instr) > 0:
+            candidates = cls.get_instr_name_enum(include_instr)
         else:
-            try:
-                name = random.choice(cls.instr_names)
-                if len(include_instr) > 0:
-                    name = random.choice(include_instr)
-                if len(allowed_instr) > 0:
-                    name = random.choice(allowed_instr)
-            except Exception:
-                logging.critical("[%s] Cannot generate random instruction", riscv_instr.__name__)
-                sys.exit(1)
-        # rs1 rs2 values are overwriting and the last generated values are
-        # getting assigned for a particular instruction hence creating different
-        # object address and id to ratain the randomly generated values.
-        instr_h = copy.deepcopy(cls.instr_template[name])
-        return instr_h
+            candidates = cls.instr_names
+        supported_instr = set(cls.instr_names)
+        return tuple(name for name in dict.fromkeys(candidates)
+                     if (name in supported_instr and name not in disallowed_instr and
+                         (len(allowed_instr) == 0 or name in allowed_instr)))
+
+    # Instruction names are given either as riscv_instr_name_t or as strings, nested lists of
+    # names are flattened
+    @staticmethod
+    def get_instr_name_enum(names):
+        name_list = []
+        for name in names:
+            if isinstance(name, (list, tuple)):
+                name_list.extend(riscv_instr.get_instr_name_enum(name))
+            elif isinstance(name, str):
+                name_list.append(riscv_instr_name_t[name])
+            else:
+                name_list.append(name)
+        return name_list
+
+    # instr_category and instr_group are indexed with the name of the enum
+    @staticmethod
+    def get_enum_name(item):
+        if isinstance(item, str):
+            return item
+        return item.name
 
     @classmethod
     def get_load_store_instr(cls, load_store_instr):
@@ -271,15 +468,16 @@ class riscv_instr:
                 cls.instr_category["STORE"]
         cls.idx = random.randrange(0, len(load_store_instr) - 1)
         name = load_store_instr[cls.idx]
-        instr_h = copy.copy(cls.instr_template[name])
+        instr_h = copy.copy(cls.get_template(name))
         return instr_h
 
     @classmethod
     def get_instr(cls, name):
+        cls.create_instr_templates([name])
         if not cls.instr_template.get(name):
             logging.critical("Cannot get instr %s", name)
             sys.exit(1)
-        instr_h = copy.copy(cls.instr_template[name])
+        instr_h = copy.copy(cls.get_template(name))
         return instr_h
 
     def set_rand_mode(self):
@@ -334,14 +532,29 @@ class riscv_instr:
         self.extend_imm()
         self.update_imm_str()
 
+    # Assembly string of the instruction, built with the precompiled template of the opcode
     def convert2asm(self, prefix = " "):
+        key = self.get_asm_template_key()
+        template = riscv_instr.asm_templates.get(key)
+        if template is None:
+            template = riscv_asm_template(*self.get_asm_format())
+            riscv_instr.asm_templates[key] = template
+        return template.convert(self)
+
+    # Key of the assembly template, the template depends only on the opcode
+    def get_asm_template_key(self):
+        return self.instr_name
+
+    # Assembly format of the instruction for riscv_asm_template and whether the comment is
+    # appended. The operands are written as {rd}, {rs1}, {imm}...
+    def get_asm_format(self):
         asm_str = pkg_ins.format_string(string = self.get_instr_name(),
                                         length = pkg_ins.MAX_INSTR_STR_LEN)
         if self.category != riscv_instr_category_t.SYSTEM:
             if self.format == riscv_instr_format_t.J_FORMAT:
-                asm_str = '{} {}, {}'.format(asm_str, self.rd.name, self.get_imm())
+                asm_str = asm_str + ' {rd}, {imm}'
             elif self.format == riscv_instr_format_t.U_FORMAT:
-                asm_str = '{} {}, {}'.format(asm_str, self.rd.name, self.get_imm())
+                asm_str = asm_str + ' {rd}, {imm}'
             elif self.format == riscv_instr_format_t.I_FORMAT:
                 if self.instr_name == riscv_instr_name_t.NOP:
                     asm_str = "nop"
@@ -352,39 +565,30 @@ class riscv_instr:
                 elif self.instr_name == riscv_instr_name_t.FENCE_I:
                     asm_str = "fence.i"
                 elif self.category == riscv_instr_category_t.LOAD:
-                    asm_str = '{} {}, {} ({})'.format(
-                        asm_str, self.rd.name, self.get_imm(), self.rs1.name)
+                    asm_str = asm_str + ' {rd}, {imm} ({rs1})'
                 elif self.category == riscv_instr_category_t.CSR:
-                    asm_str = '{} {}, 0x{}, {}'.format(
-                        asm_str, self.rd.name, self.csr, self.get_imm())
+                    asm_str = asm_str + ' {rd}, 0x{csr}, {imm}'
                 else:
-                    asm_str = '{} {}, {}, {}'.format(
-                        asm_str, self.rd.name, self.rs1.name, self.get_imm())
+                    asm_str = asm_str + ' {rd}, {rs1}, {imm}'
             elif self.format == riscv_instr_format_t.S_FORMAT:
                 if self.category == riscv_instr_category_t.STORE:
-                    asm_str = '{} {}, {} ({})'.format(
-                        asm_str, self.rs2.name, self.get_imm(), self.rs1.name)
+                    asm_str = asm_str + ' {rs2}, {imm} ({rs1})'
                 else:
-                    asm_str = '{} {}, {}, {}'.format(
-                        asm_str, self.rs1.name, self.rs2.name, self.get_imm())
+                    asm_str = asm_str + ' {rs1}, {rs2}, {imm}'
 
             elif self.format == riscv_instr_format_t.B_FORMAT:
                 if self.category == riscv_instr_category_t.STORE:
-                    asm_str = '{} {}, {} ({})'.format(
-                        asm_str, self.rs2.name, self.get_imm(), self.rs1.name)
+                    asm_str = asm_str + ' {rs2}, {imm} ({rs1})'
                 else:
-                    asm_str = '{} {}, {}, {}'.format(
-                        asm_str, self.rs1.name, self.rs2.name, self.get_imm())
+                    asm_str = asm_str + ' {rs1}, {rs2}, {imm}'
 
             elif self.format == riscv_instr_format_t.R_FORMAT:
                 if self.category == riscv_instr_category_t.CSR:
-                    asm_str = '{} {}, 0x{}, {}'.format(
-                        asm_str, self.rd.name, self.csr, self.rs1.name)
+                    asm_str = asm_str + ' {rd}, 0x{csr}, {rs1}'
                 elif self.instr_name == riscv_instr_name_t.SFENCE_VMA:
                     asm_str = "sfence.vma x0, x0"
                 else:
-                    asm_str = '{} {}, {}, {}'.format(
-                        asm_str, self.rd.name, self.rs1.name, self.rs2.name)
+                    asm_str = asm_str + ' {rd}, {rs1}, {rs2}'
             else:
                 asm_str = 'Fatal_unsupported_format: {} {}'.format(
                     self.format.name, self.instr_name.name)
@@ -393,106 +597,31 @@ class riscv_instr:
             if self.instr_name == riscv_instr_name_t.EBREAK:
                 asm_str = ".4byte 0x00100073 # ebreak"
 
-        if self.comment != "":
-            asm_str = asm_str + " #" + self.comment
-        return asm_str.lower()
+        return asm_str, 1
 
+    # Fixed fields of the binary encoding, read from the encoding table
     def get_opcode(self):
-        if self.instr_name == "LUI":
-            return (BitArray(uint = 55, length = 7).bin)
-        elif self.instr_name == "AUIPC":
-            return (BitArray(uint = 23, length = 7).bin)
-        elif self.instr_name == "JAL":
-            return (BitArray(uint = 23, length = 7).bin)
-        elif self.instr_name == "JALR":
-            return (BitArray(uint = 111, length = 7).bin)
-        elif self.instr_name in ["BEQ", "BNE", "BLT", "BGE", "BLTU", "BGEU"]:
-            return (BitArray(uint = 103, length = 7).bin)
-        elif self.instr_name in ["LB", "LH", "LW", "LBU", "LHU", "LWU", "LD"]:
-            return (BitArray(uint = 99, length = 7).bin)
-        elif self.instr_name in ["SB", "SH", "SW", "SD"]:
-            return (BitArray(uint = 35, length = 7).bin)
-        elif self.instr_name in ["ADDI", "SLTI", "SLTIU", "XORI", "ORI", "ANDI",
-                                 "SLLI", "SRLI", "SRAI", "NOP"]:
-            return (BitArray(uint = 19, length = 7).bin)
-        elif self.instr_name in ["ADD", "SUB", "SLL", "SLT", "SLTU", "XOR", "SRL",
-                                 "SRA", "OR", "AND", "MUL", "MULH", "MULHSU", "MULHU",
-                                 "DIV", "DIVU", "REM", "REMU"]:
-            return (BitArray(uint = 51, length = 7).bin)
-        elif self.instr_name in ["ADDIW", "SLLIW", "SRLIW", "SRAIW"]:
-            return (BitArray(uint = 27, length = 7).bin)
-        elif self.instr_name in ["MULH", "MULHSU", "MULHU", "DIV", "DIVU", "REM", "REMU"]:
-            return (BitArray(uint = 51, length = 7).bin)
-        elif self.instr_name in ["FENCE", "FENCE_I"]:
-            return (BitArray(uint = 15, length = 7).bin)
-        elif self.instr_name in ["ECALL", "EBREAK", "CSRRW", "CSRRS", "CSRRC", "CSRRWI",
-                                 "CSRRSI", "CSRRCI"]:
-            return (BitArray(uint = 115, length = 7).bin)
-        elif self.instr_name in ["ADDW", "SUBW", "SLLW", "SRLW", "SRAW", "MULW", "DIVW",
-                                 "DIVUW", "REMW", "REMUW"]:
-            return (BitArray(uint = 59, length = 7).bin)
-        elif self.instr_name in ["ECALL", "EBREAK", "URET", "SRET", "MRET", "DRET", "WFI",
-                                 "SFENCE_VMA"]:
-            return (BitArray(uint = 115, length = 7).bin)
-        else:
-            logging.critical("Unsupported instruction %0s", self.instr_name)
-            sys.exit(1)
+        return riscv_instr_encoding.get(self.instr_name).match & 0x7f
 
     def get_func3(self):
-        if self.instr_name in ["JALR", "BEQ", "LB", "SB", "ADDI", "NOP", "ADD", "SUB",
-                               "FENCE", "ECALL", "EBREAK", "ADDIW", "ADDW", "SUBW", "MUL",
-                               "MULW", "ECALL", "EBREAK", "URET", "SRET", "MRET", "DRET",
-                               "WFI", "SFENCE_VMA"]:
-            return (BitArray(uint = 0, length = 3).bin)
-        elif self.instr_name in ["BNE", "LH", "SH", "SLLI", "SLL", "FENCE_I", "CSRRW", "SLLIW",
-                                 "SLLW", "MULH"]:
-            return (BitArray(uint = 1, length = 3).bin)
-        elif self.instr_name in ["LW", "SW", "SLTI", "SLT", "CSRRS", "MULHS"]:
-            return (BitArray(uint = 2, length = 3).bin)
-        elif self.instr_name in ["SLTIU", "SLTU", "CSRRC", "LD", "SD", "MULHU"]:
-            return (BitArray(uint = 3, length = 3).bin)
-        elif self.instr_name in ["BLT", "LBU", "XORI", "XOR", "DIV", "DIVW"]:
-            return (BitArray(uint = 4, length = 3).bin)
-        elif self.instr_name in ["BGE", "LHU", "SRLI", "SRAI", "SRL", "SRA", "CSRRWI", "SRLIW",
-                                 "SRAIW", "SRLW",
-                                 "SRAW", "DIVU", "DIVUW"]:
-            return (BitArray(uint = 5, length = 3).bin)
-        elif self.instr_name in ["BLTU", "ORI", "OR", "CSRRSI", "LWU", "REM", "REMW"]:
-            return (BitArray(uint = 6, length = 3).bin)
-        elif self.instr_name in ["BGEU", "ANDI", "AND", "CSRRCI", "REMU", "REMUW"]:
-            return (BitArray(uint = 7, length = 3).bin)
-        else:
-            logging.critical("Unsupported instruction %0s", self.instr_name)
-            sys.exit(1)
+        return (riscv_instr_encoding.get(self.instr_name).match >> 12) & 0x7
 
     def get_func7(self):
-        if self.instr_name in ["SLLI", "SRLI", "ADD", "SLL", "SLT", "SLTU", "XOR",
-                               "SRL", "OR", "AND", "FENCE", "FENCE_I", "SLLIW",
-                               "SRLIW", "ADDW", "SLLW", "SRLW", "ECALL", "EBREAK", "URET"]:
-            return (BitArray(uint = 0, length = 7).bin)
-        elif self.instr_name in ["SUB", "SRA", "SRAIW", "SUBW", "SRAW"]:
-            return (BitArray(uint = 32, length = 7).bin)
-        elif self.instr_name in ["MUL", "MULH", "MULHSU", "MULHU", "DIV", "DIVU", "REM",
-                                 "REMU", "MULW", "DIVW", "DIVUW", "REMW", "REMUW"]:
-            return (BitArray(uint = 1, length = 7).bin)
-        elif self.instr_name in ["SRET", "WFI"]:
-            return (BitArray(uint = 8, length = 7).bin)
-        elif self.instr_name == "MRET":
-            return (BitArray(uint = 24, length = 7).bin)
-        elif self.instr_name == "DRET":
-            return (BitArray(uint = 61, length = 7).bin)
-        elif self.instr_name == "SFENCE_VMA":
-            return (BitArray(uint = 9, length = 7).bin)
-        else:
-            logging.critical("Unsupported instruction %0s", self.instr_name)
-            sys.exit(1)
+        return (riscv_instr_encoding.get(self.instr_name).match >> 25) & 0x7f
 
+    # Binary encoding of the instruction, see riscv_instr_encoding
     def convert2bin(self):
-        pass  # TODO
+        return riscv_instr_encoding.get(self.instr_name).encode(self)
+
+    # Size of the instruction in bytes: 2 for the compressed instructions, 4 otherwise
+    def get_instr_size(self):
+        return riscv_instr_encoding.get(self.instr_name).size
 
     def get_instr_name(self):
-        get_instr_name = self.instr_name.name
-        get_instr_name = get_instr_name.replace("_", ".")
+        get_instr_name = riscv_instr.instr_name_str.get(self.instr_name)
+        if get_instr_name is None:
+            get_instr_name = self.instr_name.name.replace("_", ".")
+            riscv_instr.instr_name_str[self.instr_name] = get_instr_name
         return get_instr_name
 
     def get_c_gpr(self, gpr):
@@ -0,0 +1,436 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import sys
+import logging
+
+# ---------------------------------------------------------------------------------------------
+# Binary encoding of the instructions.
+# Each instruction is described by its operand fields and its fixed bits, in the format of
+# the riscv-opcodes tables: "rd rs1 imm12 14..12=0 6..0=0x13".
+# An operand field is written as <field> or <attribute>:<field> when the value is not read
+# from the default attribute of the field, e.g. "fd:rd" for a floating point destination.
+# The operands are encoded as they are written by convert2asm, the operand fields are listed in
+# the order of the assembly operands.
+# ---------------------------------------------------------------------------------------------
+
+# Operand fields: default attribute and bit segments (msb, lsb, position) of the value
+encoding_field = {
+    "rd": ("rd", [(4, 0, 7)]),
+    "rs1": ("rs1", [(4, 0, 15)]),
+    "rs2": ("rs2", [(4, 0, 20)]),
+    "rs3": ("rs3", [(4, 0, 27)]),
+    "imm12": ("imm", [(11, 0, 20)]),
+    "simm12": ("imm", [(11, 5, 25), (4, 0, 7)]),
+    "bimm12": ("imm", [(12, 12, 31), (10, 5, 25), (4, 1, 8), (11, 11, 7)]),
+    "imm20": ("imm", [(19, 0, 12)]),
+    "jimm20": ("imm", [(20, 20, 31), (10, 1, 21), (11, 11, 20), (19, 12, 12)]),
+    "shamt": ("imm", [(5, 0, 20)]),
+    "shamtw": ("imm", [(4, 0, 20)]),
+    "csr": ("csr", [(11, 0, 20)]),
+    "zimm": ("imm", [(4, 0, 15)]),
+    "aq": ("aq", [(0, 0, 26)]),
+    "rl": ("rl", [(0, 0, 25)]),
+    # Compressed instructions
+    "c_rs1": ("rs1", [(4, 0, 7)]),
+    "c_rs2": ("rs2", [(4, 0, 2)]),
+    "rd_p": ("rd", [(2, 0, 2)]),
+    "rs2_p": ("rs2", [(2, 0, 2)]),
+    "rs1_p": ("rs1", [(2, 0, 7)]),
+    "rd_rs1_p": ("rd", [(2, 0, 7)]),
+    "c_imm6": ("imm", [(5, 5, 12), (4, 0, 2)]),
+    "c_nzimm10": ("imm", [(9, 9, 12), (4, 4, 6), (6, 6, 5), (8, 7, 3), (5, 5, 2)]),
+    "c_nzuimm10": ("imm", [(5, 4, 11), (9, 6, 7), (2, 2, 6), (3, 3, 5)]),
+    "c_uimm7": ("imm", [(5, 3, 10), (2, 2, 6), (6, 6, 5)]),
+    "c_uimm8": ("imm", [(5, 3, 10), (7, 6, 5)]),
+    "c_uimm8sp": ("imm", [(5, 5, 12), (4, 2, 4), (7, 6, 2)]),
+    "c_uimm9sp": ("imm", [(5, 5, 12), (4, 3, 5), (8, 6, 2)]),
+    "c_uimm8sp_s": ("imm", [(5, 2, 9), (7, 6, 7)]),
+    "c_uimm9sp_s": ("imm", [(5, 3, 10), (8, 6, 7)]),
+    "c_bimm9": ("imm", [(8, 8, 12), (4, 3, 10), (7, 6, 5), (2, 1, 3), (5, 5, 2)]),
+    "c_imm12": ("imm", [(11, 11, 12), (4, 4, 11), (9, 8, 9), (10, 10, 8), (6, 6, 7), (7, 7, 6),
+                        (3, 1, 3), (5, 5, 2)])
+}
+
+instr_encoding_table = {
+    # RV32I
+    "LUI": "rd imm20 6..0=0x37",
+    "AUIPC": "rd imm20 6..0=0x17",
+    "JAL": "rd jimm20 6..0=0x6f",
+    "JALR": "rd rs1 imm12 14..12=0 6..0=0x67",
+    "BEQ": "rs1 rs2 bimm12 14..12=0 6..0=0x63",
+    "BNE": "rs1 rs2 bimm12 14..12=1 6..0=0x63",
+    "BLT": "rs1 rs2 bimm12 14..12=4 6..0=0x63",
+    "BGE": "rs1 rs2 bimm12 14..12=5 6..0=0x63",
+    "BLTU": "rs1 rs2 bimm12 14..12=6 6..0=0x63",
+    "BGEU": "rs1 rs2 bimm12 14..12=7 6..0=0x63",
+    "LB": "rd rs1 imm12 14..12=0 6..0=0x03",
+    "LH": "rd rs1 imm12 14..12=1 6..0=0x03",
+    "LW": "rd rs1 imm12 14..12=2 6..0=0x03",
+    "LBU": "rd rs1 imm12 14..12=4 6..0=0x03",
+    "LHU": "rd rs1 imm12 14..12=5 6..0=0x03",
+    "SB": "rs2 rs1 simm12 14..12=0 6..0=0x23",
+    "SH": "rs2 rs1 simm12 14..12=1 6..0=0x23",
+    "SW": "rs2 rs1 simm12 14..12=2 6..0=0x23",
+    "ADDI": "rd rs1 imm12 14..12=0 6..0=0x13",
+    "SLTI": "rd rs1 imm12 14..12=2 6..0=0x13",
+    "SLTIU": "rd rs1 imm12 14..12=3 6..0=0x13",
+    "XORI": "rd rs1 imm12 14..12=4 6..0=0x13",
+    "ORI": "rd rs1 imm12 14..12=6 6..0=0x13",
+    "ANDI": "rd rs1 imm12 14..12=7 6..0=0x13",
+    "SLLI": "rd rs1 shamt 31..26=0x00 14..12=1 6..0=0x13",
+    "SRLI": "rd rs1 shamt 31..26=0x00 14..12=5 6..0=0x13",
+    "SRAI": "rd rs1 shamt 31..26=0x10 14..12=5 6..0=0x13",
+    "ADD": "rd rs1 rs2 31..25=0x00 14..12=0 6..0=0x33",
+    "SUB": "rd rs1 rs2 31..25=0x20 14..12=0 6..0=0x33",
+    "SLL": "rd rs1 rs2 31..25=0x00 14..12=1 6..0=0x33",
+    "SLT": "rd rs1 rs2 31..25=0x00 14..12=2 6..0=0x33",
+    "SLTU": "rd rs1 rs2 31..25=0x00 14..12=3 6..0=0x33",
+    "XOR": "rd rs1 rs2 31..25=0x00 14..12=4 6..0=0x33",
+    "SRL": "rd rs1 rs2 31..25=0x00 14..12=5 6..0=0x33",
+    "SRA": "rd rs1 rs2 31..25=0x20 14..12=5 6..0=0x33",
+    "OR": "rd rs1 rs2 31..25=0x00 14..12=6 6..0=0x33",
+    "AND": "rd rs1 rs2 31..25=0x00 14..12=7 6..0=0x33",
+    "NOP": "31..0=0x00000013",
+    "FENCE": "31..0=0x0ff0000f",
+    "FENCE_I": "31..0=0x0000100f",
+    "ECALL": "31..0=0x00000073",
+    "EBREAK": "31..0=0x00100073",
+    "CSRRW": "rd csr rs1 14..12=1 6..0=0x73",
+    "CSRRS": "rd csr rs1 14..12=2 6..0=0x73",
+    "CSRRC": "rd csr rs1 14..12=3 6..0=0x73",
+    "CSRRWI": "rd csr zimm 14..12=5 6..0=0x73",
+    "CSRRSI": "rd csr zimm 14..12=6 6..0=0x73",
+    "CSRRCI": "rd csr zimm 14..12=7 6..0=0x73",
+    "URET": "31..0=0x00200073",
+    "SRET": "31..0=0x10200073",
+    "MRET": "31..0=0x30200073",
+    "DRET": "31..0=0x7b200073",
+    "WFI": "31..0=0x10500073",
+    "SFENCE_VMA": "31..0=0x12000073",
+    # RV64I
+    "LWU": "rd rs1 imm12 14..12=6 6..0=0x03",
+    "LD": "rd rs1 imm12 14..12=3 6..0=0x03",
+    "SD": "rs2 rs1 simm12 14..12=3 6..0=0x23",
+    "ADDIW": "rd rs1 imm12 14..12=0 6..0=0x1b",
+    "SLLIW": "rd rs1 shamtw 31..25=0x00 14..12=1 6..0=0x1b",
+    "SRLIW": "rd rs1 shamtw 31..25=0x00 14..12=5 6..0=0x1b",
+    "SRAIW": "rd rs1 shamtw 31..25=0x20 14..12=5 6..0=0x1b",
+    "ADDW": "rd rs1 rs2 31..25=0x00 14..12=0 6..0=0x3b",
+    "SUBW": "rd rs1 rs2 31..25=0x20 14..12=0 6..0=0x3b",
+    "SLLW": "rd rs1 rs2 31..25=0x00 14..12=1 6..0=0x3b",
+    "SRLW": "rd rs1 rs2 31..25=0x00 14..12=5 6..0=0x3b",
+    "SRAW": "rd rs1 rs2 31..25=0x20 14..12=5 6..0=0x3b",
+    # RV32M/RV64M
+    "MUL": "rd rs1 rs2 31..25=0x01 14..12=0 6..0=0x33",
+    "MULH": "rd rs1 rs2 31..25=0x01 14..12=1 6..0=0x33",
+    "MULHSU": "rd rs1 rs2 31..25=0x01 14..12=2 6..0=0x33",
+    "MULHU": "rd rs1 rs2 31..25=0x01 14..12=3 6..0=0x33",
+    "DIV": "rd rs1 rs2 31..25=0x01 14..12=4 6..0=0x33",
+    "DIVU": "rd rs1 rs2 31..25=0x01 14..12=5 6..0=0x33",
+    "REM": "rd rs1 rs2 31..25=0x01 14..12=6 6..0=0x33",
+    "REMU": "rd rs1 rs2 31..25=0x01 14..12=7 6..0=0x33",
+    "MULW": "rd rs1 rs2 31..25=0x01 14..12=0 6..0=0x3b",
+    "DIVW": "rd rs1 rs2 31..25=0x01 14..12=4 6..0=0x3b",
+    "DIVUW": "rd rs1 rs2 31..25=0x01 14..12=5 6..0=0x3b",
+    "REMW": "rd rs1 rs2 31..25=0x01 14..12=6 6..0=0x3b",
+    "REMUW": "rd rs1 rs2 31..25=0x01 14..12=7 6..0=0x3b",
+    # RV32A/RV64A
+    "LR_W": "rd rs1 aq rl 31..27=0x02 24..20=0 14..12=2 6..0=0x2f",
+    "SC_W": "rd rs2 rs1 aq rl 31..27=0x03 14..12=2 6..0=0x2f",
+    "AMOSWAP_W": "rd rs2 rs1 aq rl 31..27=0x01 14..12=2 6..0=0x2f",
+    "AMOADD_W": "rd rs2 rs1 aq rl 31..27=0x00 14..12=2 6..0=0x2f",
+    "AMOXOR_W": "rd rs2 rs1 aq rl 31..27=0x04 14..12=2 6..0=0x2f",
+    "AMOAND_W": "rd rs2 rs1 aq rl 31..27=0x0c 14..12=2 6..0=0x2f",
+    "AMOOR_W": "rd rs2 rs1 aq rl 31..27=0x08 14..12=2 6..0=0x2f",
+    "AMOMIN_W": "rd rs2 rs1 aq rl 31..27=0x10 14..12=2 6..0=0x2f",
+    "AMOMAX_W": "rd rs2 rs1 aq rl 31..27=0x14 14..12=2 6..0=0x2f",
+    "AMOMINU_W": "rd rs2 rs1 aq rl 31..27=0x18 14..12=2 6..0=0x2f",
+    "AMOMAXU_W": "rd rs2 rs1 aq rl 31..27=0x1c 14..12=2 6..0=0x2f",
+    "LR_D": "rd rs1 aq rl 31..27=0x02 24..20=0 14..12=3 6..0=0x2f",
+    "SC_D": "rd rs2 rs1 aq rl 31..27=0x03 14..12=3 6..0=0x2f",
+    "AMOSWAP_D": "rd rs2 rs1 aq rl 31..27=0x01 14..12=3 6..0=0x2f",
+    "AMOADD_D": "rd rs2 rs1 aq rl 31..27=0x00 14..12=3 6..0=0x2f",
+    "AMOXOR_D": "rd rs2 rs1 aq rl 31..27=0x04 14..12=3 6..0=0x2f",
+    "AMOAND_D": "rd rs2 rs1 aq rl 31..27=0x0c 14..12=3 6..0=0x2f",
+    "AMOOR_D": "rd rs2 rs1 aq rl 31..27=0x08 14..12=3 6..0=0x2f",
+    "AMOMIN_D": "rd rs2 rs1 aq rl 31..27=0x10 14..12=3 6..0=0x2f",
+    "AMOMAX_D": "rd rs2 rs1 aq rl 31..27=0x14 14..12=3 6..0=0x2f",
+    "AMOMINU_D": "rd rs2 rs1 aq rl 31..27=0x18 14..12=3 6..0=0x2f",
+    "AMOMAXU_D": "rd rs2 rs1 aq rl 31..27=0x1c 14..12=3 6..0=0x2f",
+    # RV32F/RV64F, the rounding mode is dynamic (7) when it is not written in the assembly
+    "FLW": "fd:rd rs1 imm12 14..12=2 6..0=0x07",
+    "FSW": "fs2:rs2 rs1 simm12 14..12=2 6..0=0x27",
+    "FMADD_S": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=0 14..12=7 6..0=0x43",
+    "FMSUB_S": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=0 14..12=7 6..0=0x47",
+    "FNMSUB_S": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=0 14..12=7 6..0=0x4b",
+    "FNMADD_S": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=0 14..12=7 6..0=0x4f",
+    "FADD_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x00 14..12=7 6..0=0x53",
+    "FSUB_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x04 14..12=7 6..0=0x53",
+    "FMUL_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x08 14..12=7 6..0=0x53",
+    "FDIV_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x0c 14..12=7 6..0=0x53",
+    "FSQRT_S": "fd:rd fs1:rs1 31..25=0x2c 24..20=0 14..12=7 6..0=0x53",
+    "FSGNJ_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x10 14..12=0 6..0=0x53",
+    "FSGNJN_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x10 14..12=1 6..0=0x53",
+    "FSGNJX_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x10 14..12=2 6..0=0x53",
+    "FMIN_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x14 14..12=0 6..0=0x53",
+    "FMAX_S": "fd:rd fs1:rs1 fs2:rs2 31..25=0x14 14..12=1 6..0=0x53",
+    "FCVT_W_S": "rd fs1:rs1 31..25=0x60 24..20=0 14..12=7 6..0=0x53",
+    "FCVT_WU_S": "rd fs1:rs1 31..25=0x60 24..20=1 14..12=7 6..0=0x53",
+    "FCVT_L_S": "rd fs1:rs1 31..25=0x60 24..20=2 14..12=7 6..0=0x53",
+    "FCVT_LU_S": "rd fs1:rs1 31..25=0x60 24..20=3 14..12=7 6..0=0x53",
+    "FMV_X_W": "rd fs1:rs1 31..25=0x70 24..20=0 14..12=0 6..0=0x53",
+    "FCLASS_S": "rd fs1:rs1 31..25=0x70 24..20=0 14..12=1 6..0=0x53",
+    "FEQ_S": "rd fs1:rs1 fs2:rs2 31..25=0x50 14..12=2 6..0=0x53",
+    "FLT_S": "rd fs1:rs1 fs2:rs2 31..25=0x50 14..12=1 6..0=0x53",
+    "FLE_S": "rd fs1:rs1 fs2:rs2 31..25=0x50 14..12=0 6..0=0x53",
+    "FCVT_S_W": "fd:rd rs1 31..25=0x68 24..20=0 14..12=7 6..0=0x53",
+    "FCVT_S_WU": "fd:rd rs1 31..25=0x68 24..20=1 14..12=7 6..0=0x53",
+    "FCVT_S_L": "fd:rd rs1 31..25=0x68 24..20=2 14..12=7 6..0=0x53",
+    "FCVT_S_LU": "fd:rd rs1 31..25=0x68 24..20=3 14..12=7 6..0=0x53",
+    "FMV_W_X": "fd:rd rs1 31..25=0x78 24..20=0 14..12=0 6..0=0x53",
+    # RV32D/RV64D, the exact conversions to double have a fixed rounding mode (0)
+    "FLD": "fd:rd rs1 imm12 14..12=3 6..0=0x07",
+    "FSD": "fs2:rs2 rs1 simm12 14..12=3 6..0=0x27",
+    "FMADD_D": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=1 14..12=7 6..0=0x43",
+    "FMSUB_D": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=1 14..12=7 6..0=0x47",
+    "FNMSUB_D": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=1 14..12=7 6..0=0x4b",
+    "FNMADD_D": "fd:rd fs1:rs1 fs2:rs2 fs3:rs3 26..25=1 14..12=7 6..0=0x4f",
+    "FADD_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x01 14..12=7 6..0=0x53",
+    "FSUB_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x05 14..12=7 6..0=0x53",
+    "FMUL_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x09 14..12=7 6..0=0x53",
+    "FDIV_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x0d 14..12=7 6..0=0x53",
+    "FSQRT_D": "fd:rd fs1:rs1 31..25=0x2d 24..20=0 14..12=7 6..0=0x53",
+    "FSGNJ_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x11 14..12=0 6..0=0x53",
+    "FSGNJN_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x11 14..12=1 6..0=0x53",
+    "FSGNJX_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x11 14..12=2 6..0=0x53",
+    "FMIN_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x15 14..12=0 6..0=0x53",
+    "FMAX_D": "fd:rd fs1:rs1 fs2:rs2 31..25=0x15 14..12=1 6..0=0x53",
+    "FCVT_S_D": "fd:rd fs1:rs1 31..25=0x20 24..20=1 14..12=7 6..0=0x53",
+    "FCVT_D_S": "fd:rd fs1:rs1 31..25=0x21 24..20=0 14..12=0 6..0=0x53",
+    "FEQ_D": "rd fs1:rs1 fs2:rs2 31..25=0x51 14..12=2 6..0=0x53",
+    "FLT_D": "rd fs1:rs1 fs2:rs2 31..25=0x51 14..12=1 6..0=0x53",
+    "FLE_D": "rd fs1:rs1 fs2:rs2 31..25=0x51 14..12=0 6..0=0x53",
+    "FCLASS_D": "rd fs1:rs1 31..25=0x71 24..20=0 14..12=1 6..0=0x53",
+    "FCVT_W_D": "rd fs1:rs1 31..25=0x61 24..20=0 14..12=7 6..0=0x53",
+    "FCVT_WU_D": "rd fs1:rs1 31..25=0x61 24..20=1 14..12=7 6..0=0x53",
+    "FCVT_L_D": "rd fs1:rs1 31..25=0x61 24..20=2 14..12=7 6..0=0x53",
+    "FCVT_LU_D": "rd fs1:rs1 31..25=0x61 24..20=3 14..12=7 6..0=0x53",
+    "FCVT_D_W": "fd:rd rs1 31..25=0x69 24..20=0 14..12=0 6..0=0x53",
+    "FCVT_D_WU": "fd:rd rs1 31..25=0x69 24..20=1 14..12=0 6..0=0x53",
+    "FCVT_D_L": "fd:rd rs1 31..25=0x69 24..20=2 14..12=7 6..0=0x53",
+    "FCVT_D_LU": "fd:rd rs1 31..25=0x69 24..20=3 14..12=7 6..0=0x53",
+    "FMV_X_D": "rd fs1:rs1 31..25=0x71 24..20=0 14..12=0 6..0=0x53",
+    "FMV_D_X": "fd:rd rs1 31..25=0x79 24..20=0 14..12=0 6..0=0x53",
+    # RV32C/RV64C/RV32FC/RV32DC
+    "C_ADDI4SPN": "rd_p c_nzuimm10 15..13=0 1..0=0",
+    "C_FLD": "fd:rd_p rs1_p c_uimm8 15..13=1 1..0=0",
+    "C_LW": "rd_p rs1_p c_uimm7 15..13=2 1..0=0",
+    "C_FLW": "fd:rd_p rs1_p c_uimm7 15..13=3 1..0=0",
+    "C_LD": "rd_p rs1_p c_uimm8 15..13=3 1..0=0",
+    "C_FSD": "fs2:rs2_p rs1_p c_uimm8 15..13=5 1..0=0",
+    "C_SW": "rs2_p rs1_p c_uimm7 15..13=6 1..0=0",
+    "C_FSW": "fs2:rs2_p rs1_p c_uimm7 15..13=7 1..0=0",
+    "C_SD": "rs2_p rs1_p c_uimm8 15..13=7 1..0=0",
+    "C_NOP": "15..0=0x0001",
+    "C_ADDI": "rd c_imm6 15..13=0 1..0=1",
+    "C_JAL": "c_imm12 15..13=1 1..0=1",
+    "C_ADDIW": "rd c_imm6 15..13=1 1..0=1",
+    "C_LI": "rd c_imm6 15..13=2 1..0=1",
+    "C_ADDI16SP": "c_nzimm10 15..13=3 11..7=2 1..0=1",
+    "C_LUI": "rd c_imm6 15..13=3 1..0=1",
+    "C_SRLI": "rs1:rd_rs1_p c_imm6 15..13=4 11..10=0 1..0=1",
+    "C_SRAI": "rs1:rd_rs1_p c_imm6 15..13=4 11..10=1 1..0=1",
+    "C_ANDI": "rs1:rd_rs1_p c_imm6 15..13=4 11..10=2 1..0=1",
+    "C_SUB": "rd_rs1_p rs2_p 15..10=0x23 6..5=0 1..0=1",
+    "C_XOR": "rd_rs1_p rs2_p 15..10=0x23 6..5=1 1..0=1",
+    "C_OR": "rd_rs1_p rs2_p 15..10=0x23 6..5=2 1..0=1",
+    "C_AND": "rd_rs1_p rs2_p 15..10=0x23 6..5=3 1..0=1",
+    "C_SUBW": "rd_rs1_p rs2_p 15..10=0x27 6..5=0 1..0=1",
+    "C_ADDW": "rd_rs1_p rs2_p 15..10=0x27 6..5=1 1..0=1",
+    "C_J": "c_imm12 15..13=5 1..0=1",
+    "C_BEQZ": "rs1_p c_bimm9 15..13=6 1..0=1",
+    "C_BNEZ": "rs1_p c_bimm9 15..13=7 1..0=1",
+    "C_SLLI": "rd c_imm6 15..13=0 1..0=2",
+    "C_FLDSP": "fd:rd c_uimm9sp 15..13=1 1..0=2",
+    "C_LWSP": "rd c_uimm8sp 15..13=2 1..0=2",
+    "C_FLWSP": "fd:rd c_uimm8sp 15..13=3 1..0=2",
+    "C_LDSP": "rd c_uimm9sp 15..13=3 1..0=2",
+    "C_JR": "c_rs1 15..12=8 6..2=0 1..0=2",
+    "C_MV": "rd c_rs2 15..12=8 1..0=2",
+    "C_JALR": "c_rs1 15..12=9 6..2=0 1..0=2",
+    "C_ADD": "rd c_rs2 15..12=9 1..0=2",
+    "C_FSDSP": "fs2:c_rs2 c_uimm9sp_s 15..13=5 1..0=2",
+    "C_SWSP": "c_rs2 c_uimm8sp_s 15..13=6 1..0=2",
+    "C_FSWSP": "fs2:c_rs2 c_uimm8sp_s 15..13=7 1..0=2",
+    "C_SDSP": "c_rs2 c_uimm9sp_s 15..13=7 1..0=2",
+    # C.EBREAK is followed by C.NOP (see riscv_compressed_instr.get_asm_format)
+    "C_EBREAK": "31..16=0x0001 15..0=0x9002",
+    # RV32B/RV64B (draft 0.92)
+    "ANDN": "rd rs1 rs2 31..25=0x20 14..12=7 6..0=0x33",
+    "ORN": "rd rs1 rs2 31..25=0x20 14..12=6 6..0=0x33",
+    "XNOR": "rd rs1 rs2 31..25=0x20 14..12=4 6..0=0x33",
+    "SLO": "rd rs1 rs2 31..25=0x10 14..12=1 6..0=0x33",
+    "SRO": "rd rs1 rs2 31..25=0x10 14..12=5 6..0=0x33",
+    "ROL": "rd rs1 rs2 31..25=0x30 14..12=1 6..0=0x33",
+    "ROR": "rd rs1 rs2 31..25=0x30 14..12=5 6..0=0x33",
+    "SBCLR": "rd rs1 rs2 31..25=0x24 14..12=1 6..0=0x33",
+    "SBSET": "rd rs1 rs2 31..25=0x14 14..12=1 6..0=0x33",
+    "SBINV": "rd rs1 rs2 31..25=0x34 14..12=1 6..0=0x33",
+    "SBEXT": "rd rs1 rs2 31..25=0x24 14..12=5 6..0=0x33",
+    "GORC": "rd rs1 rs2 31..25=0x14 14..12=5 6..0=0x33",
+    "GREV": "rd rs1 rs2 31..25=0x34 14..12=5 6..0=0x33",
+    "SLOI": "rd rs1 shamt 31..26=0x08 14..12=1 6..0=0x13",
+    "SROI": "rd rs1 shamt 31..26=0x08 14..12=5 6..0=0x13",
+    "RORI": "rd rs1 shamt 31..26=0x18 14..12=5 6..0=0x13",
+    "SBCLRI": "rd rs1 shamt 31..26=0x12 14..12=1 6..0=0x13",
+    "SBSETI": "rd rs1 shamt 31..26=0x0a 14..12=1 6..0=0x13",
+    "SBINVI": "rd rs1 shamt 31..26=0x1a 14..12=1 6..0=0x13",
+    "SBEXTI": "rd rs1 shamt 31..26=0x12 14..12=5 6..0=0x13",
+    "GORCI": "rd rs1 shamt 31..26=0x0a 14..12=5 6..0=0x13",
+    "GREVI": "rd rs1 shamt 31..26=0x1a 14..12=5 6..0=0x13",
+    "CMIX": "rd rs1:rs2 rs2:rs1 rs3 26..25=3 14..12=1 6..0=0x33",
+    "CMOV": "rd rs1:rs2 rs2:rs1 rs3 26..25=3 14..12=5 6..0=0x33",
+    "FSL": "rd rs1 rs2:rs3 rs3:rs2 26..25=2 14..12=1 6..0=0x33",
+    "FSR": "rd rs1 rs2:rs3 rs3:rs2 26..25=2 14..12=5 6..0=0x33",
+    "FSRI": "rd rs1 rs3 shamt 26=1 14..12=5 6..0=0x13",
+    "CLZ": "rd rs1 31..20=0x600 14..12=1 6..0=0x13",
+    "CTZ": "rd rs1 31..20=0x601 14..12=1 6..0=0x13",
+    "PCNT": "rd rs1 31..20=0x602 14..12=1 6..0=0x13",
+    "BMATFLIP": "rd rs1 31..20=0x603 14..12=1 6..0=0x13",
+    "SEXT_B": "rd rs1 31..20=0x604 14..12=1 6..0=0x13",
+    "SEXT_H": "rd rs1 31..20=0x605 14..12=1 6..0=0x13",
+    "CRC32_B": "rd rs1 31..20=0x610 14..12=1 6..0=0x13",
+    "CRC32_H": "rd rs1 31..20=0x611 14..12=1 6..0=0x13",
+    "CRC32_W": "rd rs1 31..20=0x612 14..12=1 6..0=0x13",
+    "CRC32_D": "rd rs1 31..20=0x613 14..12=1 6..0=0x13",
+    "CRC32C_B": "rd rs1 31..20=0x618 14..12=1 6..0=0x13",
+    "CRC32C_H": "rd rs1 31..20=0x619 14..12=1 6..0=0x13",
+    "CRC32C_W": "rd rs1 31..20=0x61a 14..12=1 6..0=0x13",
+    "CRC32C_D": "rd rs1 31..20=0x61b 14..12=1 6..0=0x13",
+    "CLMUL": "rd rs1 rs2 31..25=0x05 14..12=1 6..0=0x33",
+    "CLMULR": "rd rs1 rs2 31..25=0x05 14..12=2 6..0=0x33",
+    "CLMULH": "rd rs1 rs2 31..25=0x05 14..12=3 6..0=0x33",
+    "MIN": "rd rs1 rs2 31..25=0x05 14..12=4 6..0=0x33",
+    "MAX": "rd rs1 rs2 31..25=0x05 14..12=5 6..0=0x33",
+    "MINU": "rd rs1 rs2 31..25=0x05 14..12=6 6..0=0x33",
+    "MAXU": "rd rs1 rs2 31..25=0x05 14..12=7 6..0=0x33",
+    "SHFL": "rd rs1 rs2 31..25=0x04 14..12=1 6..0=0x33",
+    "UNSHFL": "rd rs1 rs2 31..25=0x04 14..12=5 6..0=0x33",
+    "BDEP": "rd rs1 rs2 31..25=0x24 14..12=6 6..0=0x33",
+    "BEXT": "rd rs1 rs2 31..25=0x04 14..12=6 6..0=0x33",
+    "PACK": "rd rs1 rs2 31..25=0x04 14..12=4 6..0=0x33",
+    "PACKU": "rd rs1 rs2 31..25=0x24 14..12=4 6..0=0x33",
+    "PACKH": "rd rs1 rs2 31..25=0x04 14..12=7 6..0=0x33",
+    "BMATOR": "rd rs1 rs2 31..25=0x04 14..12=3 6..0=0x33",
+    "BMATXOR": "rd rs1 rs2 31..25=0x24 14..12=3 6..0=0x33",
+    "BFP": "rd rs1 rs2 31..25=0x24 14..12=7 6..0=0x33",
+    "SHFLI": "rd rs1 shamt 31..26=0x02 14..12=1 6..0=0x13",
+    "UNSHFLI": "rd rs1 shamt 31..26=0x02 14..12=5 6..0=0x13",
+    "ADDIWU": "rd rs1 imm12 14..12=4 6..0=0x1b",
+    "SLLIU_W": "rd rs1 shamt 31..26=0x02 14..12=1 6..0=0x1b",
+    "ADDWU": "rd rs1 rs2 31..25=0x05 14..12=0 6..0=0x3b",
+    "SUBWU": "rd rs1 rs2 31..25=0x25 14..12=0 6..0=0x3b",
+    "ADDU_W": "rd rs1 rs2 31..25=0x04 14..12=0 6..0=0x3b",
+    "SUBU_W": "rd rs1 rs2 31..25=0x24 14..12=0 6..0=0x3b",
+    "SLOW": "rd rs1 rs2 31..25=0x10 14..12=1 6..0=0x3b",
+    "SROW": "rd rs1 rs2 31..25=0x10 14..12=5 6..0=0x3b",
+    "ROLW": "rd rs1 rs2 31..25=0x30 14..12=1 6..0=0x3b",
+    "RORW": "rd rs1 rs2 31..25=0x30 14..12=5 6..0=0x3b",
+    "SBCLRW": "rd rs1 rs2 31..25=0x24 14..12=1 6..0=0x3b",
+    "SBSETW": "rd rs1 rs2 31..25=0x14 14..12=1 6..0=0x3b",
+    "SBINVW": "rd rs1 rs2 31..25=0x34 14..12=1 6..0=0x3b",
+    "SBEXTW": "rd rs1 rs2 31..25=0x24 14..12=5 6..0=0x3b",
+    "GORCW": "rd rs1 rs2 31..25=0x14 14..12=5 6..0=0x3b",
+    "GREVW": "rd rs1 rs2 31..25=0x34 14..12=5 6..0=0x3b",
+    "SLOIW": "rd rs1 shamtw 31..25=0x10 14..12=1 6..0=0x1b",
+    "SROIW": "rd rs1 shamtw 31..25=0x10 14..12=5 6..0=0x1b",
+    "RORIW": "rd rs1 shamtw 31..25=0x30 14..12=5 6..0=0x1b",
+    "SBCLRIW": "rd rs1 shamtw 31..25=0x24 14..12=1 6..0=0x1b",
+    "SBSETIW": "rd rs1 shamtw 31..25=0x14 14..12=1 6..0=0x1b",
+    "SBINVIW": "rd rs1 shamtw 31..25=0x34 14..12=1 6..0=0x1b",
+    "GORCIW": "rd rs1 shamtw 31..25=0x14 14..12=5 6..0=0x1b",
+    "GREVIW": "rd rs1 shamtw 31..25=0x34 14..12=5 6..0=0x1b",
+    "FSLW": "rd rs1 rs2:rs3 rs3:rs2 26..25=2 14..12=1 6..0=0x3b",
+    "FSRW": "rd rs1 rs2:rs3 rs3:rs2 26..25=2 14..12=5 6..0=0x3b",
+    "FSRIW": "rd rs1 rs3 shamtw 26..25=2 14..12=5 6..0=0x1b",
+    "CLZW": "rd rs1 31..20=0x600 14..12=1 6..0=0x1b",
+    "CTZW": "rd rs1 31..20=0x601 14..12=1 6..0=0x1b",
+    "PCNTW": "rd rs1 31..20=0x602 14..12=1 6..0=0x1b",
+    "CLMULW": "rd rs1 rs2 31..25=0x05 14..12=1 6..0=0x3b",
+    "CLMULRW": "rd rs1 rs2 31..25=0x05 14..12=2 6..0=0x3b",
+    "CLMULHW": "rd rs1 rs2 31..25=0x05 14..12=3 6..0=0x3b",
+    "SHFLW": "rd rs1 rs2 31..25=0x04 14..12=1 6..0=0x3b",
+    "UNSHFLW": "rd rs1 rs2 31..25=0x04 14..12=5 6..0=0x3b",
+    "BDEPW": "rd rs1 rs2 31..25=0x24 14..12=6 6..0=0x3b",
+    "BEXTW": "rd rs1 rs2 31..25=0x04 14..12=6 6..0=0x3b",
+    "PACKW": "rd rs1 rs2 31..25=0x04 14..12=4 6..0=0x3b",
+    "PACKUW": "rd rs1 rs2 31..25=0x24 14..12=4 6..0=0x3b",
+    "BFPW": "rd rs1 rs2 31..25=0x24 14..12=7 6..0=0x3b"
+}
+
+
+# Compiled encoding of an instruction: the fixed bits (match), the operand fields and the size
+# of the instruction in bytes
+class riscv_instr_encoding:
+    # Compiled encodings, per instruction name
+    encodings = {}
+
+    def __init__(self, spec):
+        self.match = 0
+        fields = []
+        operands = []
+        msb = 0
+        for token in spec.split():
+            if "=" in token:
+                bits, value = token.split("=")
+                hi, lo = (bits.split("..") * 2)[:2]
+                hi, lo = int(hi), int(lo)
+                self.match |= (int(value, 0) & ((1 << (hi - lo + 1)) - 1)) << lo
+                msb = max(msb, hi)
+            else:
+                attr, field = (token.split(":") * 2)[:2] if ":" in token else \
+                    (encoding_field[token][0], token)
+                segments = []
+                for hi, lo, pos in encoding_field[field][1]:
+                    segments.append((lo, (1 << (hi - lo + 1)) - 1, pos))
+                    msb = max(msb, pos + hi - lo)
+                fields.append((attr, tuple(segments)))
+                operands.append((attr, field))
+        self.fields = tuple(fields)
+        self.operands = tuple(operands)
+        self.size = 4 if msb > 15 else 2
+
+    # Encoding of the instruction name, compiled at the first use.
+    # riscv_instr_pkg is imported here, the tables are used without the generator configuration
+    # by the ELF emitter of run.py
+    @classmethod
+    def get(cls, instr_name):
+        encoding = cls.encodings.get(instr_name)
+        if encoding is None:
+            from pygen_src.riscv_instr_pkg import riscv_instr_name_t
+            spec = instr_encoding_table.get(riscv_instr_name_t(instr_name).name)
+            if spec is None:
+                logging.critical("Unsupported instruction encoding: {}".format(
+                                 riscv_instr_name_t(instr_name).name))
+                sys.exit(1)
+            encoding = cls(spec)
+            cls.encodings[instr_name] = encoding
+        return encoding
+
+    def encode(self, instr):
+        binary = self.match
+        for attr, segments in self.fields:
+            value = getattr(instr, attr)
+            for lo, mask, pos in segments:
+                binary |= ((value >> lo) & mask) << pos
+        return binary
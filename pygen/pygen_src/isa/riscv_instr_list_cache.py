@@ -0,0 +1,152 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import functools
+from collections import Counter, defaultdict
+
+
+# ---------------------------------------------------------------------------------------------
+# Cache of the instruction lists built by riscv_instr.create_instr_list. An entry holds the
+# lists of instruction names (instr_names, instr_group, instr_category, basic_instr) and the
+# CSR filters of a target and of the configuration fields read by create_instr_list, the key
+# of the entry is a digest of these values and of the sources which build the lists (see
+# get_source_digest), so the entries of other sources are never reused. The entries are kept in
+# memory and, when a cache directory is given, in JSON files shared by the generator processes.
+# Each lookup
+# is logged in the cache directory, the hit/miss counts are reported by:
+#   python3 pygen/pygen_src/isa/riscv_instr_list_cache.py <cache directory>
+# ---------------------------------------------------------------------------------------------
+class riscv_instr_list_cache:
+    # Version of the cache file format
+    version = 1
+    # Cache files in the directory: "<file_prefix>_<key>.json"
+    file_prefix = "instr_list"
+    # Lookups logged in the cache directory: "<memory|disk|miss> <key> <target>"
+    log_file_name = "instr_list_cache.log"
+
+    def __init__(self, path = ""):
+        self.path = path
+        self.entries = {}
+        # Lookup counts of the process
+        self.stats = Counter()
+
+    @staticmethod
+    def get_key(values):
+        data = json.dumps(values, sort_keys = True, default = str)
+        return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+    # Digest of the names and the contents of the files, computed once per process
+    @staticmethod
+    @functools.lru_cache(maxsize = None)
+    def get_source_digest(file_names):
+        digest = hashlib.sha1()
+        for file_name in sorted(file_names):
+            digest.update(os.path.basename(file_name).encode())
+            with open(file_name, "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    def get_file_name(self, key):
+        return os.path.join(self.path, "{}_{}.json".format(self.file_prefix, key))
+
+    # Return the entry of key from memory or from the cache directory, None when not cached
+    def get(self, key, target = ""):
+        entry = self.entries.get(key)
+        result = "memory"
+        if entry is None:
+            entry = self.load(key) if self.path else None
+            result = "miss" if entry is None else "disk"
+            if entry is not None:
+                self.entries[key] = entry
+        self.stats[result] += 1
+        if self.path:
+            self.log(result, key, target)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if self.path:
+            self.save(key, entry)
+
+    def load(self, key):
+        file_name = self.get_file_name(key)
+        if not os.path.exists(file_name):
+            return None
+        try:
+            with open(file_name) as f:
+                data = json.load(f)
+        except ValueError:
+            return None
+        if data.get("version") != self.version:
+            return None
+        return data["entry"]
+
+    # The file is renamed into place, the processes sharing the directory never read a
+    # partially written entry
+    def save(self, key, entry):
+        os.makedirs(self.path, exist_ok = True)
+        file_name = self.get_file_name(key)
+        tmp_file_name = "{}.{}".format(file_name, os.getpid())
+        with open(tmp_file_name, "w") as f:
+            json.dump({"version": self.version, "entry": entry}, f)
+        os.replace(tmp_file_name, file_name)
+
+    def log(self, result, key, target):
+        os.makedirs(self.path, exist_ok = True)
+        with open(os.path.join(self.path, self.log_file_name), "a") as f:
+            f.write("{} {} {}\n".format(result, key, target))
+
+    # Hit/miss counts of each entry logged in a cache directory
+    @classmethod
+    def report(cls, path):
+        counts = defaultdict(Counter)
+        targets = {}
+        log_file_name = os.path.join(path, cls.log_file_name)
+        if os.path.exists(log_file_name):
+            with open(log_file_name) as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) >= 2:
+                        counts[fields[1]][fields[0]] += 1
+                        targets[fields[1]] = fields[2] if len(fields) > 2 else ""
+        lines = ["{:<16} {:<12} {:>8} {:>8} {:>8} {:>6}".format(
+            "key", "target", "memory", "disk", "miss", "file")]
+        total = Counter()
+        for key, count in sorted(counts.items(), key = lambda item: targets[item[0]]):
+            total.update(count)
+            lines.append("{:<16} {:<12} {:>8} {:>8} {:>8} {:>6}".format(
+                key, targets[key], count["memory"], count["disk"], count["miss"],
+                "yes" if os.path.exists(os.path.join(
+                    path, "{}_{}.json".format(cls.file_prefix, key))) else "no"))
+        lookups = sum(total.values())
+        lines.append("{} lookups: {} memory hits, {} disk hits, {} misses, hit rate {:.1f}%".format(
+            lookups, total["memory"], total["disk"], total["miss"],
+            100.0 * (lookups - total["miss"]) / lookups if lookups else 0))
+        return "\n".join(lines)
+
+
+def main():
+    parse = argparse.ArgumentParser(description = "Report of an instruction list cache")
+    parse.add_argument('path', help = 'Cache directory (--instr_list_cache of the generator)')
+    args = parse.parse_args()
+    if not os.path.isdir(args.path):
+        sys.exit("No cache directory {}".format(args.path))
+    print(riscv_instr_list_cache.report(args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import types
+from collections import namedtuple
+
+
+# Immutable per-opcode descriptor shared by all the records of the same instruction.
+# template is the riscv_instr object created by riscv_instr.create_instr_list, it provides
+# the methods and the remaining static attributes (is_compressed, imm_align, has_fs1...).
+# imm_rand_mask and imm_nonzero_mask are the masks of the random immediate bits (see
+# riscv_instr.get_imm_rand_mask and riscv_instr.get_imm_nonzero_mask),
+# record_type is the record class of the instruction and operands the initial values of its
+# record_fields.
+class riscv_instr_desc(namedtuple("riscv_instr_desc",
+                                  ["instr_name", "format", "category", "group", "imm_type",
+                                   "imm_len", "imm_mask", "has_rs1", "has_rs2", "has_rd",
+                                   "has_imm", "imm_rand_mask", "imm_nonzero_mask", "template",
+                                   "record_type", "operands"])):
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, instr):
+        return cls(instr_name = instr.instr_name, format = instr.format,
+                   category = instr.category, group = instr.group,
+                   imm_type = instr.imm_type, imm_len = instr.imm_len,
+                   imm_mask = instr.imm_mask, has_rs1 = instr.has_rs1,
+                   has_rs2 = instr.has_rs2, has_rd = instr.has_rd,
+                   has_imm = instr.has_imm, imm_rand_mask = instr.get_imm_rand_mask(),
+                   imm_nonzero_mask = instr.get_imm_nonzero_mask(),
+                   template = instr,
+                   record_type = riscv_instr_record.get_record_type(instr.record_fields),
+                   operands = tuple(getattr(instr, field) for field in instr.record_fields))
+
+
+# Lightweight instruction object used for the random instructions of the instruction streams.
+# Only the per-instruction values are stored in the record, the opcode attributes are read
+# from the shared descriptor. Methods of the instruction class (convert2asm, get_instr_name,
+# post_randomize...) are called with the record as self, so a record can be used wherever a
+# riscv_instr object is read, but it cannot be randomized with the constraint solver.
+class riscv_instr_record:
+    __slots__ = ("desc", "is_branch_target", "has_label", "atomic", "branch_assigned",
+                 "process_load_store", "is_illegal_instr", "is_hint_instr", "comment",
+                 "label", "is_local_numeric_label", "idx")
+
+    # Record classes created for the operand fields of each instruction class
+    record_types = {}
+
+    def __init__(self, desc):
+        self.desc = desc
+        self.is_branch_target = None
+        self.has_label = 1
+        self.atomic = 0
+        self.branch_assigned = None
+        self.process_load_store = 1
+        self.is_illegal_instr = None
+        self.is_hint_instr = None
+        self.comment = ""
+        self.label = ""
+        self.is_local_numeric_label = None
+        self.idx = -1
+        for field, value in zip(type(self).__slots__, desc.operands):
+            setattr(self, field, value)
+
+    # Create a record of the instruction described by desc
+    @staticmethod
+    def create(desc):
+        return desc.record_type(desc)
+
+    # Return the record class holding the given record_fields as slots
+    @classmethod
+    def get_record_type(cls, fields):
+        record_type = cls.record_types.get(fields)
+        if record_type is None:
+            record_type = type("riscv_instr_record", (cls,), {"__slots__": fields})
+            cls.record_types[fields] = record_type
+        return record_type
+
+    # Copy the operand values of a randomized riscv_instr object to the record
+    def load_operands(self, instr):
+        for field in instr.record_fields:
+            setattr(self, field, getattr(instr, field))
+
+    def __getattr__(self, name):
+        if name == "desc":
+            raise AttributeError(name)
+        desc = self.desc
+        if name in desc._fields:
+            return getattr(desc, name)
+        attr = getattr(type(desc.template), name, None)
+        if isinstance(attr, types.FunctionType):
+            return types.MethodType(attr, self)
+        return getattr(desc.template, name)
@@ -10,10 +10,20 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 
+import os
+import glob
 import logging
 import random
 import copy
 import sys
+import functools
+import itertools
+import shutil
+import tempfile
+import traceback
+import signal
+import multiprocessing
+import multiprocessing.connection
 import vsc
 from importlib import import_module
 from pygen_src.riscv_instr_sequence import riscv_instr_sequence
@@ -27,8 +37,84 @@ from pygen_src.riscv_instr_gen_config import cfg
 from pygen_src.riscv_data_page_gen import riscv_data_page_gen
 from pygen_src.riscv_privileged_common_seq import riscv_privileged_common_seq
 from pygen_src.riscv_utils import factory
+from pygen_src.riscv_section_cache import riscv_section_cache
+from pygen_src.riscv_seed import derive_seed, seed_generator, seed_scope
 rcs = import_module("pygen_src.target." + cfg.argv.target + ".riscv_core_setting")
 
+# Fields read by the boilerplate sections, see memoize_section. The trap handling sections
+# read the fields of the handshake with the testbench, of the GPR push/pop to the kernel stack
+# and of the hart labels. The trap handlers also read the page tables, they are only memoized
+# without page tables (see has_no_page_table).
+handler_fields = ["cfg.gpr", "cfg.scratch_reg", "cfg.sp", "cfg.tp", "cfg.mstatus_mprv",
+                  "cfg.require_signature_addr", "cfg.signature_addr", "rcs.XLEN",
+                  "rcs.SATP_MODE", "rcs.NUM_HARTS", "rcs.implemented_csr"]
+trap_handler_fields = handler_fields + ["cfg.mtvec_mode", "cfg.check_xstatus",
+                                        "cfg.tvec_alignment", "cfg.disable_compressed_instr",
+                                        "rcs.max_interrupt_vector_num", "rcs.support_pmp"]
+interrupt_handler_fields = handler_fields + ["cfg.init_privileged_mode",
+                                             "cfg.enable_nested_interrupt",
+                                             "rcs.support_umode_trap"]
+trap_vector_fields = ["cfg.gpr", "cfg.mtvec_mode", "cfg.init_privileged_mode", "rcs.XLEN",
+                      "rcs.SATP_MODE", "rcs.NUM_HARTS", "rcs.supported_privileged_mode",
+                      "rcs.support_umode_trap"]
+header_fields = ["cfg.disable_compressed_instr", "cfg.num_of_harts", "cfg.scratch_reg"]
+stack_fields = ["cfg.use_push_data_section", "cfg.stack_len", "rcs.XLEN", "rcs.SATP_MODE",
+                "rcs.NUM_HARTS"]
+
+
+# Value of a field "<cfg|rcs|self>.<name>" of a section
+def get_field_value(program, field):
+    scope, name = field.split(".", 1)
+    return getattr({"cfg": cfg, "rcs": rcs, "self": program}[scope], name)
+
+
+# The page table objects are not part of the keys of the sections, the sections reading them
+# are generated from scratch when the program has page tables
+def has_no_page_table(program):
+    return not program.page_table_list
+
+
+# Sources of the sections of a program: the generator sources, the core setting file and the
+# module of the generator class
+@functools.lru_cache(maxsize = None)
+def get_section_sources(program_type):
+    src_dir = os.path.dirname(os.path.realpath(__file__))
+    return tuple(sorted(set(glob.glob(os.path.join(src_dir, "*.py")) +
+                            glob.glob(os.path.join(src_dir, "isa", "*.py")) +
+                            [os.path.realpath(rcs.__file__),
+                             os.path.realpath(sys.modules[program_type.__module__].__file__)])))
+
+
+# Memoize a boilerplate section of the program (--memoize_sections): the lines the section
+# appends to instr_stream are cached in riscv_asm_program_gen.section_cache, keyed by the values
+# of the fields it reads and by a digest of the sources (see get_section_sources), so the
+# entries of other sources are never reused. A class overriding a memoized section (or a method
+# it calls) has its own entries, when the override reads other fields, the class memoizes it
+# with its own list of fields. When memoize_if is given, the section is only memoized when
+# memoize_if(program) is true.
+def memoize_section(fields, memoize_if = None):
+    def decorator(gen_section):
+        @functools.wraps(gen_section)
+        def wrapper(self, *args):
+            if not cfg.memoize_sections or (memoize_if is not None and not memoize_if(self)):
+                return gen_section(self, *args)
+            self.section_cache.path = cfg.section_cache
+            key = self.section_cache.get_key([type(self).__qualname__, gen_section.__name__,
+                                              args, cfg.argv.target,
+                                              [get_field_value(self, field)
+                                               for field in fields],
+                                              self.section_cache.get_source_digest(
+                                                  get_section_sources(type(self)))])
+            lines = self.section_cache.get(key, cfg.argv.target)
+            if lines is None:
+                start = len(self.instr_stream)
+                gen_section(self, *args)
+                self.section_cache.put(key, self.instr_stream[start:])
+            else:
+                self.instr_stream.extend(lines)
+        return wrapper
+    return decorator
+
 
 # ----------------------------------------------------------------------------------
 # RISC-V assembly program generator
@@ -39,6 +125,11 @@ rcs = import_module("pygen_src.target." + cfg.argv.target + ".riscv_core_setting
 # ----------------------------------------------------------------------------------
 
 class riscv_asm_program_gen:
+    # Lines of the boilerplate sections, shared by the programs of the worker
+    section_cache = riscv_section_cache()
+    # Lines per write and size of the file buffer of gen_test_file
+    asm_write_chunk = 4096
+    asm_write_buffer = 1 << 20
 
     def __init__(self):
         self.instr_stream = []
@@ -49,6 +140,12 @@ class riscv_asm_program_gen:
         self.main_program = []
         self.sub_program = []
         self.data_page_gen = None
+        # Name of the assembly test, the data page binaries are named after it
+        self.test_name = ""
+        # Seed of the test, root of the seed tree of the sections (see riscv_seed)
+        self.seed = None
+        # Sentinel of each worker process (pid: file descriptor), see fork_worker
+        self.worker_sentinels = {}
 
     # ----------------------------------------------------------------------------------
     # Main function to generate the whole program
@@ -57,98 +154,170 @@ class riscv_asm_program_gen:
     # This is the main function to generate all sections of the program.
     def gen_program(self):
         self.instr_stream.clear()
+        if self.seed is None:
+            self.seed = random.getrandbits(64)
         # Generate program header
         self.gen_program_header()
+        if cfg.hart_workers > 0:
+            # The sections of each hart are generated in processes of their own
+            self.gen_hart_sections()
+            return
+        # The sections of each hart are generated with the random state of their node of the
+        # seed tree, the same as in gen_hart_files
+        for hart in range(cfg.num_of_harts):
+            with seed_scope(self.seed, "hart", hart, "program"):
+                self.gen_hart_program(hart)
         for hart in range(cfg.num_of_harts):
-            # Commenting out for now
-            # TODO support for sub_program
-            # sub_program_name = []
-            self.instr_stream.append(f"h{int(hart)}_start:")
-            if not cfg.bare_program_mode:
-                self.setup_misa()
-                # Create all page tables
-                self.create_page_table(hart)
-                # Setup privileged mode registers and enter target privileged mode
-                self.pre_enter_privileged_mode(hart)
-            # Init section
-            self.gen_init_section(hart)
-            '''
-            If PMP is supported, we want to generate the associated trap handlers and the test_done
-            section at the start of the program so we can allow access through the pmpcfg0 CSR
-            '''
-            if(rcs.support_pmp and not(cfg.bare_program_mode)):
-                self.gen_trap_handlers(hart)
-                # Ecall handler
-                self.gen_ecall_handler(hart)
-                # Instruction fault handler
-                self.gen_instr_fault_handler(hart)
-                # Load fault handler
-                self.gen_load_fault_handler(hart)
-                # Store fault handler
-                self.gen_store_fault_handler(hart)
-                if hart == 0:
-                    self.gen_test_done()
-            # Generate sub program
-            # TODO gen_sub_program()
-            # Generate main program
-            gt_lbl_str = pkg_ins.get_label("main", hart)
-            label_name = gt_lbl_str
-            gt_lbl_str = riscv_instr_sequence()
-            self.main_program.append(gt_lbl_str)
-            self.main_program[hart].instr_cnt = cfg.main_program_instr_cnt
-            self.main_program[hart].is_debug_program = 0
-            self.main_program[hart].label_name = label_name
+            with seed_scope(self.seed, "hart", hart, "data"):
+                self.gen_hart_data(hart)
+
+    # Generate the program and the data sections of each hart in its own process forked from
+    # this process, at most cfg.hart_workers processes at a time. The sections are written to
+    # temporary files read back in hart order as the test file is written, the test is the
+    # same for any number of workers.
+    def gen_hart_sections(self):
+        hart_dir = tempfile.mkdtemp(prefix = "harts_", dir = os.path.dirname(
+            os.path.abspath(self.test_name)))
+        file_names = [(os.path.join(hart_dir, "h{}_program.S".format(hart)),
+                       os.path.join(hart_dir, "h{}_data.S".format(hart)))
+                      for hart in range(cfg.num_of_harts)]
+        workers = {}
+        failed_harts = []
+        for hart in range(cfg.num_of_harts):
+            if len(workers) >= cfg.hart_workers:
+                failed_harts.extend(self.wait_worker(workers))
+            workers[self.fork_worker(self.gen_hart_files, hart, *file_names[hart])] = hart
+        while workers:
+            failed_harts.extend(self.wait_worker(workers))
+        if failed_harts:
+            shutil.rmtree(hart_dir, ignore_errors = True)
+            logging.critical("Cannot generate the sections of harts %0s", sorted(failed_harts))
+            sys.exit(1)
+        self.instr_stream.append(self.iter_file_lines([program_file_name for program_file_name, _
+                                                       in file_names]))
+        self.instr_stream.append(self.iter_file_lines([data_file_name for _, data_file_name
+                                                       in file_names], hart_dir))
+
+    # Write the program and the data sections of a hart to program_file_name and data_file_name,
+    # each with the random state of its node of the seed tree
+    def gen_hart_files(self, hart, program_file_name, data_file_name):
+        # The main programs of the other harts are generated by other processes
+        self.main_program.extend([None] * (hart - len(self.main_program)))
+        for gen_sections, node, file_name in [(self.gen_hart_program, "program",
+                                               program_file_name),
+                                              (self.gen_hart_data, "data", data_file_name)]:
+            self.instr_stream = []
+            with seed_scope(self.seed, "hart", hart, node):
+                gen_sections(hart)
+                with open(file_name, "w", buffering = self.asm_write_buffer) as file:
+                    self.write_lines(file, self.iter_lines())
+
+    # Program of a hart: init section, main program, test done and program end
+    def gen_hart_program(self, hart):
+        # Commenting out for now
+        # TODO support for sub_program
+        # sub_program_name = []
+        self.instr_stream.append(f"h{int(hart)}_start:")
+        if not cfg.bare_program_mode:
+            self.setup_misa()
+            # Create all page tables
+            self.create_page_table(hart)
+            # Setup privileged mode registers and enter target privileged mode
+            self.pre_enter_privileged_mode(hart)
+        # Init section
+        self.gen_init_section(hart)
+        '''
+        If PMP is supported, we want to generate the associated trap handlers and the test_done
+        section at the start of the program so we can allow access through the pmpcfg0 CSR
+        '''
+        if(rcs.support_pmp and not(cfg.bare_program_mode)):
+            self.gen_trap_handlers(hart)
+            # Ecall handler
+            self.gen_ecall_handler(hart)
+            # Instruction fault handler
+            self.gen_instr_fault_handler(hart)
+            # Load fault handler
+            self.gen_load_fault_handler(hart)
+            # Store fault handler
+            self.gen_store_fault_handler(hart)
+            if hart == 0:
+                self.gen_test_done()
+        # Generate sub program
+        # TODO gen_sub_program()
+        # Generate main program
+        gt_lbl_str = pkg_ins.get_label("main", hart)
+        label_name = gt_lbl_str
+        gt_lbl_str = riscv_instr_sequence()
+        self.main_program.append(gt_lbl_str)
+        self.main_program[hart].instr_cnt = cfg.main_program_instr_cnt
+        self.main_program[hart].is_debug_program = 0
+        self.main_program[hart].label_name = label_name
+        if cfg.main_program_segments > 0:
+            # The segments of the main program are generated in parallel processes
+            self.instr_stream.append(self.gen_main_program_segments(hart))
+        elif cfg.main_program_window > 0:
+            # The main program is generated window by window as the test file is written
+            self.instr_stream.append(self.gen_main_program_windows(hart))
+        else:
             self.generate_directed_instr_stream(hart=hart,
                                                 label=self.main_program[hart].label_name,
                                                 original_instr_cnt=
                                                 self.main_program[hart].instr_cnt,
                                                 min_insert_cnt=1,
-                                                instr_stream=self.main_program[hart].directed_instr)
-            self.main_program[hart].gen_instr(is_main_program=1, no_branch=cfg.no_branch_jump)
+                                                instr_stream=
+                                                self.main_program[hart].directed_instr)
+            self.main_program[hart].gen_instr(is_main_program=1,
+                                              no_branch=cfg.no_branch_jump)
             # Setup jump instruction among main program and sub programs
             # TODO gen_callstack()
             self.main_program[hart].post_process_instr()
             logging.info("Post-processing main program...done")
-            self.main_program[hart].generate_instr_stream()
-            logging.info("Generating main program instruction stream...done")
-            self.instr_stream.extend(self.main_program[hart].instr_string_list)
-            """
-            If PMP is supported, need to jump from end of main program
-            to test_done section at the end of main_program, as the test_done
-            will have moved to the beginning of the program
-            """
-            self.instr_stream.extend(("{}la x{}, test_done".format(pkg_ins.indent, cfg.scratch_reg),
-                                      "{}jalr x0, x{}, 0".format(pkg_ins.indent, cfg.scratch_reg)))
-            # Test done section
-            # If PMP isn't supported, generate this in the normal location
-            if(hart == 0 and not(rcs.support_pmp)):
-                self.gen_test_done()
-            # Shuffle the sub programs and insert to the instruction stream
-            # TODO inser_sub_program()
-            logging.info("Main/sub program generation...done")
-            # program end
-            self.gen_program_end(hart)
-            if not cfg.bare_program_mode:
-                # Generate debug rom section
-                if rcs.support_debug_mode:
-                    self.gen_debug_rom(hart)
-                self.gen_section(pkg_ins.hart_prefix(hart) + "instr_end", ["nop"])
-        for hart in range(cfg.num_of_harts):
-            # Starting point of data section
-            self.gen_data_page_begin(hart)
-            if not cfg.no_data_page:
-                # User data section
-                self.gen_data_page(hart)
-                # AMO memory region
-                if(hart == 0 and riscv_instr_group_t.RV32A in rcs.supported_isa):
-                    self.gen_data_page(hart, amo = 1)
-            # Stack section
-            self.gen_stack_section(hart)
-            if not cfg.bare_program_mode:
-                # Generate kernel program/data/stack section
-                self.gen_kernel_sections(hart)
-                # Page table
-                self.gen_page_table_section(hart)
+            if cfg.stream_asm:
+                # The lines of the main program are formatted when the test file is written
+                self.instr_stream.append(self.main_program[hart].iter_instr_stream())
+            else:
+                self.main_program[hart].generate_instr_stream()
+                self.instr_stream.extend(self.main_program[hart].instr_string_list)
+        logging.info("Generating main program instruction stream...done")
+        """
+        If PMP is supported, need to jump from end of main program
+        to test_done section at the end of main_program, as the test_done
+        will have moved to the beginning of the program
+        """
+        self.instr_stream.extend(("{}la x{}, test_done".format(pkg_ins.indent, cfg.scratch_reg),
+                                  "{}jalr x0, x{}, 0".format(pkg_ins.indent, cfg.scratch_reg)))
+        # Test done section
+        # If PMP isn't supported, generate this in the normal location
+        if(hart == 0 and not(rcs.support_pmp)):
+            self.gen_test_done()
+        # Shuffle the sub programs and insert to the instruction stream
+        # TODO inser_sub_program()
+        logging.info("Main/sub program generation...done")
+        # program end
+        self.gen_program_end(hart)
+        if not cfg.bare_program_mode:
+            # Generate debug rom section
+            if rcs.support_debug_mode:
+                self.gen_debug_rom(hart)
+            self.gen_section(pkg_ins.hart_prefix(hart) + "instr_end", ["nop"])
+
+    # Data, stack and kernel sections of a hart
+    def gen_hart_data(self, hart):
+        # Starting point of data section
+        self.gen_data_page_begin(hart)
+        if not cfg.no_data_page:
+            # User data section
+            self.gen_data_page(hart)
+            # AMO memory region
+            if(hart == 0 and riscv_instr_group_t.RV32A in rcs.supported_isa):
+                self.gen_data_page(hart, amo = 1)
+        # Stack section
+        self.gen_stack_section(hart)
+        if not cfg.bare_program_mode:
+            # Generate kernel program/data/stack section
+            self.gen_kernel_sections(hart)
+            # Page table
+            self.gen_page_table_section(hart)
 
     # ----------------------------------------------------------------------------------
     # Generate kernel program/data/stack sections
@@ -213,6 +382,7 @@ class riscv_asm_program_gen:
     # Major sections - init, stack, data, test_done etc.
     # ----------------------------------------------------------------------------------
 
+    @memoize_section(header_fields)
     def gen_program_header(self):
         header_string = []
         self.instr_stream.extend((".include \"user_define.h\"", ".globl _start", ".section .text"))
@@ -242,9 +412,17 @@ class riscv_asm_program_gen:
 
     def gen_data_page(self, hart, is_kernel = 0, amo = 0):
         self.data_page_gen = riscv_data_page_gen()
-        self.data_page_gen.gen_data_page(hart, cfg.data_page_pattern, is_kernel, amo)
+        incbin_prefix = ""
+        if cfg.data_page_incbin:
+            if self.test_name == "":
+                logging.critical("The test name is required by data_page_incbin")
+                sys.exit(1)
+            incbin_prefix = os.path.splitext(os.path.abspath(self.test_name))[0]
+        self.data_page_gen.gen_data_page(hart, cfg.data_page_pattern, is_kernel, amo,
+                                         incbin_prefix)
         self.instr_stream.extend(self.data_page_gen.data_page_str)
 
+    @memoize_section(stack_fields)
     def gen_stack_section(self, hart):
         hart_prefix_string = pkg_ins.hart_prefix(hart)
         if cfg.use_push_data_section:
@@ -267,6 +445,7 @@ class riscv_asm_program_gen:
             self.instr_stream.append(".popsection;")
 
     # The kernal stack is used to save user program context before executing exception handling
+    @memoize_section(stack_fields)
     def gen_kernel_stack_section(self, hart):
         hart_prefix_string = pkg_ins.hart_prefix(hart)
         if cfg.use_push_data_section:
@@ -589,6 +768,7 @@ class riscv_asm_program_gen:
         pass
 
     # Setup trap vector - MTVEC, STVEC, UTVEC
+    @memoize_section(trap_vector_fields)
     def trap_vector_init(self, hart):
         instr = []
         for mode in rcs.supported_privileged_mode:
@@ -627,6 +807,7 @@ class riscv_asm_program_gen:
     # ---------------------------------------------------------------------------------------
 
     # Trap handling routine
+    @memoize_section(trap_handler_fields, has_no_page_table)
     def gen_all_trap_handler(self, hart):
         instr = []
         # If PMP isn't supported, generate the relevant trap handler sections as per usual
@@ -657,6 +838,7 @@ class riscv_asm_program_gen:
             instr.append("nop")
         self.gen_section(pkg_ins.get_label("pt_fault_handler", hart), instr)
 
+    @memoize_section(trap_handler_fields, has_no_page_table)
     def gen_trap_handlers(self, hart):
         # TODO
         self.gen_trap_handler_section(hart, "m", privileged_reg_t.MCAUSE,
@@ -777,6 +959,7 @@ class riscv_asm_program_gen:
     # It does some clean up like dump GPRs before communicating with host to terminate the test.
     # User can extend this function if some custom clean up routine is needed.
 
+    @memoize_section(handler_fields)
     def gen_ecall_handler(self, hart):
         instr = []
         self.dump_perf_stats(instr)
@@ -804,6 +987,7 @@ class riscv_asm_program_gen:
     # 4 and resumes execution. The way that the illegal instruction is injected guarantees that
     # PC + 4 is a valid instruction boundary.
     # TODO: handshake the corret Xcause CSR based on delegation setup
+    @memoize_section(handler_fields)
     def gen_illegal_instr_handler(self, hart):
         instr = []
         self.gen_signature_handshake(instr, signature_type_t.CORE_STATUS,
@@ -858,6 +1042,7 @@ class riscv_asm_program_gen:
         pass
 
     # Interrupt handler routine
+    @memoize_section(interrupt_handler_fields)
     def gen_interrupt_handler_section(self, mode, hart):
         interrupt_handler_instr = []
         # ls_unit = "w" if rcs.XLEN == 32 else "d"
@@ -958,13 +1143,56 @@ class riscv_asm_program_gen:
         pass
 
     # Write the generated program to a file
+    # The lines are written by blocks of asm_write_chunk lines through a large file buffer. An
+    # item of instr_stream is either a line or, with cfg.stream_asm, an iterator of the lines of
+    # a section which are formatted as they are written.
     def gen_test_file(self, test_name):
-        file = open(test_name, "w+")
-        for items in self.instr_stream:
-            file.write("{}\n".format(items))
-
-        file.close()
+        with open(test_name, "w", buffering = self.asm_write_buffer) as file:
+            self.write_lines(file, self.iter_lines())
         logging.info("{} is generated".format(test_name))
+        if cfg.mem_image:
+            self.gen_mem_image(test_name)
+
+    def write_lines(self, file, lines):
+        while True:
+            block = list(itertools.islice(lines, self.asm_write_chunk))
+            if not block:
+                break
+            file.write("\n".join(block))
+            file.write("\n")
+
+    # Lines of the program
+    def iter_lines(self):
+        for item in self.instr_stream:
+            if isinstance(item, str):
+                yield item
+            else:
+                yield from item
+
+    # Write the memory images of the program for the RTL simulation, the sections are placed
+    # at the addresses of the linker script by the ELF emitter, as riscv-gcc does in run.py.
+    # The ELF emitter is only imported when the memory images are written.
+    def gen_mem_image(self, test_name):
+        from pygen_src.riscv_elf_emitter import emit_mem_image
+        root = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+        extensions = set("".join(isa.name[4:].lower() for isa in rcs.supported_isa))
+        isa = "rv{}{}".format(rcs.XLEN, "".join(extension for extension in "imafdcb"
+                                                if extension in extensions))
+        if cfg.disable_compressed_instr:
+            isa = isa.replace("c", "")
+        mabi = "ilp32" if rcs.XLEN == 32 else "lp64"
+        prefix = os.path.splitext(test_name)[0]
+        if not all(isinstance(item, str) for item in self.instr_stream):
+            # The streamed sections are only in the test file
+            with open(test_name) as file:
+                lines = file.read().splitlines()
+        else:
+            lines = "\n".join(self.instr_stream).splitlines()
+        emit_mem_image(lines, prefix, cfg.mem_image, isa, mabi,
+                       [os.path.join(root, "user_extension")],
+                       os.path.join(root, "scripts", "link.ld"))
+        logging.info("{}.{{{}}} memory images are generated".format(
+            prefix, ",".join(cfg.mem_image)))
 
     # Helper function to generate the proper sequence of handshake instructions
     # to signal the testbench (see riscv_signature_pkg.sv)
@@ -1050,21 +1278,32 @@ class riscv_asm_program_gen:
                 stream_freq = cfg.args_dict[stream_freq_opts]
                 self.add_directed_instr_stream(stream_name, stream_freq)
 
-    # Generate directed instruction stream based on the ratio setting
+    # Insertion count of each directed instruction stream based on the ratio setting
+    def get_directed_instr_insert_cnt(self, original_instr_cnt = 0, min_insert_cnt = 0):
+        instr_insert_cnt = {}
+        for instr_stream_name in self.directed_instr_stream_ratio:
+            instr_insert_cnt[instr_stream_name] = int(
+                original_instr_cnt * self.directed_instr_stream_ratio[instr_stream_name] // 1000)
+            if instr_insert_cnt[instr_stream_name] <= min_insert_cnt:
+                instr_insert_cnt[instr_stream_name] = min_insert_cnt
+        return instr_insert_cnt
+
+    # Generate directed instruction stream based on the ratio setting, or on the insertion
+    # counts of instr_insert_cnt when given. The streams are labeled from start_idx.
     def generate_directed_instr_stream(self, hart = 0, label = "", original_instr_cnt = 0,
-                                       min_insert_cnt = 0, kernel_mode = 0, instr_stream = []):
-        instr_insert_cnt = 0
-        idx = 0
+                                       min_insert_cnt = 0, kernel_mode = 0, instr_stream = [],
+                                       instr_insert_cnt = None, start_idx = 0):
+        idx = start_idx
         if cfg.no_directed_instr:
             return
-        for instr_stream_name in self.directed_instr_stream_ratio:
-            instr_insert_cnt = int(original_instr_cnt *
-                                   self.directed_instr_stream_ratio[instr_stream_name] // 1000)
-            if instr_insert_cnt <= min_insert_cnt:
-                instr_insert_cnt = min_insert_cnt
+        if instr_insert_cnt is None:
+            instr_insert_cnt = self.get_directed_instr_insert_cnt(original_instr_cnt,
+                                                                  min_insert_cnt)
+        for instr_stream_name in instr_insert_cnt:
             logging.info("Insert directed instr stream %0s %0d/%0d times",
-                         instr_stream_name, instr_insert_cnt, original_instr_cnt)
-            for i in range(instr_insert_cnt):
+                         instr_stream_name, instr_insert_cnt[instr_stream_name],
+                         original_instr_cnt)
+            for i in range(instr_insert_cnt[instr_stream_name]):
                 name = "{}_{}".format(instr_stream_name, i)
                 object_h = factory(instr_stream_name)
                 object_h.name = name
@@ -1076,7 +1315,11 @@ class riscv_asm_program_gen:
                     new_instr_stream.hart = hart
                     new_instr_stream.label = "{}_{}".format(label, idx)
                     new_instr_stream.kernel_mode = kernel_mode
-                    new_instr_stream.randomize()
+                    # A stream is randomized with the random state of its node of the seed
+                    # tree, the same in a whole program, a window or a segment
+                    with seed_scope(self.seed, "hart", hart, "directed_instr",
+                                    new_instr_stream.label):
+                        new_instr_stream.randomize()
                     instr_stream.append(new_instr_stream)
                 else:
                     logging.critical("Cannot Create instr stream %0s", name)
@@ -1084,6 +1327,177 @@ class riscv_asm_program_gen:
                 idx += 1
         random.shuffle(instr_stream)
 
+    # Generate the main program of a hart by windows of cfg.main_program_window instructions,
+    # see riscv_instr_sequence.iter_instr_windows. The insertion counts of the directed
+    # instruction streams are the ones of the whole program, distributed over the windows in
+    # proportion to their size.
+    def gen_main_program_windows(self, hart):
+        main_program = self.main_program[hart]
+        instr_cnt = main_program.instr_cnt
+        instr_insert_cnt = self.get_directed_instr_insert_cnt(instr_cnt, 1)
+        main_program.seed = derive_seed(self.seed, "hart", hart, "main_program")
+
+        def gen_directed_instr(start, end):
+            directed_instr = []
+            self.gen_directed_instr_range(hart, main_program.label_name, instr_insert_cnt,
+                                          instr_cnt, start, end, directed_instr)
+            return directed_instr
+        return main_program.iter_instr_windows(cfg.main_program_window, gen_directed_instr,
+                                               no_branch=cfg.no_branch_jump)
+
+    # Generate the directed instruction streams of the instructions [start, end) of a program of
+    # instr_cnt instructions, the insertion counts instr_insert_cnt of the whole program are
+    # distributed in proportion to the size of the range. The streams are labeled as the ones
+    # of the whole program.
+    def gen_directed_instr_range(self, hart, label, instr_insert_cnt, instr_cnt, start, end,
+                                 instr_stream):
+        range_insert_cnt = {name: cnt * end // instr_cnt - cnt * start // instr_cnt
+                            for name, cnt in instr_insert_cnt.items()}
+        self.generate_directed_instr_stream(hart=hart, label=label,
+                                            original_instr_cnt=end - start,
+                                            instr_stream=instr_stream,
+                                            instr_insert_cnt=range_insert_cnt,
+                                            start_idx=sum(cnt * start // instr_cnt for cnt
+                                                          in instr_insert_cnt.values()))
+
+    # Generate the main program of a hart in cfg.main_program_segments segments of about the
+    # same instruction count, each segment is generated in its own process forked from this
+    # process with the random state of its node of the seed tree. The directed instruction
+    # streams and the illegal/HINT instructions of the whole program are distributed over the
+    # segments in proportion to their size. The branches of a segment target the labels of the
+    # segment, the local labels of the segments are renumbered after the ones of the previous
+    # segments, the label counts and offsets are exchanged through a pipe. The segments are
+    # written to temporary files read back as the test file is written.
+    def gen_main_program_segments(self, hart):
+        instr_cnt = self.main_program[hart].instr_cnt
+        segment_cnt = max(1, min(cfg.main_program_segments, instr_cnt))
+        bounds = [instr_cnt * k // segment_cnt for k in range(segment_cnt + 1)]
+        instr_insert_cnt = self.get_directed_instr_insert_cnt(instr_cnt, 1)
+        segment_dir = tempfile.mkdtemp(prefix = "main_program_", dir = os.path.dirname(
+            os.path.abspath(self.test_name)))
+        file_names = [os.path.join(segment_dir, "segment_{}.S".format(k))
+                      for k in range(segment_cnt)]
+        segments = []
+        for k in range(segment_cnt):
+            conn, child_conn = multiprocessing.Pipe()
+            pid = self.fork_worker(self.run_main_program_segment, child_conn, hart, k, bounds[k],
+                                   bounds[k + 1], instr_insert_cnt, file_names[k])
+            child_conn.close()
+            segments.append((pid, conn))
+        label_idx = 0
+        failed_pid = None
+        for pid, conn in segments:
+            if failed_pid is None:
+                try:
+                    label_cnt = conn.recv()
+                    conn.send(label_idx)
+                    label_idx += label_cnt
+                except (EOFError, OSError):
+                    # The process of the segment failed, the other segments are terminated
+                    failed_pid = pid
+                    for other_pid, _ in segments:
+                        if other_pid != pid:
+                            os.kill(other_pid, signal.SIGTERM)
+            conn.close()
+        workers = {pid: k for k, (pid, _) in enumerate(segments)}
+        failed_segments = []
+        while workers:
+            failed_segments.extend(self.wait_worker(workers))
+        if failed_pid is not None:
+            failed_segments = [k for k, (pid, _) in enumerate(segments) if pid == failed_pid]
+        if failed_segments:
+            shutil.rmtree(segment_dir, ignore_errors = True)
+            logging.critical("Cannot generate segments %0s of the main program",
+                             sorted(failed_segments))
+            sys.exit(1)
+        logging.info("Generated %0d segments of the main program, %0d labels", segment_cnt,
+                     label_idx)
+        return self.iter_file_lines(file_names, segment_dir)
+
+    # Process of the segment k of the main program of a hart, the label count of the segment is
+    # sent to the generator process which replies with the label offset of the segment
+    def run_main_program_segment(self, conn, *args):
+        def get_label_offset(label_cnt):
+            conn.send(label_cnt)
+            return conn.recv()
+        self.gen_main_program_segment(*args, get_label_offset)
+
+    # Generate the segment k (instructions [start, end)) of the main program of a hart to
+    # file_name, get_label_offset gives the offset of the local labels of the segment from its
+    # label count
+    def gen_main_program_segment(self, hart, k, start, end, instr_insert_cnt, file_name,
+                                 get_label_offset):
+        seed_generator(derive_seed(self.seed, "hart", hart, "main_program", "segment", k))
+        instr_cnt = self.main_program[hart].instr_cnt
+        main_program = riscv_instr_sequence()
+        main_program.instr_cnt = end - start
+        main_program.is_debug_program = 0
+        main_program.label_name = self.main_program[hart].label_name
+        self.gen_directed_instr_range(hart, main_program.label_name, instr_insert_cnt,
+                                      instr_cnt, start, end, main_program.directed_instr)
+        main_program.gen_instr(is_main_program=1, no_branch=cfg.no_branch_jump)
+        label_cnt, branch_pos = main_program.post_process_segment()
+        main_program.renumber_local_labels(get_label_offset(label_cnt), branch_pos)
+        illegal_instr_cnt = int(instr_cnt * cfg.illegal_instr_ratio / 1000)
+        hint_instr_cnt = int(instr_cnt * cfg.hint_instr_ratio / 1000)
+        lines = main_program.iter_instr_stream(
+            no_label = int(k > 0),
+            illegal_instr_cnt = illegal_instr_cnt * end // instr_cnt -
+            illegal_instr_cnt * start // instr_cnt,
+            hint_instr_cnt = hint_instr_cnt * end // instr_cnt -
+            hint_instr_cnt * start // instr_cnt)
+        with open(file_name, "w", buffering = self.asm_write_buffer) as file:
+            self.write_lines(file, lines)
+
+    # Run target(*args) in a process forked from this process and return its pid. The worker
+    # processes of the tests (see riscv_instr_base_test) are daemonic and cannot start
+    # multiprocessing processes, the process is forked with os.fork and waited by wait_worker.
+    # The process holds the write end of a pipe, its read end (the sentinel of the process) is
+    # ready once the process exits.
+    def fork_worker(self, target, *args):
+        for stream in [sys.stdout, sys.stderr]:
+            stream.flush()
+        sentinel, sentinel_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(sentinel)
+            status = 0
+            try:
+                target(*args)
+            except BaseException:
+                logging.critical(traceback.format_exc())
+                status = 1
+            for stream in [sys.stdout, sys.stderr]:
+                stream.flush()
+            os._exit(status)
+        os.close(sentinel_w)
+        self.worker_sentinels[pid] = sentinel
+        return pid
+
+    # Wait for a process of workers (pid: index), return the index of the failed process.
+    # Only the worker processes are waited, the other children of the process are left to
+    # their owner.
+    def wait_worker(self, workers):
+        sentinels = {self.worker_sentinels[pid]: pid for pid in workers}
+        sentinel = multiprocessing.connection.wait(list(sentinels))[0]
+        pid = sentinels[sentinel]
+        os.close(self.worker_sentinels.pop(pid))
+        _, status = os.waitpid(pid, 0)
+        index = workers.pop(pid)
+        return [index] if status != 0 else []
+
+    # Lines of the temporary files of the program, the directory remove_dir is removed once
+    # the files are read
+    def iter_file_lines(self, file_names, remove_dir = None):
+        try:
+            for file_name in file_names:
+                with open(file_name) as file:
+                    for line in file:
+                        yield line[:-1]
+        finally:
+            if remove_dir:
+                shutil.rmtree(remove_dir, ignore_errors = True)
+
     # ----------------------------------------------------------------------------------
     # Generate the debug ROM, and any related programs
     # ----------------------------------------------------------------------------------
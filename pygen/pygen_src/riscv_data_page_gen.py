@@ -31,21 +31,47 @@ class riscv_data_page_gen:
 
     # The data section can be initialized with different data pattern:
     # - Random value, incremental value, all zeros
+    # The data of the chunks of num_of_bytes at 32-byte steps are generated at once
     @staticmethod
-    def gen_data(idx, pattern, num_of_bytes, data):
-        temp_data = 0
-        data = [0] * num_of_bytes
-        for i in range(len(data)):
-            if pattern == data_pattern_t.RAND_DATA:
-                temp_data = random.randrange(0, (2**8) - 1)
-                data[i] = temp_data
-            elif pattern == data_pattern_t.INCR_VAL:
-                data[i] = (idx + i) % 256
+    def gen_data(pattern, num_of_bytes, num_of_chunks=1):
+        size = num_of_bytes * num_of_chunks
+        if pattern == data_pattern_t.RAND_DATA:
+            return riscv_data_page_gen.gen_rand_data(size)
+        elif pattern == data_pattern_t.INCR_VAL:
+            # The value is the offset in the page, the chunks are shorter than 32 bytes only
+            # when there is a single chunk
+            return (bytes(range(256)) * (size // 256 + 1))[:size]
+        return bytes(size)
+
+    # Random bytes of randrange(0, 255), drawn in bulk from the same random sequence: each
+    # byte is the top byte of a 32-bit output of the generator and the 0xff bytes are rejected
+    @staticmethod
+    def gen_rand_data(num_of_bytes):
+        data = b""
+        while len(data) < num_of_bytes:
+            count = num_of_bytes - len(data)
+            words = random.getrandbits(32 * count).to_bytes(4 * count, "little")
+            data += words[3::4].replace(b"\xff", b"")
         return data
 
+    # Memory content of the .word data of the chunks, as written by the assembler
+    @staticmethod
+    def get_data_image(data, num_of_bytes):
+        if num_of_bytes % 4 == 0:
+            image = bytearray(len(data))
+            for i in range(4):
+                image[i::4] = data[3 - i::4]
+            return bytes(image)
+        image = bytearray()
+        for i in range(0, len(data), num_of_bytes):
+            # The last group of 5 bytes is truncated to a word, as by the assembler
+            for word in pkg_ins.format_data(data[i:i + num_of_bytes]).split(", "):
+                image += (int(word, 16) & 0xffffffff).to_bytes(4, "little")
+        return bytes(image)
+
     # Generate data pages for all memory regions
-    def gen_data_page(self, hart_id, pattern, is_kernel=0, amo=0):
-        temp_data = []
+    # With incbin_prefix, the pages are written to the <incbin_prefix>_<page>.bin files
+    def gen_data_page(self, hart_id, pattern, is_kernel=0, amo=0, incbin_prefix=""):
         self.data_page_str.clear()
         if is_kernel:
             self.mem_region_setting = cfg.s_mem_region
@@ -78,15 +104,25 @@ class riscv_data_page_gen:
                 self.data_page_str.append("{}:".format(pkg_ins.hart_prefix(hart_id) +
                                                        self.mem_region_setting[i].name))
             page_size = self.mem_region_setting[i].size_in_bytes
-            for i in range(0, page_size, 32):
-                if page_size - 1 >= 32:
-                    temp_data = self.gen_data(idx=i, pattern=pattern,
-                                              num_of_bytes=32, data=temp_data)
-                else:
-                    temp_data = self.gen_data(idx=i, pattern=pattern,
-                                              num_of_bytes=page_size - 1, data=temp_data)
-                tmp_str = pkg_ins.format_string(".word {}".format(pkg_ins.format_data(temp_data)),
-                                                pkg_ins.LABEL_STR_LEN)
+            # A region of one byte has a line of one byte, not an empty line
+            num_of_bytes = max(1, min(32, page_size - 1))
+            num_of_chunks = len(range(0, page_size, 32))
+            page_data = self.gen_data(pattern, num_of_bytes, num_of_chunks)
+            if incbin_prefix:
+                self.gen_data_file(page_data, num_of_bytes, "{}_{}.bin".format(
+                    incbin_prefix, self.data_page_str[-1][:-1]))
+                if cfg.use_push_data_section:
+                    self.data_page_str.append(".popsection")
+                continue
+            for i in range(0, len(page_data), num_of_bytes):
+                tmp_str = pkg_ins.format_string(".word {}".format(
+                    pkg_ins.format_data(page_data[i:i + num_of_bytes])), pkg_ins.LABEL_STR_LEN)
                 self.data_page_str.append(tmp_str)
                 if cfg.use_push_data_section:
                     self.data_page_str.append(".popsection")
+
+    # Write the page to a binary file included by the assembly program
+    def gen_data_file(self, page_data, num_of_bytes, file_name):
+        with open(file_name, "wb") as data_file:
+            data_file.write(self.get_data_image(page_data, num_of_bytes))
+        self.data_page_str.append(".incbin \"{}\"".format(file_name))
@@ -0,0 +1,1368 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import os
+import re
+import sys
+import codecs
+import struct
+import logging
+from pygen_src.isa.riscv_instr_encoding import (riscv_instr_encoding, instr_encoding_table,
+                                                encoding_field)
+
+# ---------------------------------------------------------------------------------------------
+# In-process assembler and linker for the generated programs, used by run.py instead of
+# riscv-gcc and objcopy when --elf_emitter=pygen.
+# The assembly is encoded with the instruction encoding tables, the pseudo instructions are
+# expanded and the instructions are compressed as the GNU assembler does, the branches are
+# relaxed, the sections are laid out per the linker script and the ELF executable and the
+# plain binary are written directly.
+# The module does not import riscv_instr_pkg, which reads the generator command line options.
+# ---------------------------------------------------------------------------------------------
+
+gpr_index = {name: i for i, name in enumerate(
+    ["zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "s0", "s1", "a0", "a1", "a2", "a3", "a4",
+     "a5", "a6", "a7", "s2", "s3", "s4", "s5", "s6", "s7", "s8", "s9", "s10", "s11", "t3", "t4",
+     "t5", "t6"])}
+gpr_index.update({"x{}".format(i): i for i in range(32)})
+gpr_index["fp"] = 8
+fpr_index = {name: i for i, name in enumerate(
+    ["ft0", "ft1", "ft2", "ft3", "ft4", "ft5", "ft6", "ft7", "fs0", "fs1", "fa0", "fa1", "fa2",
+     "fa3", "fa4", "fa5", "fa6", "fa7", "fs2", "fs3", "fs4", "fs5", "fs6", "fs7", "fs8", "fs9",
+     "fs10", "fs11", "ft8", "ft9", "ft10", "ft11"])}
+fpr_index.update({"f{}".format(i): i for i in range(32)})
+# CSR names accepted as operands, the other CSRs are written as numbers
+csr_index = {
+    "fflags": 0x001, "frm": 0x002, "fcsr": 0x003,
+    "cycle": 0xc00, "time": 0xc01, "instret": 0xc02,
+    "cycleh": 0xc80, "timeh": 0xc81, "instreth": 0xc82,
+    "sstatus": 0x100, "sie": 0x104, "stvec": 0x105, "scounteren": 0x106,
+    "sscratch": 0x140, "sepc": 0x141, "scause": 0x142, "stval": 0x143, "sip": 0x144,
+    "satp": 0x180,
+    "mvendorid": 0xf11, "marchid": 0xf12, "mimpid": 0xf13, "mhartid": 0xf14,
+    "mstatus": 0x300, "misa": 0x301, "medeleg": 0x302, "mideleg": 0x303, "mie": 0x304,
+    "mtvec": 0x305, "mcounteren": 0x306,
+    "mscratch": 0x340, "mepc": 0x341, "mcause": 0x342, "mtval": 0x343, "mip": 0x344,
+    "dcsr": 0x7b0, "dpc": 0x7b1, "dscratch0": 0x7b2, "dscratch1": 0x7b3
+}
+csr_index.update({"pmpcfg{}".format(i): 0x3a0 + i for i in range(4)})
+csr_index.update({"pmpaddr{}".format(i): 0x3b0 + i for i in range(16)})
+rm_index = {"rne": 0, "rtz": 1, "rdn": 2, "rup": 3, "rmm": 4, "dyn": 7}
+
+register_fields = {"rd", "rs1", "rs2", "rs3", "c_rs1", "c_rs2",
+                   "rd_p", "rs2_p", "rs1_p", "rd_rs1_p"}
+compressed_register_fields = {"rd_p", "rs2_p", "rs1_p", "rd_rs1_p"}
+signed_fields = {"imm12", "simm12", "bimm12", "jimm20", "c_imm6", "c_nzimm10", "c_bimm9",
+                 "c_imm12"}
+unsigned_c_imm6_instr = {"C_SLLI", "C_SRLI", "C_SRAI"}
+branch_instr = {"BEQ", "BNE", "BLT", "BGE", "BLTU", "BGEU"}
+load_instr = {"lb", "lh", "lw", "ld", "lbu", "lhu", "lwu", "flw", "fld"}
+store_instr = {"sb", "sh", "sw", "sd", "fsw", "fsd"}
+
+label_re = re.compile(r"\s*([A-Za-z_.$][\w.$]*|\d+)\s*:")
+term_re = re.compile(r"\s*([+-]?)\s*([\w.$]+)\s*")
+mem_re = re.compile(r"(.*?)\s*\(\s*(\w+)\s*\)")
+section_re = re.compile(r"([^\s,]+)\s*(?:,\s*\"([^\"]*)\"\s*)?(?:,\s*[@%](\w+))?")
+cpp_re = re.compile(r"#\s*(define|undef|include|if|ifdef|ifndef|elif|else|endif)\b")
+link_statement_re = re.compile(r"\s*(?:\.\s*=\s*([^;]+);|([.\w]+)\s*:\s*{([^}]*)}|"
+                               r"([A-Za-z_$][\w$]*)\s*=\s*([^;]+);)")
+
+# Alignment fill of the code sections
+NOP = 0x00000013
+C_NOP = 0x0001
+C_EBREAK = 0x9002
+
+
+# Parse a number as the GNU assembler: decimal, hexadecimal, binary or octal
+def parse_number(token):
+    if len(token) > 1 and token[0] == "0" and token.isdigit():
+        return int(token, 8)
+    return int(token, 0)
+
+
+# An input section: the assembled items and, after the link, the address and the content
+class riscv_elf_section:
+    def __init__(self, name, flags, nobits):
+        self.name = name
+        self.flags = flags
+        self.nobits = nobits
+        self.align = 1
+        self.items = []
+        self.positions = []
+        self.size = 0
+        self.addr = 0
+        self.data = b""
+
+
+class riscv_elf_emitter:
+    def __init__(self, isa, mabi, include_dirs=(), relax=True):
+        match = re.match(r"rv(32|64)([a-z]*)", isa.lower())
+        if match is None:
+            logging.critical("Unsupported ISA: {}".format(isa))
+            sys.exit(1)
+        self.xlen = int(match.group(1))
+        self.extensions = set(match.group(2).replace("g", "imafd"))
+        self.mabi = mabi
+        self.include_dirs = list(include_dirs)
+        self.rvc = "c" in self.extensions
+        self.rvc_used = self.rvc
+        self.relax = relax
+        self.option_stack = []
+        self.sections = {}
+        self.section = None
+        self.previous_section = None
+        self.section_stack = []
+        self.labels = {}
+        self.label_offset = {}
+        self.constants = {}
+        self.abs_symbols = {}
+        self.global_symbols = set()
+        self.local_label_count = {}
+        self.encodings = {}
+        self.output_sections = []
+        self.c_instr = self.get_c_instr()
+        self.compress_rules = self.get_compress_rules()
+        self.directives = {
+            ".include": self.directive_include,
+            ".section": self.directive_section,
+            ".pushsection": self.directive_pushsection,
+            ".popsection": self.directive_popsection,
+            ".previous": self.directive_previous,
+            ".text": lambda args: self.select_section(".text"),
+            ".data": lambda args: self.select_section(".data"),
+            ".bss": lambda args: self.select_section(".bss"),
+            ".align": self.directive_p2align,
+            ".p2align": self.directive_p2align,
+            ".balign": self.directive_balign,
+            ".option": self.directive_option,
+            ".globl": self.directive_globl,
+            ".global": self.directive_globl,
+            ".weak": self.directive_globl,
+            ".equ": self.directive_equ,
+            ".set": self.directive_equ,
+            ".byte": lambda args: self.directive_data(args, 1),
+            ".2byte": lambda args: self.directive_data(args, 2),
+            ".half": lambda args: self.directive_data(args, 2),
+            ".short": lambda args: self.directive_data(args, 2),
+            ".4byte": lambda args: self.directive_data(args, 4),
+            ".word": lambda args: self.directive_data(args, 4),
+            ".long": lambda args: self.directive_data(args, 4),
+            ".8byte": lambda args: self.directive_data(args, 8),
+            ".dword": lambda args: self.directive_data(args, 8),
+            ".quad": lambda args: self.directive_data(args, 8),
+            ".zero": self.directive_space,
+            ".space": self.directive_space,
+            ".skip": self.directive_space,
+            ".string": lambda args: self.directive_string(args, b"\0"),
+            ".asciz": lambda args: self.directive_string(args, b"\0"),
+            ".ascii": lambda args: self.directive_string(args, b""),
+            ".incbin": self.directive_incbin,
+        }
+        for directive in [".type", ".size", ".file", ".ident", ".attribute", ".local"]:
+            self.directives[directive] = lambda args: None
+        self.pseudo_instr = {
+            "nop": lambda ops: self.emit_instr("ADDI", (0, 0, 0), compress=True),
+            "li": self.instr_li,
+            "la": self.instr_la,
+            "lla": self.instr_la,
+            "mv": self.instr_mv,
+            "move": self.instr_mv,
+            "not": lambda ops: self.emit_instr("XORI", (self.reg(ops[0]), self.reg(ops[1]), -1)),
+            "neg": lambda ops: self.emit_instr("SUB", (self.reg(ops[0]), 0, self.reg(ops[1]))),
+            "negw": lambda ops: self.emit_instr("SUBW", (self.reg(ops[0]), 0, self.reg(ops[1]))),
+            "sext.w": lambda ops: self.emit_instr("ADDIW", (self.reg(ops[0]), self.reg(ops[1]),
+                                                            0), compress=True),
+            "seqz": lambda ops: self.emit_instr("SLTIU", (self.reg(ops[0]), self.reg(ops[1]), 1)),
+            "snez": lambda ops: self.emit_instr("SLTU", (self.reg(ops[0]), 0, self.reg(ops[1]))),
+            "sltz": lambda ops: self.emit_instr("SLT", (self.reg(ops[0]), self.reg(ops[1]), 0)),
+            "sgtz": lambda ops: self.emit_instr("SLT", (self.reg(ops[0]), 0, self.reg(ops[1]))),
+            "beqz": lambda ops: self.branch("BEQ", self.reg(ops[0]), 0, ops[1]),
+            "bnez": lambda ops: self.branch("BNE", self.reg(ops[0]), 0, ops[1]),
+            "blez": lambda ops: self.branch("BGE", 0, self.reg(ops[0]), ops[1]),
+            "bgez": lambda ops: self.branch("BGE", self.reg(ops[0]), 0, ops[1]),
+            "bltz": lambda ops: self.branch("BLT", self.reg(ops[0]), 0, ops[1]),
+            "bgtz": lambda ops: self.branch("BLT", 0, self.reg(ops[0]), ops[1]),
+            "bgt": lambda ops: self.branch("BLT", self.reg(ops[1]), self.reg(ops[0]), ops[2]),
+            "ble": lambda ops: self.branch("BGE", self.reg(ops[1]), self.reg(ops[0]), ops[2]),
+            "bgtu": lambda ops: self.branch("BLTU", self.reg(ops[1]), self.reg(ops[0]), ops[2]),
+            "bleu": lambda ops: self.branch("BGEU", self.reg(ops[1]), self.reg(ops[0]), ops[2]),
+            "c.beqz": lambda ops: self.branch("BEQ", self.reg(ops[0]), 0, ops[1], explicit=True),
+            "c.bnez": lambda ops: self.branch("BNE", self.reg(ops[0]), 0, ops[1], explicit=True),
+            "j": lambda ops: self.jump(0, ops[0], "C_J"),
+            "c.j": lambda ops: self.jump(0, ops[0], "C_J", explicit=True),
+            "c.jal": lambda ops: self.jump(1, ops[0], "C_JAL", explicit=True),
+            "jal": self.instr_jal,
+            "jr": self.instr_jr,
+            "jalr": self.instr_jalr,
+            "ret": lambda ops: self.instr_jr(["ra"]),
+            "csrr": lambda ops: self.emit_instr("CSRRS", (self.reg(ops[0]), self.csr(ops[1]), 0)),
+            "csrw": lambda ops: self.emit_instr("CSRRW", (0, self.csr(ops[0]), self.reg(ops[1]))),
+            "csrs": lambda ops: self.emit_instr("CSRRS", (0, self.csr(ops[0]), self.reg(ops[1]))),
+            "csrc": lambda ops: self.emit_instr("CSRRC", (0, self.csr(ops[0]), self.reg(ops[1]))),
+            "csrwi": lambda ops: self.emit_instr("CSRRWI", (0, self.csr(ops[0]),
+                                                            self.const(ops[1]))),
+            "csrsi": lambda ops: self.emit_instr("CSRRSI", (0, self.csr(ops[0]),
+                                                            self.const(ops[1]))),
+            "csrci": lambda ops: self.emit_instr("CSRRCI", (0, self.csr(ops[0]),
+                                                            self.const(ops[1]))),
+            "frcsr": lambda ops: self.emit_instr("CSRRS", (self.reg(ops[0]), 3, 0)),
+            "fscsr": lambda ops: self.instr_csr_swap("CSRRW", 3, ops),
+            "frrm": lambda ops: self.emit_instr("CSRRS", (self.reg(ops[0]), 2, 0)),
+            "fsrm": lambda ops: self.instr_csr_swap("CSRRW", 2, ops),
+            "fsrmi": lambda ops: self.instr_csr_swap("CSRRWI", 2, ops),
+            "frflags": lambda ops: self.emit_instr("CSRRS", (self.reg(ops[0]), 1, 0)),
+            "fsflags": lambda ops: self.instr_csr_swap("CSRRW", 1, ops),
+            "fsflagsi": lambda ops: self.instr_csr_swap("CSRRWI", 1, ops),
+            "fmv.s": lambda ops: self.instr_fp_move("FSGNJ_S", ops),
+            "fabs.s": lambda ops: self.instr_fp_move("FSGNJX_S", ops),
+            "fneg.s": lambda ops: self.instr_fp_move("FSGNJN_S", ops),
+            "fmv.d": lambda ops: self.instr_fp_move("FSGNJ_D", ops),
+            "fabs.d": lambda ops: self.instr_fp_move("FSGNJX_D", ops),
+            "fneg.d": lambda ops: self.instr_fp_move("FSGNJN_D", ops),
+            "fmv.x.s": lambda ops: self.instr_table("FMV_X_W", ops),
+            "fmv.s.x": lambda ops: self.instr_table("FMV_W_X", ops),
+            "fence": self.instr_fence,
+            "sfence.vma": self.instr_sfence_vma,
+            "ebreak": self.instr_ebreak,
+            "c.ebreak": lambda ops: self.emit_bytes(C_EBREAK, 2),
+            "unimp": lambda ops: (self.emit_bytes(0, 2) if self.rvc
+                                  else self.emit_bytes(0xc0001073, 4)),
+        }
+        for name, csr in [("cycle", 0xc00), ("time", 0xc01), ("instret", 0xc02)]:
+            self.pseudo_instr["rd" + name] = \
+                lambda ops, csr=csr: self.emit_instr("CSRRS", (self.reg(ops[0]), csr, 0))
+            self.pseudo_instr["rd" + name + "h"] = \
+                lambda ops, csr=csr: self.emit_instr("CSRRS", (self.reg(ops[0]), csr + 0x80, 0))
+        self.select_section(".text")
+
+    # Compressed instructions available for the ISA
+    def get_c_instr(self):
+        if "c" not in self.extensions:
+            return set()
+        c_instr = {name for name in instr_encoding_table if name.startswith("C_")}
+        if self.xlen != 32 or "f" not in self.extensions:
+            c_instr -= {"C_FLW", "C_FSW", "C_FLWSP", "C_FSWSP"}
+        if "d" not in self.extensions:
+            c_instr -= {"C_FLD", "C_FSD", "C_FLDSP", "C_FSDSP"}
+        if self.xlen != 64:
+            c_instr -= {"C_LD", "C_SD", "C_LDSP", "C_SDSP", "C_ADDIW", "C_ADDW", "C_SUBW"}
+        if self.xlen != 32:
+            c_instr -= {"C_JAL"}
+        return c_instr
+
+    # Compressed forms of the instructions, tried in the order of the GNU assembler opcode
+    # table: (compressed instruction, condition, compressed operands) per instruction
+    def get_compress_rules(self):
+        def c_reg(reg):
+            return 8 <= reg < 16
+
+        def imm6(imm):
+            return -32 <= imm < 32
+
+        def shamt(imm):
+            return 0 < imm < self.xlen
+
+        # Loads and stores: stack pointer form, then compressed register form
+        def mem_rules(sp_name, name, max_imm, scale, rd_nonzero):
+            return [(sp_name, lambda rd, rs1, imm: (rs1 == 2 and (rd or not rd_nonzero) and
+                                                    0 <= imm < max_imm * 2 and
+                                                    imm % scale == 0),
+                     lambda rd, rs1, imm: (rd, imm)),
+                    (name, lambda rd, rs1, imm: (c_reg(rd) and c_reg(rs1) and
+                                                 0 <= imm < max_imm and imm % scale == 0),
+                     lambda rd, rs1, imm: (rd, rs1, imm))]
+
+        # Register-register operations with a compressed destination, the source operands
+        # are swapped when the operation is commutative
+        def cs_rules(name, commutative):
+            rules = [(name, lambda rd, rs1, rs2: c_reg(rd) and rs1 == rd and c_reg(rs2),
+                      lambda rd, rs1, rs2: (rd, rs2))]
+            if commutative:
+                rules.append((name, lambda rd, rs1, rs2: c_reg(rd) and rs2 == rd and c_reg(rs1),
+                              lambda rd, rs1, rs2: (rd, rs1)))
+            return rules
+
+        return {
+            "ADD": [("C_ADD", lambda rd, rs1, rs2: rd and rs1 == rd and rs2,
+                     lambda rd, rs1, rs2: (rd, rs2)),
+                    ("C_ADD", lambda rd, rs1, rs2: rd and rs2 == rd and rs1,
+                     lambda rd, rs1, rs2: (rd, rs1)),
+                    ("C_MV", lambda rd, rs1, rs2: rd and rs1 == 0 and rs2,
+                     lambda rd, rs1, rs2: (rd, rs2)),
+                    ("C_MV", lambda rd, rs1, rs2: rd and rs2 == 0 and rs1,
+                     lambda rd, rs1, rs2: (rd, rs1))],
+            "ADDI": [("C_ADDI4SPN", lambda rd, rs1, imm: (c_reg(rd) and rs1 == 2 and
+                                                          0 < imm < 1024 and imm % 4 == 0),
+                      lambda rd, rs1, imm: (rd, imm)),
+                     ("C_ADDI", lambda rd, rs1, imm: rd and rs1 == rd and imm and imm6(imm),
+                      lambda rd, rs1, imm: (rd, imm)),
+                     ("C_NOP", lambda rd, rs1, imm: rd == 0 and rs1 == 0 and imm == 0,
+                      lambda rd, rs1, imm: ()),
+                     ("C_ADDI16SP", lambda rd, rs1, imm: (rd == 2 and rs1 == 2 and imm and
+                                                          -512 <= imm < 512 and imm % 16 == 0),
+                      lambda rd, rs1, imm: (imm,)),
+                     ("C_LI", lambda rd, rs1, imm: rd and rs1 == 0 and imm6(imm),
+                      lambda rd, rs1, imm: (rd, imm))],
+            "ADDIW": [("C_ADDIW", lambda rd, rs1, imm: rd and rs1 == rd and imm6(imm),
+                       lambda rd, rs1, imm: (rd, imm))],
+            "LUI": [("C_LUI", lambda rd, imm: (rd not in (0, 2) and
+                                               (0 < imm < 32 or 0xfffe0 <= imm <= 0xfffff)),
+                     lambda rd, imm: (rd, imm - 0x100000 if imm >= 0xfffe0 else imm))],
+            "SLLI": [("C_SLLI", lambda rd, rs1, imm: rd and rs1 == rd and shamt(imm),
+                      lambda rd, rs1, imm: (rd, imm))],
+            "SRLI": [("C_SRLI", lambda rd, rs1, imm: c_reg(rd) and rs1 == rd and shamt(imm),
+                      lambda rd, rs1, imm: (rd, imm))],
+            "SRAI": [("C_SRAI", lambda rd, rs1, imm: c_reg(rd) and rs1 == rd and shamt(imm),
+                      lambda rd, rs1, imm: (rd, imm))],
+            "ANDI": [("C_ANDI", lambda rd, rs1, imm: c_reg(rd) and rs1 == rd and imm6(imm),
+                      lambda rd, rs1, imm: (rd, imm))],
+            "SUB": cs_rules("C_SUB", False),
+            "AND": cs_rules("C_AND", True),
+            "OR": cs_rules("C_OR", True),
+            "XOR": cs_rules("C_XOR", True),
+            "ADDW": cs_rules("C_ADDW", True),
+            "SUBW": cs_rules("C_SUBW", False),
+            "LW": mem_rules("C_LWSP", "C_LW", 128, 4, True),
+            "SW": mem_rules("C_SWSP", "C_SW", 128, 4, False),
+            "LD": mem_rules("C_LDSP", "C_LD", 256, 8, True),
+            "SD": mem_rules("C_SDSP", "C_SD", 256, 8, False),
+            "FLW": mem_rules("C_FLWSP", "C_FLW", 128, 4, False),
+            "FSW": mem_rules("C_FSWSP", "C_FSW", 128, 4, False),
+            "FLD": mem_rules("C_FLDSP", "C_FLD", 256, 8, False),
+            "FSD": mem_rules("C_FSDSP", "C_FSD", 256, 8, False),
+        }
+
+    # ------------------------------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------------------------------
+
+    def assemble_file(self, asm):
+        self.process(self.read_statements(asm))
+
+    def assemble(self, lines, asm_dir="."):
+        self.process(self.split_statements(lines, asm_dir))
+
+    def read_statements(self, asm):
+        try:
+            with open(asm) as asm_file:
+                lines = asm_file.read().splitlines()
+        except OSError as error:
+            logging.critical("Cannot read assembly file {}: {}".format(asm, error))
+            sys.exit(1)
+        return self.split_statements(lines, os.path.dirname(asm))
+
+    # Statements of the lines, without the comments, the .include files are expanded
+    def split_statements(self, lines, asm_dir):
+        statements = []
+        for line in lines:
+            if "#" in line:
+                if cpp_re.match(line.lstrip()):
+                    logging.critical("C preprocessor directives are not supported: {}"
+                                     .format(line))
+                    sys.exit(1)
+                line = self.strip_comment(line)
+            for statement in (line.split(";") if ";" in line else [line]):
+                statement = statement.strip()
+                if statement.startswith(".include"):
+                    statements.extend(self.read_statements(
+                        self.find_include(statement[8:].strip().strip('"'), asm_dir)))
+                elif statement:
+                    statements.append(statement)
+        return statements
+
+    @staticmethod
+    def strip_comment(line):
+        if '"' not in line:
+            return line.split("#", 1)[0]
+        quoted = False
+        for i, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == "#" and not quoted:
+                return line[:i]
+        return line
+
+    def find_include(self, name, asm_dir):
+        for include_dir in [asm_dir] + self.include_dirs:
+            path = os.path.join(include_dir, name)
+            if os.path.isfile(path):
+                return path
+        logging.critical("Cannot find include file: {}".format(name))
+        sys.exit(1)
+
+    def process(self, statements):
+        statements = iter(statements)
+        for statement in statements:
+            match = label_re.match(statement)
+            while match:
+                self.define_label(match.group(1))
+                statement = statement[match.end():].lstrip()
+                match = label_re.match(statement)
+            if not statement:
+                continue
+            name, args = (statement.split(None, 1) + [""])[:2]
+            name = name.lower()
+            if name == ".rept":
+                body = self.get_rept_body(statements)
+                for _ in range(self.const(args)):
+                    self.process(body)
+            elif name == ".end":
+                return
+            elif name.startswith("."):
+                handler = self.directives.get(name)
+                if handler is None:
+                    logging.critical("Unsupported directive: {}".format(statement))
+                    sys.exit(1)
+                handler(args)
+            else:
+                ops = [op.strip() for op in args.split(",")] if args else []
+                handler = self.pseudo_instr.get(name)
+                if handler is not None:
+                    handler(ops)
+                elif name in load_instr and len(ops) >= 2 and "(" not in ops[1]:
+                    self.instr_symbol_load(name, ops)
+                elif name in store_instr and len(ops) == 3 and "(" not in ops[1]:
+                    self.instr_symbol_store(name, ops)
+                else:
+                    self.instr_table(name.upper().replace(".", "_"), ops)
+
+    @staticmethod
+    def get_rept_body(statements):
+        body = []
+        depth = 1
+        for statement in statements:
+            name = statement.split(None, 1)[0].lower()
+            if name == ".rept":
+                depth += 1
+            elif name == ".endr":
+                depth -= 1
+                if depth == 0:
+                    return body
+            body.append(statement)
+        logging.critical(".rept without .endr")
+        sys.exit(1)
+
+    def define_label(self, name):
+        if name.isdigit():
+            count = self.local_label_count.get(name, 0) + 1
+            self.local_label_count[name] = count
+            name = "{}\x02{}".format(name, count)
+        elif name in self.labels:
+            logging.critical("Label redefined: {}".format(name))
+            sys.exit(1)
+        self.labels[name] = self.section
+        self.section.items.append(("label", name))
+
+    # Symbol of a local label reference, e.g. 1f or 1b
+    def local_label(self, token):
+        count = self.local_label_count.get(token[:-1], 0)
+        if token[-1] == "f":
+            count += 1
+        elif count == 0:
+            logging.critical("Undefined local label: {}".format(token))
+            sys.exit(1)
+        return "{}\x02{}".format(token[:-1], count)
+
+    # Expression of a symbol and a constant: (symbol or None, constant)
+    def expr(self, text):
+        symbol = None
+        value = 0
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = term_re.match(text, pos)
+            if match is None or (pos and not match.group(1)):
+                logging.critical("Unsupported expression: {}".format(text))
+                sys.exit(1)
+            sign = -1 if match.group(1) == "-" else 1
+            token = match.group(2)
+            pos = match.end()
+            if token[0].isdigit():
+                if token[-1] in "fb" and token[:-1].isdigit():
+                    token = self.local_label(token)
+                else:
+                    try:
+                        value += sign * parse_number(token)
+                    except ValueError:
+                        logging.critical("Invalid number: {}".format(token))
+                        sys.exit(1)
+                    continue
+            if token in self.constants:
+                value += sign * self.constants[token]
+            elif symbol is None and sign > 0:
+                symbol = token
+            else:
+                logging.critical("Unsupported expression: {}".format(text))
+                sys.exit(1)
+        return symbol, value
+
+    def const(self, text):
+        symbol, value = self.expr(text)
+        if symbol is not None:
+            logging.critical("Constant expected: {}".format(text))
+            sys.exit(1)
+        return value
+
+    def reg(self, text):
+        reg = gpr_index.get(text.lower())
+        if reg is None:
+            logging.critical("Invalid register: {}".format(text))
+            sys.exit(1)
+        return reg
+
+    def freg(self, text):
+        reg = fpr_index.get(text.lower())
+        if reg is None:
+            logging.critical("Invalid floating point register: {}".format(text))
+            sys.exit(1)
+        return reg
+
+    def csr(self, text):
+        csr = csr_index.get(text.lower())
+        return self.const(text) if csr is None else csr
+
+    # ------------------------------------------------------------------------------------------
+    # Directives
+    # ------------------------------------------------------------------------------------------
+
+    def select_section(self, name, flags=None, section_type=None):
+        section = self.sections.get(name)
+        if section is None:
+            if flags is None:
+                flags = "ax" if name.startswith(".text") else \
+                    "a" if name.startswith(".rodata") else \
+                    "aw" if name.startswith((".data", ".bss", ".sdata", ".sbss")) else ""
+            nobits = section_type == "nobits" or (section_type is None and
+                                                  name.startswith((".bss", ".sbss")))
+            section = riscv_elf_section(name, flags, nobits)
+            self.sections[name] = section
+        if section is not self.section:
+            self.previous_section = self.section
+            self.section = section
+
+    def parse_section_args(self, args):
+        match = section_re.match(args)
+        if match is None:
+            logging.critical("Invalid section: {}".format(args))
+            sys.exit(1)
+        return match.group(1).strip('"'), match.group(2), match.group(3)
+
+    def directive_section(self, args):
+        self.select_section(*self.parse_section_args(args))
+
+    def directive_pushsection(self, args):
+        self.section_stack.append(self.section)
+        self.select_section(*self.parse_section_args(args))
+
+    def directive_popsection(self, args):
+        # Ignored with a warning by the GNU assembler
+        if not self.section_stack:
+            logging.warning(".popsection without .pushsection, ignored")
+            return
+        self.select_section(self.section_stack.pop().name)
+
+    def directive_previous(self, args):
+        if self.previous_section is not None:
+            self.select_section(self.previous_section.name)
+
+    def directive_p2align(self, args):
+        values = [arg.strip() for arg in args.split(",")]
+        self.align(1 << self.const(values[0]),
+                   self.const(values[1]) if len(values) > 1 and values[1] else None)
+
+    def directive_balign(self, args):
+        values = [arg.strip() for arg in args.split(",")]
+        self.align(self.const(values[0]),
+                   self.const(values[1]) if len(values) > 1 and values[1] else None)
+
+    def align(self, alignment, fill):
+        if alignment <= 1:
+            return
+        self.section.align = max(self.section.align, alignment)
+        code = "x" in self.section.flags and fill is None
+        self.section.items.append(("align", alignment, fill or 0, code, self.relax, self.rvc))
+
+    def directive_option(self, args):
+        option = args.split(",")[0].strip()
+        if option == "rvc":
+            self.rvc = True
+            self.rvc_used = True
+        elif option == "norvc":
+            self.rvc = False
+        elif option == "relax":
+            self.relax = True
+        elif option == "norelax":
+            self.relax = False
+        elif option == "push":
+            self.option_stack.append((self.rvc, self.relax))
+        elif option == "pop":
+            if not self.option_stack:
+                logging.critical(".option pop without .option push")
+                sys.exit(1)
+            self.rvc, self.relax = self.option_stack.pop()
+        elif option not in ["pic", "nopic"]:
+            logging.critical("Unsupported option: {}".format(args))
+            sys.exit(1)
+
+    def directive_globl(self, args):
+        self.global_symbols.update(name.strip() for name in args.split(","))
+
+    def directive_equ(self, args):
+        name, _, value = args.partition(",")
+        self.constants[name.strip()] = self.const(value)
+
+    def directive_data(self, args, size):
+        mask = (1 << (size * 8)) - 1
+        data = bytearray()
+        for arg in args.split(","):
+            symbol, value = self.expr(arg)
+            if symbol is None:
+                data += (value & mask).to_bytes(size, "little")
+            else:
+                self.emit_data(data)
+                data = bytearray()
+                self.section.items.append(("fixup", size, self.fixup_data,
+                                           (size, symbol, value)))
+        self.emit_data(data)
+
+    def directive_space(self, args):
+        values = [arg.strip() for arg in args.split(",")]
+        fill = self.const(values[1]) if len(values) > 1 else 0
+        self.emit_data(bytearray([fill & 0xff]) * self.const(values[0]))
+
+    def directive_string(self, args, terminator):
+        for string in re.findall(r'"((?:[^"\\]|\\.)*)"', args):
+            self.emit_data(codecs.escape_decode(string.encode())[0] + terminator)
+
+    # .incbin "file"[, skip[, count]]
+    def directive_incbin(self, args):
+        match = re.match(r'"([^"]*)"\s*(?:,(.*))?$', args)
+        if match is None:
+            logging.critical("Invalid .incbin arguments: {}".format(args))
+            sys.exit(1)
+        values = [self.const(arg) for arg in (match.group(2) or "").split(",") if arg.strip()]
+        with open(self.find_include(match.group(1), "."), "rb") as data_file:
+            data = data_file.read()
+        skip = values[0] if values else 0
+        end = skip + values[1] if len(values) > 1 else len(data)
+        self.emit_data(data[skip:end])
+
+    def directive_include(self, args):
+        logging.critical(".include must be the only statement of the line")
+        sys.exit(1)
+
+    # ------------------------------------------------------------------------------------------
+    # Instructions
+    # ------------------------------------------------------------------------------------------
+
+    def emit_data(self, data):
+        if not data:
+            return
+        items = self.section.items
+        if items and type(items[-1]) is bytearray:
+            items[-1] += data
+        else:
+            items.append(bytearray(data))
+
+    def emit_bytes(self, binary, size):
+        self.emit_data(binary.to_bytes(size, "little"))
+
+    def get_encoding(self, name):
+        encoding = self.encodings.get(name)
+        if encoding is None:
+            if name not in instr_encoding_table:
+                logging.critical("Unsupported instruction: {}".format(name.lower()
+                                                                      .replace("_", ".")))
+                sys.exit(1)
+            encoding = riscv_instr_encoding(instr_encoding_table[name])
+            self.encodings[name] = encoding
+        return encoding
+
+    def encode(self, name, values):
+        encoding = self.get_encoding(name)
+        binary = encoding.match
+        for (attr, field), (_, segments), value in zip(encoding.operands, encoding.fields,
+                                                       values):
+            if field in register_fields:
+                if field in compressed_register_fields:
+                    if not 8 <= value < 16:
+                        self.operand_error(name, value)
+            else:
+                segment_list = encoding_field[field][1]
+                width = max(hi for hi, lo, pos in segment_list) + 1
+                low_bits = min(lo for hi, lo, pos in segment_list)
+                signed = field in signed_fields and not (field == "c_imm6" and
+                                                         name in unsigned_c_imm6_instr)
+                low = -(1 << (width - 1)) if signed else 0
+                high = (1 << (width - 1)) if signed else (1 << width)
+                if value & ((1 << low_bits) - 1) or not low <= value < high:
+                    self.operand_error(name, value)
+            for lo, mask, pos in segments:
+                binary |= ((value >> lo) & mask) << pos
+        return binary, encoding.size
+
+    @staticmethod
+    def operand_error(name, value):
+        logging.critical("Invalid operand of {}: {}".format(name.lower().replace("_", "."),
+                                                            value))
+        sys.exit(1)
+
+    # Emit an instruction, compressed if it has a compressed form for the operands
+    def emit_instr(self, name, values, compress=False):
+        if compress and self.rvc:
+            for c_name, condition, operands in self.compress_rules.get(name, ()):
+                if c_name in self.c_instr and condition(*values):
+                    name, values = c_name, operands(*values)
+                    break
+        binary, size = self.encode(name, values)
+        self.emit_bytes(binary, size)
+
+    # Instruction of the encoding table, with the operands in the assembly order
+    def instr_table(self, name, ops):
+        aq = rl = 0
+        if name not in instr_encoding_table:
+            for suffix, suffix_aq, suffix_rl in [("_AQRL", 1, 1), ("_AQ", 1, 0), ("_RL", 0, 1)]:
+                if name.endswith(suffix):
+                    name, aq, rl = name[:-len(suffix)], suffix_aq, suffix_rl
+                    break
+        encoding = self.get_encoding(name)
+        operands = [(attr, field) for attr, field in encoding.operands
+                    if field not in ("aq", "rl")]
+        if name in branch_instr:
+            self.branch(name, self.reg(ops[0]), self.reg(ops[1]), ops[2])
+            return
+        if name == "JAL":
+            self.jump(self.reg(ops[0]), ops[1], None)
+            return
+        values = []
+        pos = 0
+        rm = None
+        for op in ops:
+            match = mem_re.fullmatch(op)
+            if match and pos < len(operands):
+                base, offset = match.group(2), match.group(1) or "0"
+                if operands[pos][1] in register_fields:
+                    values.append(self.reg(base))
+                    pos += 1
+                    if pos < len(operands) and operands[pos][1] not in register_fields:
+                        values.append(self.const(offset))
+                        pos += 1
+                    elif self.const(offset) != 0:
+                        self.operand_error(name, op)
+                else:
+                    if self.reg(base) != 2:
+                        self.operand_error(name, op)
+                    values.append(self.const(offset))
+                    pos += 1
+            elif pos >= len(operands):
+                if rm is not None or op.lower() not in rm_index:
+                    logging.critical("Too many operands: {} {}".format(name, ", ".join(ops)))
+                    sys.exit(1)
+                rm = rm_index[op.lower()]
+            else:
+                attr, field = operands[pos]
+                if field in register_fields:
+                    values.append(self.freg(op) if attr.startswith("f") else self.reg(op))
+                elif field == "csr":
+                    values.append(self.csr(op))
+                elif op.lower() == "sp" and name.startswith("C_"):
+                    # Stack pointer operand of the compressed stack pointer forms
+                    continue
+                else:
+                    value = self.const(op)
+                    if name == "C_LUI" and value >= 0xfffe0:
+                        value -= 0x100000
+                    values.append(value)
+                pos += 1
+        if pos == len(operands) - 1 and operands[-1][1] not in register_fields and \
+           operands[-1][1] != "csr" and not name.startswith("C_"):
+            values.append(0)
+            pos += 1
+        if pos != len(operands):
+            logging.critical("Wrong number of operands: {} {}".format(
+                             name.lower().replace("_", "."), ", ".join(ops)))
+            sys.exit(1)
+        values = self.add_ordering(encoding, values, aq, rl)
+        if rm is not None:
+            binary, size = self.encode(name, values)
+            self.emit_bytes((binary & ~0x7000) | (rm << 12), size)
+        else:
+            self.emit_instr(name, values, compress=True)
+
+    # Insert the aq and rl bits of the atomic instructions in the operand values
+    @staticmethod
+    def add_ordering(encoding, values, aq, rl):
+        if len(values) == len(encoding.operands):
+            return values
+        values = iter(values)
+        return [aq if field == "aq" else rl if field == "rl" else next(values)
+                for attr, field in encoding.operands]
+
+    def instr_li(self, ops):
+        rd = self.reg(ops[0])
+        value = self.const(ops[1])
+        if self.xlen == 32:
+            value &= 0xffffffff
+            value = ((value ^ 0x80000000) - 0x80000000)
+        else:
+            value &= 0xffffffffffffffff
+            value = ((value ^ 0x8000000000000000) - 0x8000000000000000)
+        if self.rvc and rd and -32 <= value < 32:
+            self.emit_instr("C_LI", (rd, value))
+        elif -2048 <= value < 2048:
+            self.emit_instr("ADDI", (rd, 0, value))
+        else:
+            self.load_const(rd, value)
+
+    # Constant load sequence of the GNU assembler: LUI and ADDI(W), with SLLI and ADDI for the
+    # 64-bit constants
+    def load_const(self, rd, value):
+        lower = ((value & 0xfff) ^ 0x800) - 0x800
+        upper = value - lower
+        if self.xlen > 32 and not -(1 << 31) <= value < (1 << 31):
+            shift = 12
+            while (upper >> shift) & 1 == 0:
+                shift += 1
+            self.load_const(rd, upper >> shift)
+            self.emit_instr("SLLI", (rd, rd, shift), compress=True)
+            if lower:
+                self.emit_instr("ADDI", (rd, rd, lower), compress=True)
+        else:
+            hi_reg = 0
+            if upper:
+                self.emit_instr("LUI", (rd, (upper & 0xffffffff) >> 12), compress=True)
+                hi_reg = rd
+            if lower or hi_reg == 0:
+                self.emit_instr("ADDIW" if self.xlen > 32 else "ADDI", (rd, hi_reg, lower),
+                                compress=True)
+
+    def instr_mv(self, ops):
+        rd, rs = self.reg(ops[0]), self.reg(ops[1])
+        if self.rvc and rd and rs and "C_MV" in self.c_instr:
+            self.emit_instr("C_MV", (rd, rs))
+        else:
+            self.emit_instr("ADDI", (rd, rs, 0))
+
+    def instr_la(self, ops):
+        rd = self.reg(ops[0])
+        self.section.items.append(("fixup", 8, self.fixup_pcrel,
+                                   ("ADDI", rd, rd, self.expr(ops[1]))))
+
+    def instr_symbol_load(self, name, ops):
+        rd = self.freg(ops[0]) if name.startswith("f") else self.reg(ops[0])
+        if len(ops) > 2:
+            tmp = self.reg(ops[2])
+        elif name.startswith("f"):
+            logging.critical("{} of a symbol needs a temporary register".format(name))
+            sys.exit(1)
+        else:
+            tmp = rd
+        self.section.items.append(("fixup", 8, self.fixup_pcrel,
+                                   (name.upper(), rd, tmp, self.expr(ops[1]))))
+
+    def instr_symbol_store(self, name, ops):
+        rs = self.freg(ops[0]) if name.startswith("f") else self.reg(ops[0])
+        self.section.items.append(("fixup", 8, self.fixup_pcrel,
+                                   (name.upper(), rs, self.reg(ops[2]), self.expr(ops[1]))))
+
+    def instr_jal(self, ops):
+        if len(ops) == 1:
+            self.jump(1, ops[0], "C_JAL")
+        else:
+            self.jump(self.reg(ops[0]), ops[1], None)
+
+    def instr_jr(self, ops):
+        rs = self.reg(ops[0])
+        if len(ops) == 1 and self.rvc and rs and "C_JR" in self.c_instr:
+            self.emit_instr("C_JR", (rs,))
+        else:
+            self.emit_instr("JALR", (0, rs, self.const(ops[1]) if len(ops) > 1 else 0))
+
+    def instr_jalr(self, ops):
+        if len(ops) == 1 and "(" not in ops[0]:
+            rs = self.reg(ops[0])
+            if self.rvc and rs and "C_JALR" in self.c_instr:
+                self.emit_instr("C_JALR", (rs,))
+            else:
+                self.emit_instr("JALR", (1, rs, 0))
+        else:
+            self.instr_table("JALR", ops)
+
+    # CSR access with an optional destination register, e.g. fsrm rs or fsrm rd, rs
+    def instr_csr_swap(self, name, csr, ops):
+        rd = self.reg(ops[0]) if len(ops) > 1 else 0
+        value = self.const(ops[-1]) if name.endswith("I") else self.reg(ops[-1])
+        self.emit_instr(name, (rd, csr, value))
+
+    def instr_fp_move(self, name, ops):
+        fd, fs = self.freg(ops[0]), self.freg(ops[1])
+        self.emit_instr(name, (fd, fs, fs))
+
+    def instr_fence(self, ops):
+        if not ops:
+            self.emit_instr("FENCE", ())
+            return
+        bits = []
+        for op in ops:
+            value = 0
+            for char in op.lower():
+                if char not in "iorw":
+                    logging.critical("Invalid fence operand: {}".format(op))
+                    sys.exit(1)
+                value |= 8 >> "iorw".index(char)
+            bits.append(value)
+        self.emit_bytes(0x0000000f | (bits[0] << 24) | (bits[1] << 20), 4)
+
+    def instr_sfence_vma(self, ops):
+        rs1 = self.reg(ops[0]) if ops else 0
+        rs2 = self.reg(ops[1]) if len(ops) > 1 else 0
+        self.emit_bytes(self.get_encoding("SFENCE_VMA").match | (rs1 << 15) | (rs2 << 20), 4)
+
+    def instr_ebreak(self, ops):
+        if self.rvc and self.c_instr:
+            self.emit_bytes(C_EBREAK, 2)
+        else:
+            self.emit_instr("EBREAK", ())
+
+    # Conditional branch, relaxed by the layout: the compressed branch, the branch, or the
+    # inverted branch over a jump when the target is out of range
+    def branch(self, name, rs1, rs2, target, explicit=False):
+        c_name = None
+        if (explicit or self.rvc) and name in ("BEQ", "BNE") and rs2 == 0 and 8 <= rs1 < 16 \
+           and self.c_instr:
+            c_name = "C_BEQZ" if name == "BEQ" else "C_BNEZ"
+        self.section.items.append(["branch", 2 if c_name else 4, False, name, (rs1, rs2),
+                                   c_name, (rs1,), self.expr(target)])
+
+    # Unconditional jump, relaxed by the layout: the compressed jump or the jump
+    def jump(self, rd, target, c_name, explicit=False):
+        if not (explicit or (self.rvc and c_name in self.c_instr)):
+            c_name = None
+        self.section.items.append(["branch", 2 if c_name else 4, True, "JAL", (rd,),
+                                   c_name, (), self.expr(target)])
+
+    # ------------------------------------------------------------------------------------------
+    # Layout
+    # ------------------------------------------------------------------------------------------
+
+    # Size of the branch for the offset to the target, None if the target is not in the section
+    @staticmethod
+    def branch_size(item, offset):
+        _, size, jump, _, _, c_name, _, _ = item
+        if offset is None:
+            return 4 if jump else 8
+        if c_name and -(1 << (11 if jump else 8)) <= offset < (1 << (11 if jump else 8)):
+            return 2
+        if jump or -4096 <= offset < 4096:
+            return 4
+        return 6 if c_name else 8
+
+    # Offsets of the items of the section, the code alignment is the worst case of the
+    # assembler before the linker relaxation when relax is set
+    def get_positions(self, section, relax):
+        positions = []
+        offset = 0
+        for item in section.items:
+            positions.append(offset)
+            if type(item) is bytearray:
+                offset += len(item)
+            elif item[0] == "label":
+                self.label_offset[item[1]] = offset
+            elif item[0] == "align":
+                _, alignment, _, code, align_relax, rvc = item
+                if relax and code and align_relax:
+                    offset += max(alignment - (2 if rvc else 4), 0)
+                else:
+                    offset += -offset % alignment
+            else:
+                offset += item[1]
+        return positions, offset
+
+    def relax_branches(self, section):
+        changed = True
+        while changed:
+            changed = False
+            positions, _ = self.get_positions(section, True)
+            for item, position in zip(section.items, positions):
+                if type(item) is not bytearray and item[0] == "branch":
+                    symbol, addend = item[7]
+                    offset = None
+                    if symbol is not None and self.labels.get(symbol) is section:
+                        offset = self.label_offset[symbol] + addend - position
+                    size = self.branch_size(item, offset)
+                    if size > item[1]:
+                        item[1] = size
+                        changed = True
+
+    def link(self, link_script):
+        for section in self.sections.values():
+            if "x" in section.flags:
+                self.relax_branches(section)
+            section.positions, section.size = self.get_positions(section, False)
+        statements = self.parse_link_script(link_script)
+        allocated = [section for section in self.sections.values() if "a" in section.flags]
+        placed = set()
+        output = []
+        for statement in statements:
+            if statement[0] == "section":
+                inputs = [section for section in allocated
+                          if section.name in statement[2] and section.name not in placed]
+                placed.update(section.name for section in inputs)
+                output.append(("section", statement[1], inputs))
+            else:
+                output.append(statement)
+        # Orphan sections are placed after the output section of the same kind, in the order
+        # of the input, as the GNU linker does
+        for section in allocated:
+            if section.name in placed:
+                continue
+            after = ".text" if "x" in section.flags else ".bss" if section.nobits else ".data"
+            index = len(output)
+            for i, statement in enumerate(output):
+                if statement[0] == "section" and statement[1] == after:
+                    index = i + 1
+                    while index < len(output) and output[index][0] == "orphan":
+                        index += 1
+                    break
+            output.insert(index, ("orphan", section.name, [section]))
+        dot = 0
+        for statement in output:
+            if statement[0] == "dot":
+                dot = self.eval_link_expr(statement[1], dot)
+            elif statement[0] == "symbol":
+                self.abs_symbols[statement[1]] = self.eval_link_expr(statement[2], dot)
+            elif statement[2]:
+                inputs = statement[2]
+                dot += -dot % max(section.align for section in inputs)
+                start = dot
+                for section in inputs:
+                    dot += -dot % section.align
+                    section.addr = dot
+                    dot += section.size
+                self.output_sections.append((statement[1], start, dot - start, inputs))
+        for section in allocated:
+            section.data = self.get_section_data(section)
+
+    def parse_link_script(self, link_script):
+        try:
+            with open(link_script) as script_file:
+                script = script_file.read()
+        except OSError as error:
+            logging.critical("Cannot read linker script {}: {}".format(link_script, error))
+            sys.exit(1)
+        script = re.sub(r"/\*.*?\*/", "", script, flags=re.S)
+        match = re.search(r"SECTIONS\s*{(.*)}", script, re.S)
+        if match is None:
+            logging.critical("No SECTIONS command in linker script {}".format(link_script))
+            sys.exit(1)
+        body = match.group(1)
+        statements = []
+        pos = 0
+        while body[pos:].strip():
+            match = link_statement_re.match(body, pos)
+            if match is None:
+                logging.critical("Unsupported linker script statement: {}".format(
+                                 body[pos:].strip().splitlines()[0]))
+                sys.exit(1)
+            if match.group(1) is not None:
+                statements.append(("dot", match.group(1).strip()))
+            elif match.group(2) is not None:
+                statements.append(("section", match.group(2),
+                                   " ".join(re.findall(r"\*\(([^)]*)\)",
+                                                       match.group(3))).split()))
+            else:
+                statements.append(("symbol", match.group(4), match.group(5).strip()))
+            pos = match.end()
+        return statements
+
+    @staticmethod
+    def eval_link_expr(text, dot):
+        match = re.fullmatch(r"ALIGN\s*\(\s*(\w+)\s*\)", text)
+        if match:
+            alignment = parse_number(match.group(1))
+            return dot + (-dot % alignment)
+        if text == ".":
+            return dot
+        try:
+            return parse_number(text)
+        except ValueError:
+            logging.critical("Unsupported linker script expression: {}".format(text))
+            sys.exit(1)
+
+    def symbol_value(self, symbol, addend):
+        if symbol is None:
+            return addend
+        section = self.labels.get(symbol)
+        if section is not None:
+            return section.addr + self.label_offset[symbol] + addend
+        if symbol in self.abs_symbols:
+            return self.abs_symbols[symbol] + addend
+        logging.critical("Undefined symbol: {}".format(symbol.replace("\x02", "")))
+        sys.exit(1)
+
+    # ------------------------------------------------------------------------------------------
+    # Encoding after the link
+    # ------------------------------------------------------------------------------------------
+
+    def get_section_data(self, section):
+        if section.nobits:
+            return b""
+        data = bytearray(section.size)
+        for item, position in zip(section.items, section.positions):
+            if type(item) is bytearray:
+                data[position:position + len(item)] = item
+            elif item[0] == "align":
+                _, alignment, fill, code, align_relax, rvc = item
+                size = -position % alignment
+                if code:
+                    fill = self.get_code_fill(size, align_relax)
+                else:
+                    fill = bytes([fill & 0xff]) * size
+                data[position:position + size] = fill
+            elif item[0] == "branch":
+                code = self.encode_branch(item, section.addr + position)
+                data[position:position + len(code)] = code
+            elif item[0] == "fixup":
+                _, size, fixup, args = item
+                data[position:position + size] = fixup(section.addr + position, *args)
+        return bytes(data)
+
+    # Code alignment: the linker writes the NOPs then a compressed NOP, the assembler without
+    # relaxation writes the compressed NOP first
+    @staticmethod
+    def get_code_fill(size, relax):
+        nops = NOP.to_bytes(4, "little") * (size // 4)
+        if size % 4 == 0:
+            return nops
+        pad = C_NOP.to_bytes(2, "little") if size % 4 >= 2 else b""
+        pad += bytes(size % 2)
+        return nops + pad if relax else pad + nops
+
+    def encode_branch(self, item, pc):
+        _, size, jump, name, regs, c_name, c_regs, (symbol, addend) = item
+        offset = self.symbol_value(symbol, addend) - pc
+        if size == 2:
+            return self.encode(c_name, c_regs + (offset,))[0].to_bytes(2, "little")
+        if size == 4:
+            return self.encode(name, regs + (offset,))[0].to_bytes(4, "little")
+        # Inverted branch over a jump to the target
+        if size == 6:
+            inverted = "C_BNEZ" if c_name == "C_BEQZ" else "C_BEQZ"
+            code = self.encode(inverted, c_regs + (6,))[0].to_bytes(2, "little")
+        else:
+            binary = self.encode(name, regs + (8,))[0] ^ (1 << 12)
+            code = binary.to_bytes(4, "little")
+        return code + self.encode("JAL", (0, offset - len(code)))[0].to_bytes(4, "little")
+
+    def fixup_data(self, pc, size, symbol, addend):
+        value = self.symbol_value(symbol, addend) & ((1 << (size * 8)) - 1)
+        return value.to_bytes(size, "little")
+
+    # AUIPC and the instruction with the low 12 bits of the PC relative address
+    def fixup_pcrel(self, pc, name, reg, tmp, target):
+        offset = self.symbol_value(*target) - pc
+        if self.xlen == 32:
+            offset = ((offset + (1 << 31)) & 0xffffffff) - (1 << 31)
+        hi = (offset + 0x800) >> 12
+        lo = offset - (hi << 12)
+        code = self.encode("AUIPC", (tmp, hi & 0xfffff))[0]
+        binary = self.encode(name, (reg, tmp, lo))[0]
+        return code.to_bytes(4, "little") + binary.to_bytes(4, "little")
+
+    # ------------------------------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------------------------------
+
+    def get_e_flags(self):
+        flags = 0x1 if self.rvc_used else 0
+        abi = re.match(r"(?:ilp32|lp64)([efdq]?)", self.mabi)
+        float_abi = abi.group(1) if abi else ""
+        return flags | {"": 0, "f": 0x2, "d": 0x4, "q": 0x6, "e": 0x8}[float_abi]
+
+    def write_elf(self, elf):
+        is64 = self.xlen == 64
+        ehdr_size, phdr_size, shdr_size = (64, 56, 64) if is64 else (52, 32, 40)
+        sections = [(name, addr, size, inputs) for name, addr, size, inputs
+                    in self.output_sections if size]
+        header_size = ehdr_size + phdr_size * len(sections)
+        first_addr = sections[0][1] if sections else 0
+        base = first_addr % 0x1000
+        if base < header_size:
+            base += 0x1000
+        image = bytearray(base)
+        section_info = []
+        for name, addr, size, inputs in sections:
+            nobits = all(section.nobits for section in inputs)
+            offset = base + addr - first_addr
+            if not nobits:
+                if len(image) < offset:
+                    image += bytes(offset - len(image))
+                data = bytearray(size)
+                for section in inputs:
+                    data[section.addr - addr:section.addr - addr + len(section.data)] = \
+                        section.data
+                image[offset:offset + size] = data
+            else:
+                offset = len(image)
+            flags = 2 | (1 if any("w" in section.flags for section in inputs) else 0) | \
+                (4 if any("x" in section.flags for section in inputs) else 0)
+            align = max(section.align for section in inputs)
+            section_info.append((name, 8 if nobits else 1, flags, addr, offset, size, align))
+        # Symbol table: the local labels then the global labels and the linker symbols
+        strtab = bytearray(b"\0")
+        symbols = []
+        section_index = {}
+        for i, (name, addr, size, inputs) in enumerate(sections):
+            for section in inputs:
+                section_index[section.name] = i + 1
+        for is_global in [False, True]:
+            for name, section in self.labels.items():
+                if "\x02" in name or name.startswith(".L") or \
+                   (name in self.global_symbols) != is_global:
+                    continue
+                symbols.append((len(strtab), self.symbol_value(name, 0),
+                                (1 if is_global else 0) << 4,
+                                section_index.get(section.name, 0xfff1)))
+                strtab += name.encode() + b"\0"
+            if not is_global:
+                first_global = len(symbols) + 1
+                continue
+            for name, value in self.abs_symbols.items():
+                symbols.append((len(strtab), value, 1 << 4, 0xfff1))
+                strtab += name.encode() + b"\0"
+        symtab = bytearray(bytes(24 if is64 else 16))
+        for name, value, info, shndx in symbols:
+            if is64:
+                symtab += struct.pack("<IBBHQQ", name, info, 0, shndx, value, 0)
+            else:
+                symtab += struct.pack("<IIIBBH", name, value, 0, info, 0, shndx)
+        shstrtab = bytearray(b"\0")
+        names = []
+        for name in [info[0] for info in section_info] + [".symtab", ".strtab", ".shstrtab"]:
+            names.append(len(shstrtab))
+            shstrtab += name.encode() + b"\0"
+        image += bytes(-len(image) % 8)
+        symtab_offset = len(image)
+        image += symtab
+        strtab_offset = len(image)
+        image += strtab
+        shstrtab_offset = len(image)
+        image += shstrtab
+        image += bytes(-len(image) % 8)
+        shdr_offset = len(image)
+        symtab_index = len(section_info) + 1
+        shdrs = [(0, 0, 0, 0, 0, 0, 0, 0, 0, 0)]
+        for (name, sh_type, flags, addr, offset, size, align), name_offset in \
+                zip(section_info, names):
+            shdrs.append((name_offset, sh_type, flags, addr, offset, size, 0, 0, align, 0))
+        shdrs.append((names[-3], 2, 0, 0, symtab_offset, len(symtab), symtab_index + 1,
+                      first_global, 8 if is64 else 4, 24 if is64 else 16))
+        shdrs.append((names[-2], 3, 0, 0, strtab_offset, len(strtab), 0, 0, 1, 0))
+        shdrs.append((names[-1], 3, 0, 0, shstrtab_offset, len(shstrtab), 0, 0, 1, 0))
+        for shdr in shdrs:
+            name, sh_type, flags, addr, offset, size, link, info, align, entsize = shdr
+            if is64:
+                image += struct.pack("<IIQQQQIIQQ", name, sh_type, flags, addr, offset, size,
+                                     link, info, align, entsize)
+            else:
+                image += struct.pack("<IIIIIIIIII", name, sh_type, flags, addr, offset, size,
+                                     link, info, align, entsize)
+        phdrs = bytearray()
+        for name, sh_type, flags, addr, offset, size, align in section_info:
+            p_flags = 4 | (2 if flags & 1 else 0) | (1 if flags & 4 else 0)
+            filesz = 0 if sh_type == 8 else size
+            if is64:
+                phdrs += struct.pack("<IIQQQQQQ", 1, p_flags, offset, addr, addr, filesz, size,
+                                     0x1000)
+            else:
+                phdrs += struct.pack("<IIIIIIII", 1, offset, addr, addr, filesz, size, p_flags,
+                                     0x1000)
+        entry = self.symbol_value("_start", 0) if "_start" in self.labels else first_addr
+        ident = b"\x7fELF" + bytes([2 if is64 else 1, 1, 1, 0]) + bytes(8)
+        header_format = "<16sHHIQQQIHHHHHH" if is64 else "<16sHHIIIIIHHHHHH"
+        header = struct.pack(header_format, ident, 2, 243, 1, entry, ehdr_size, shdr_offset,
+                             self.get_e_flags(), ehdr_size, phdr_size, len(section_info),
+                             shdr_size, len(shdrs), len(shdrs) - 1)
+        image[0:len(header)] = header
+        image[ehdr_size:ehdr_size + len(phdrs)] = phdrs
+        with open(elf, "wb") as elf_file:
+            elf_file.write(image)
+
+    # Loaded sections with their content, in address order
+    def get_image_sections(self):
+        return sorted((section for section in self.sections.values()
+                       if "a" in section.flags and not section.nobits and section.size),
+                      key=lambda section: section.addr)
+
+    # Plain binary of the loaded sections, from the lowest to the highest address, as written
+    # by objcopy -O binary
+    def write_binary(self, binary):
+        sections = self.get_image_sections()
+        image = bytearray()
+        if sections:
+            start = sections[0].addr
+            end = max(section.addr + section.size for section in sections)
+            image = bytearray(end - start)
+            for section in sections:
+                image[section.addr - start:section.addr - start + section.size] = section.data
+        with open(binary, "wb") as binary_file:
+            binary_file.write(image)
+
+    # Verilog $readmemh image as written by objcopy -O verilog: an @ byte address line per
+    # section, followed by the bytes, 16 per line
+    def write_hex(self, hex_file):
+        lines = []
+        for section in self.get_image_sections():
+            lines.append("@{:08X}".format(section.addr))
+            text = bytes(section.data).hex(" ").upper()
+            lines.extend(text[i:i + 47] for i in range(0, len(text), 48))
+        with open(hex_file, "w") as out:
+            out.write("\n".join(lines) + "\n")
+
+    # Word addressed image of 32-bit words, each line starts with the @ word address of its
+    # first word and holds up to 8 words
+    def write_vmem(self, vmem):
+        lines = []
+        for section in self.get_image_sections():
+            start = section.addr & ~3
+            data = bytearray(section.addr - start) + section.data
+            data += bytes(-len(data) % 4)
+            # The hex digits of a word are written from its most significant byte
+            words = bytearray(len(data))
+            for i in range(4):
+                words[i::4] = data[3 - i::4]
+            text = words.hex(" ", 4).upper()
+            for i in range(0, len(text), 72):
+                lines.append("@{:08X} {}".format((start + i // 9 * 4) // 4, text[i:i + 71]))
+        with open(vmem, "w") as out:
+            out.write("\n".join(lines) + "\n")
+
+
+# Assemble and link an assembly program, write the ELF executable and the plain binary
+def emit_elf(asm, elf, binary, isa, mabi, include_dirs, link_script, relax=True):
+    emitter = riscv_elf_emitter(isa, mabi, include_dirs, relax)
+    emitter.assemble_file(asm)
+    emitter.link(link_script)
+    emitter.write_elf(elf)
+    emitter.write_binary(binary)
+
+
+# Assemble and link the lines of a program, write the memory images of the formats (bin, hex
+# or vmem) to prefix.<format>
+def emit_mem_image(lines, prefix, formats, isa, mabi, include_dirs, link_script, relax=True):
+    emitter = riscv_elf_emitter(isa, mabi, include_dirs, relax)
+    emitter.assemble(lines)
+    emitter.link(link_script)
+    writers = {"bin": emitter.write_binary, "hex": emitter.write_hex,
+               "vmem": emitter.write_vmem}
+    for image_format in formats:
+        writers[image_format]("{}.{}".format(prefix, image_format))
@@ -0,0 +1,173 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# ---------------------------------------------------------------------------------------------
+# Generation context: the configuration (cfg) and the core setting (rcs) of a test, created
+# from the command line options of the test. Several contexts of different targets and options
+# can be created in one process, the generator modules use the one which is active:
+#   rv32imc = riscv_gen_context(["--target=rv32imc", "--num_of_tests=2"])
+#   multi_harts = riscv_gen_context(["--target=multi_harts", "--asm_file_name=mh"])
+#   rv32imc.gen_tests()
+#   multi_harts.gen_tests()
+#   with rv32imc:
+#       riscv_instr_base_test().run()
+# The batch mode generates the tests of a list of command lines back to back, one per line of
+# the batch file (or stdin):
+#   python3 pygen/pygen_src/riscv_gen_context.py --batch=tests.txt
+# ---------------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shlex
+import logging
+import argparse
+import importlib.util
+from bitstring import BitArray
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+if __name__ == "__main__":
+    # --batch is removed from the command line options parsed by riscv_instr_gen_config
+    parse = argparse.ArgumentParser()
+    parse.add_argument('--batch', help = 'File of the command lines, stdin when empty',
+                       default = "")
+    args, sys.argv[1:] = parse.parse_known_args()
+    # The test modules generate their tests when imported with gen_test set to their name
+    sys.argv.append("--gen_test=riscv_gen_context")
+from importlib import import_module  # NOQA
+from pygen_src.riscv_instr_pkg import riscv_instr_pkg  # NOQA
+import pygen_src.riscv_instr_gen_config as riscv_instr_gen_config_module  # NOQA
+from pygen_src.riscv_instr_gen_config import riscv_instr_gen_config  # NOQA
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+
+# Template instructions of each target, see riscv_instr.create_instr_templates. The templates
+# of the configuration of the command line are the ones of riscv_instr.
+instr_templates = {
+    riscv_instr_gen_config_module.cfg.argv.target: (riscv_instr.instr_template,
+                                                    riscv_instr.instr_desc,
+                                                    riscv_instr.asm_templates)
+}
+
+
+# Load the riscv_core_setting module of a target. The module is not shared with the other
+# contexts, the configuration adds the ISA of --march_isa to its supported_isa.
+def load_core_setting(target):
+    spec = importlib.util.find_spec("pygen_src.target." + target + ".riscv_core_setting")
+    if spec is None:
+        logging.critical("Cannot find the core setting of the target {}".format(target))
+        sys.exit(1)
+    core_setting = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(core_setting)
+    return core_setting
+
+
+class riscv_gen_context:
+    # The command line options are parsed from argv as done for sys.argv by the generator
+    def __init__(self, argv=None):
+        parse = argparse.ArgumentParser(add_help = False)
+        parse.add_argument('--target', default = "rv32imc")
+        self.target = parse.parse_known_args(argv)[0].target
+        self.rcs = load_core_setting(self.target)
+        self.instr_templates = instr_templates.setdefault(self.target, ({}, {}, {}))
+        # Values replaced by the activation, restored when the context is deactivated
+        self.saved_values = []
+        self.bind({"rcs": self.rcs})
+        try:
+            self.cfg = riscv_instr_gen_config(argv, self.rcs)
+        finally:
+            self.unbind()
+
+    # The names of the generator modules which refer to the current value of a name of
+    # riscv_instr_gen_config are bound to the value of the context
+    def bind(self, values):
+        saved_values = []
+        current_values = {name: getattr(riscv_instr_gen_config_module, name)
+                          for name in values}
+        for module in list(sys.modules.values()):
+            for name, value in values.items():
+                if getattr(module, name, None) is current_values[name]:
+                    saved_values.append((module, name, current_values[name]))
+                    setattr(module, name, value)
+        self.saved_values.append(saved_values)
+
+    def unbind(self):
+        for obj, name, value in reversed(self.saved_values.pop()):
+            setattr(obj, name, value)
+
+    # Make the configuration and the core setting of the context the ones of the generator
+    def activate(self):
+        self.bind({"cfg": self.cfg, "rcs": self.rcs})
+        saved_values = self.saved_values[-1]
+        # Per-target state of the classes
+        for name, value in zip(["instr_template", "instr_desc", "asm_templates"],
+                               self.instr_templates):
+            saved_values.append((riscv_instr, name, getattr(riscv_instr, name)))
+            setattr(riscv_instr, name, value)
+        for name, mask in [("MPRV_BIT_MASK", 0x1 << 0x17), ("SUM_BIT_MASK", 0x1 << 0x18),
+                           ("MPP_BIT_MASK", 0x3 << 0x11)]:
+            saved_values.append((riscv_instr_pkg, name, getattr(riscv_instr_pkg, name)))
+            setattr(riscv_instr_pkg, name, BitArray(uint = mask, length = self.rcs.XLEN))
+        riscv_instr.get_instr_candidates.cache_clear()
+        riscv_instr.get_instr_dist.cache_clear()
+        # The instructions of the ISA extensions are registered when their module is imported
+        for isa in self.rcs.supported_isa:
+            import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+
+    def deactivate(self):
+        riscv_instr.get_instr_candidates.cache_clear()
+        riscv_instr.get_instr_dist.cache_clear()
+        self.unbind()
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.deactivate()
+
+    # Generate the tests of the configuration with the test class of --gen_test
+    def gen_tests(self):
+        # The test module is imported out of the context, it would generate the tests of
+        # the context at import
+        test_module = import_module("pygen_src.test." + self.cfg.argv.gen_test)
+        with self:
+            getattr(test_module, self.cfg.argv.gen_test)().run()
+
+
+# Generate the tests of the command lines of the batch file back to back
+def main():
+    batch_file = open(args.batch) if args.batch else sys.stdin
+    failed = 0
+    with batch_file:
+        for line in batch_file:
+            argv = shlex.split(line, comments = True)
+            if not argv:
+                continue
+            start_time = time.time()
+            try:
+                context = riscv_gen_context(argv)
+                logging.basicConfig(filename='{}'.format(context.cfg.argv.log_file_name),
+                                    filemode='w',
+                                    format="%(asctime)s %(filename)s %(lineno)s %(levelname)s "
+                                           "%(message)s",
+                                    level=logging.DEBUG, force=True)
+                context.gen_tests()
+                status = "passed"
+            except SystemExit as exit_status:
+                status = "passed" if not exit_status.code else "failed"
+            failed += status == "failed"
+            print("{}: {} in {:.2f}s".format(" ".join(argv), status, time.time() - start_time))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
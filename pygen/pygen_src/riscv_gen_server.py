@@ -0,0 +1,180 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+# ---------------------------------------------------------------------------------------------
+# Generator server: the generator modules of a target are imported and the template
+# instructions are created once, each generation request then runs in a forked process.
+# The requests and the responses are JSON lines, read from a UNIX socket with --socket, or
+# from stdin and written to stdout otherwise.
+#   request  : {"script": "<path>/riscv_instr_base_test.py", "argv": [<generator options>],
+#               "seed": <seed>, "cwd": <working directory>}
+#   response : {"status": "passed" or "failed", "returncode": <exit code of the test>,
+#               "error": <traceback>, "asm": [<generated tests>],
+#               "time": {"cfg": <s>, "gen": <s>, "total": <s>}}
+# The request runs as "python3 <script> <argv>" would, in the generation context created from
+# argv (see riscv_gen_context). The template instructions of the target of the server are
+# shared by the requests, the ones of the other targets are created by each request.
+# Usage:
+#   python3 pygen/pygen_src/riscv_gen_server.py --target=rv32imc --socket=/tmp/pygen.sock
+# ---------------------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import runpy
+import random
+import signal
+import logging
+import argparse
+import traceback
+import socketserver
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+# --socket is removed from the command line options parsed by riscv_instr_gen_config
+parse = argparse.ArgumentParser()
+parse.add_argument('--socket', help = 'UNIX socket of the server, stdin/stdout when empty',
+                   default = "")
+args, sys.argv[1:] = parse.parse_known_args()
+# The test modules generate their tests when imported with gen_test set to their name
+sys.argv.append("--gen_test=riscv_gen_server")
+from importlib import import_module  # NOQA
+import pygen_src.riscv_instr_pkg  # NOQA
+from pygen_src.riscv_instr_gen_config import cfg, rcs  # NOQA
+for isa in rcs.supported_isa:
+    import_module("pygen_src.isa." + isa.name.lower() + "_instr")
+from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
+import pygen_src.test.riscv_instr_base_test  # NOQA
+from pygen_src.riscv_gen_context import riscv_gen_context  # NOQA
+
+
+# Names of the assembly tests of the configuration, as generated by riscv_instr_base_test
+def get_asm_tests(test_cfg):
+    asm_file_name = test_cfg.argv.asm_file_name
+    if test_cfg.asm_test_suffix != "":
+        asm_file_name = "{}.{}".format(asm_file_name, test_cfg.asm_test_suffix)
+    return ["{}_{}.S".format(asm_file_name, num + test_cfg.argv.start_idx)
+            for num in range(test_cfg.num_of_tests)]
+
+
+# Generate the tests of a request, in the forked process
+def gen_test(request):
+    result = {"status": "failed", "returncode": 0, "error": "", "asm": [], "time": {}}
+    start_time = time.time()
+    try:
+        os.chdir(request.get("cwd", "."))
+        if request.get("seed") is not None:
+            random.seed(request["seed"])
+        argv = [str(arg) for arg in request.get("argv", [])]
+        # The context stays active until the end of the forked process
+        context = riscv_gen_context(argv)
+        context.activate()
+        test_cfg = context.cfg
+        logging.basicConfig(filename='{}'.format(test_cfg.argv.log_file_name),
+                            filemode='w',
+                            format="%(asctime)s %(filename)s %(lineno)s %(levelname)s %(message)s",
+                            level=logging.DEBUG, force=True)
+        result["time"]["cfg"] = time.time() - start_time
+        sys.argv = [request["script"]] + argv
+        runpy.run_path(request["script"], run_name="__main__")
+    except SystemExit as exit_status:
+        result["returncode"] = (exit_status.code if isinstance(exit_status.code, int)
+                                else int(exit_status.code is not None))
+    except Exception:
+        result["returncode"] = 1
+        result["error"] = traceback.format_exc()
+    if result["returncode"] == 0 and "cfg" in result["time"]:
+        result["asm"] = [asm for asm in get_asm_tests(test_cfg) if os.path.isfile(asm)]
+        result["status"] = "passed"
+    result["time"]["gen"] = time.time() - start_time
+    return result
+
+
+# Run a request in a forked process, the state of the server is not changed by the request
+def run_request(request):
+    start_time = time.time()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.close(read_fd)
+        # stdout is the response stream of the server
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        result = gen_test(request)
+        logging.shutdown()
+        with os.fdopen(write_fd, "w") as result_file:
+            json.dump(result, result_file)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as result_file:
+        data = result_file.read()
+    _, status = os.waitpid(pid, 0)
+    if data:
+        result = json.loads(data)
+    else:
+        result = {"status": "failed", "returncode": 1, "asm": [], "time": {},
+                  "error": "The generator process exited with status {}".format(status)}
+    result["time"]["total"] = time.time() - start_time
+    return result
+
+
+def serve(line):
+    try:
+        request = json.loads(line)
+        if "script" not in request:
+            raise ValueError("no script in the request")
+    except ValueError as error:
+        return {"status": "failed", "returncode": 1, "asm": [], "time": {},
+                "error": "Invalid request: {}".format(error)}
+    result = run_request(request)
+    logging.info("{} {}: {} in {:.2f}s".format(request["script"], " ".join(
+        str(arg) for arg in request.get("argv", [])), result["status"],
+        result["time"]["total"]))
+    return result
+
+
+class riscv_gen_request_handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write((json.dumps(serve(line)) + "\n").encode())
+                self.wfile.flush()
+
+
+# A connection is handled in a forked process, the requests of a connection run one by one
+class riscv_gen_server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    max_children = os.cpu_count()
+
+
+def main():
+    riscv_instr.create_instr_templates()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if args.socket == "":
+        logging.info("Generator server of {} ready on stdin".format(cfg.argv.target))
+        for line in sys.stdin:
+            if line.strip():
+                sys.stdout.write(json.dumps(serve(line)) + "\n")
+                sys.stdout.flush()
+        return
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    try:
+        with riscv_gen_server(args.socket, riscv_gen_request_handler) as server:
+            logging.info("Generator server of {} ready on {}".format(
+                cfg.argv.target, args.socket))
+            server.serve_forever()
+    finally:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,12 +12,17 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 
+import os
+import sys
+import json
+import random
 import vsc
 import logging
 from enum import IntEnum, auto
 from importlib import import_module
 from pygen_src.riscv_instr_gen_config import cfg
 from pygen_src.riscv_instr_pkg import riscv_instr_group_t
+from pygen_src.riscv_instr_dist import riscv_alias_table
 rcs = import_module("pygen_src.target." + cfg.argv.target + ".riscv_core_setting")
 
 
@@ -54,6 +59,214 @@ class reserved_c_instr_e(IntEnum):
     kReservedC2 = auto()
 
 
+# Weight of each illegal instruction type, same as exception_dist_c
+illegal_instr_type_weight = {
+    illegal_instr_type_e.kIllegalOpcode: 3,
+    illegal_instr_type_e.kIllegalCompressedOpcode: 1,
+    illegal_instr_type_e.kIllegalFunc3: 1,
+    illegal_instr_type_e.kIllegalFunc7: 1,
+    illegal_instr_type_e.kReservedCompressedInstr: 1,
+    illegal_instr_type_e.kHintInstr: 3,
+    illegal_instr_type_e.kIllegalSystemInstr: 3
+}
+
+compressed_illegal_instr_type = [illegal_instr_type_e.kIllegalCompressedOpcode,
+                                 illegal_instr_type_e.kReservedCompressedInstr,
+                                 illegal_instr_type_e.kHintInstr]
+
+# Encoding pools built by riscv_illegal_instr.get_pool, per target configuration
+illegal_instr_pools = {}
+
+
+# ---------------------------------------------------------------------------------------------
+# Encoding pools of the illegal and HINT instructions of a target configuration.
+# The pool of each illegal_instr_type_e is a list of encoding templates
+# [weight, mask, value, exclude, name]: the bits of mask are fixed to value, the other bits are
+# random and the encoding must not match any [mask, value] pair of exclude. name is the
+# reserved_c_instr_e of a reserved compressed instruction. The templates follow the constraints
+# of riscv_illegal_instr, they are built once per target (and can be cached on disk), then the
+# illegal instructions are drawn from the pools without constraint solving.
+# ---------------------------------------------------------------------------------------------
+class riscv_illegal_instr_pool:
+    # Version of the cache file format
+    version = 1
+
+    def __init__(self, pools):
+        self.pools = pools
+        self.template_table = {}
+        for exception, templates in self.pools.items():
+            if len(templates) > 0:
+                self.template_table[exception] = riscv_alias_table([t[0] for t in templates])
+        # Types drawn for the illegal instructions and for the HINT instructions
+        self.exception_types = {}
+        self.exception_table = {}
+        for hint in [0, 1]:
+            exception_types = [e for e in illegal_instr_type_weight
+                               if (e == illegal_instr_type_e.kHintInstr) == hint and
+                               e.name in self.template_table]
+            if len(exception_types) > 0:
+                self.exception_types[hint] = exception_types
+                self.exception_table[hint] = riscv_alias_table(
+                    [illegal_instr_type_weight[e] for e in exception_types])
+
+    @classmethod
+    def build(cls, legal_opcode, legal_c00_opcode, legal_c10_opcode, xlen, csrs, b_extension):
+        legal_opcode = set(legal_opcode)
+        pools = {e.name: [] for e in illegal_instr_type_e}
+
+        # Legal func3 (illegal = 0) or illegal func3 (illegal = 1) of an opcode, see
+        # illegal_func3_c. None when the opcode has no func3 constraint.
+        def func3_list(opcode, illegal):
+            if xlen == 32:
+                store_func3 = [3, 4, 5, 6, 7]
+                load_func3 = [3, 7]
+            else:
+                store_func3 = [4, 5, 6, 7]
+                load_func3 = [7]
+            illegal_func3 = {103: [1, 2, 3, 4, 5, 6, 7], 99: [2, 3], 35: store_func3,
+                             3: load_func3, 15: [2, 3, 4, 5, 6, 7], 115: [4],
+                             27: [2, 3, 4, 6, 7], 59: [2, 3]}
+            if opcode not in illegal_func3:
+                return None if illegal else list(range(8))
+            if illegal:
+                return illegal_func3[opcode]
+            return [f for f in range(8) if f not in illegal_func3[opcode]]
+
+        def has_func3(opcode):
+            return opcode not in [55, 111, 23]
+
+        def has_func7(opcode, func3):
+            return (opcode == 19 and func3 in [1, 5]) or opcode in [51, 59]
+
+        # Templates of the 32-bit encodings with this opcode and these func3/func7, the opcode
+        # is drawn uniformly, then func3 and func7
+        # get_exclude returns the excluded [mask, value] pairs for a func3
+        def add_templates(exception, opcode, func3_values, func7_values, get_exclude = None):
+            if not has_func3(opcode):
+                func3_values = [None]
+            for func3 in func3_values:
+                values = func7_values if has_func7(opcode, func3) else [None]
+                for func7 in values:
+                    mask, value = 0x7f, opcode
+                    if func3 is not None:
+                        mask, value = mask | 0x7000, value | (func3 << 12)
+                    if func7 is not None:
+                        mask, value = mask | 0xfe000000, value | (func7 << 25)
+                    exclude = get_exclude(func3) if get_exclude else []
+                    pools[exception.name].append(
+                        [1 / (len(func3_values) * len(values)), mask, value, exclude, ""])
+
+        legal_func7 = [0, 32, 1]
+        illegal_func7 = [f for f in range(128) if f not in legal_func7]
+        func_opcode = [op for op in sorted(legal_opcode) if op != 47 and
+                       (not b_extension or op in [51, 19, 59])]
+        for opcode in range(3, 128, 4):
+            if opcode not in legal_opcode:
+                add_templates(illegal_instr_type_e.kIllegalOpcode, opcode,
+                              func3_list(opcode, 0), legal_func7)
+        for opcode in func_opcode:
+            illegal_func3 = func3_list(opcode, 1)
+            if illegal_func3 is not None:
+                add_templates(illegal_instr_type_e.kIllegalFunc3, opcode, illegal_func3,
+                              legal_func7)
+            func3_values = [f for f in func3_list(opcode, 0) if has_func7(opcode, f)]
+            if has_func3(opcode) and len(func3_values) > 0:
+                add_templates(illegal_instr_type_e.kIllegalFunc7, opcode, func3_values,
+                              illegal_func7)
+
+        # ECALL/EBREAK/xRET/WFI with non-zero RS1 and RD and invalid upper 12 bits, or invalid
+        # CSR instructions
+        def system_exclude(func3):
+            if func3 == 0:
+                return ([[0xf8000, 0], [0xf80, 0]] +
+                        [[0xfff00000, v << 20] for v in [0, 1, 2, 258, 770, 1970, 261]])
+            return [[0xfff00000, csr << 20] for csr in csrs]
+        if 115 in legal_opcode:
+            add_templates(illegal_instr_type_e.kIllegalSystemInstr, 115, func3_list(115, 0),
+                          legal_func7, system_exclude)
+
+        # 16-bit template, fields is a list of [msb, lsb, value], the bits of each mask of
+        # exclude_mask must not be all zero
+        def c_template(exception, c_msb, c_op, fields = (), exclude_mask = (), name = ""):
+            fields = [[15, 13, c_msb], [1, 0, c_op]] + list(fields)
+            # C.SLLI with shamt[5] set is reserved for RV32C, see legal_rv32_c_slli
+            if c_msb == 0 and c_op == 2 and xlen == 32:
+                fields.append([12, 12, int(exception ==
+                                           illegal_instr_type_e.kReservedCompressedInstr)])
+            mask, value = 0xffff0000, 0
+            for msb, lsb, field in fields:
+                field_mask = ((1 << (msb - lsb + 1)) - 1) << lsb
+                if mask & field_mask and (value & field_mask) != (field << lsb):
+                    return
+                mask, value = mask | field_mask, value | (field << lsb)
+            pools[exception.name].append([1, mask, value, [[m, 0] for m in exclude_mask], name])
+
+        exception = illegal_instr_type_e.kIllegalCompressedOpcode
+        for c_op, legal_c_opcode in [(0, legal_c00_opcode), (2, legal_c10_opcode)]:
+            for c_msb in range(8):
+                if c_msb not in legal_c_opcode:
+                    c_template(exception, c_msb, c_op)
+
+        exception = illegal_instr_type_e.kReservedCompressedInstr
+        reserved_c = {
+            reserved_c_instr_e.kIllegalCompressed: [0, 0, [[12, 2, 0]]],
+            reserved_c_instr_e.kReservedAddispn: [0, 0, [[12, 2, 0]]],
+            reserved_c_instr_e.kReservedAddiw: [1, 1, [[11, 7, 0]]],
+            reserved_c_instr_e.kReservedC0: [4, 1, [[12, 10, 7], [6, 5, 2]]],
+            reserved_c_instr_e.kReservedC1: [4, 1, [[12, 10, 7], [6, 5, 3]]],
+            reserved_c_instr_e.kReservedC2: [4, 0, []],
+            reserved_c_instr_e.kReservedAddi16sp: [3, 1, [[12, 12, 0], [11, 7, 2], [6, 2, 0]]],
+            reserved_c_instr_e.kReservedLui: [3, 1, [[12, 12, 0], [6, 2, 0]]],
+            reserved_c_instr_e.kReservedJr: [4, 2, [[12, 2, 0]]],
+            reserved_c_instr_e.kReservedLqsp: [1, 2, [[11, 7, 0]]],
+            reserved_c_instr_e.kReservedLwsp: [2, 2, [[11, 7, 0]]],
+            reserved_c_instr_e.kReservedLdsp: [3, 2, [[11, 7, 0]]]
+        }
+        for name, (c_msb, c_op, fields) in reserved_c.items():
+            if name == reserved_c_instr_e.kReservedAddiw and xlen == 32:
+                continue
+            c_template(exception, c_msb, c_op, fields, name = name.name)
+
+        exception = illegal_instr_type_e.kHintInstr
+        c_template(exception, 0, 1, [[12, 12, 0], [6, 2, 0]])
+        c_template(exception, 2, 1, [[11, 7, 0]])
+        c_template(exception, 4, 1, [[12, 11, 0], [6, 2, 0]])
+        c_template(exception, 4, 2, [[11, 7, 0]], [0x7c])
+        c_template(exception, 3, 1, [[11, 7, 0]], [0x107c])
+        c_template(exception, 0, 2, [[11, 7, 0]])
+        c_template(exception, 0, 2, [[12, 12, 0], [6, 2, 0]], [0xf80])
+        c_template(exception, 4, 2, [[12, 12, 1], [11, 7, 0]], [0x7c])
+        return cls(pools)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != cls.version:
+            return None
+        return cls(data["pools"])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+        with open(path, "w") as f:
+            json.dump({"version": self.version, "pools": self.pools}, f)
+
+    # Draw an illegal instruction (hint = 0) or a HINT instruction (hint = 1), return its type,
+    # its encoding and the reserved_c_instr_e name of a reserved compressed instruction
+    def sample(self, hint = 0):
+        if hint not in self.exception_table:
+            logging.critical("No {} instruction can be generated".format(
+                             "HINT" if hint else "illegal"))
+            sys.exit(1)
+        exception = self.exception_types[hint][self.exception_table[hint].sample()]
+        templates = self.pools[exception.name]
+        _, mask, value, exclude, name = templates[self.template_table[exception.name].sample()]
+        while True:
+            instr_bin = (random.getrandbits(32) & ~mask) | value
+            if not any((instr_bin & m) == v for m, v in exclude):
+                return exception, instr_bin, name
+
+
 @vsc.randobj
 class riscv_illegal_instr:
     def __init__(self):
@@ -162,8 +375,8 @@ class riscv_illegal_instr:
     @vsc.constraint
     def b_extension_c(self):
         if riscv_instr_group_t.RV32B in rcs.supported_isa:
-            with vsc.if_then(self.exception in [illegal_instr_type_e.kIllegalFunc3,
-                                                illegal_instr_type_e.kIllegalFunc7]):
+            with vsc.if_then(self.exception.inside(vsc.rangelist(
+                    illegal_instr_type_e.kIllegalFunc3, illegal_instr_type_e.kIllegalFunc7))):
                 self.opcode.inside(vsc.rangelist([51, 19, 59]))
 
     @vsc.constraint
@@ -338,7 +551,7 @@ class riscv_illegal_instr:
     def initialize(self):
         if (riscv_instr_group_t.RV32F in rcs.supported_isa) or \
                 (riscv_instr_group_t.RV32D in rcs.supported_isa):
-            self.legal_opcode.extend(7, 39, 67, 71, 75, 79, 83)
+            self.legal_opcode.extend([7, 39, 67, 71, 75, 79, 83])
         if riscv_instr_group_t.RV64I in rcs.supported_isa:
             self.legal_opcode.append(27)
         if riscv_instr_group_t.RV32A in rcs.supported_isa:
@@ -347,10 +560,45 @@ class riscv_illegal_instr:
                 (riscv_instr_group_t.RV64M in rcs.supported_isa):
             self.legal_opcode.append(59)
         if riscv_instr_group_t.RV64I in rcs.supported_isa:
-            self.legal_c00_opcode.extend(3, 7)
-            self.legal_c10_opcode.extend(3, 7)
+            self.legal_c00_opcode.extend([3, 7])
+            self.legal_c10_opcode.extend([3, 7])
         # TODO csr
 
+    # Encoding pools of this target configuration, built once and shared by all the instances.
+    # Call initialize first.
+    def get_pool(self):
+        key = "{}_{}".format(cfg.argv.target, "_".join(isa.name for isa in rcs.supported_isa))
+        if key in illegal_instr_pools:
+            return illegal_instr_pools[key]
+        pool = None
+        path = ""
+        if cfg.illegal_instr_pool_cache:
+            path = os.path.join(cfg.illegal_instr_pool_cache,
+                                "illegal_instr_pool_{}.json".format(key))
+            if os.path.exists(path):
+                pool = riscv_illegal_instr_pool.load(path)
+        if pool is None:
+            pool = riscv_illegal_instr_pool.build(
+                self.legal_opcode, self.legal_c00_opcode, self.legal_c10_opcode, self.xlen,
+                self.csrs, riscv_instr_group_t.RV32B in rcs.supported_isa)
+            if path:
+                pool.save(path)
+        illegal_instr_pools[key] = pool
+        return pool
+
+    # Draw an illegal instruction (hint = 0) or a HINT instruction (hint = 1) from the encoding
+    # pools, same as randomize() with the exception type constrained
+    def randomize_from_pool(self, hint = 0):
+        exception, instr_bin, name = self.get_pool().sample(hint)
+        self.exception = exception
+        self.compressed = int(exception in compressed_illegal_instr_type)
+        self.instr_bin = instr_bin
+        if not self.compressed:
+            self.opcode = instr_bin & 0x7f
+        if name:
+            self.reserved_c = reserved_c_instr_e[name]
+        self.post_randomize()
+
     def get_bin_str(self):
         if self.compressed == 1:
             local_instr_bin = self.instr_bin & 0xffff
@@ -0,0 +1,201 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import random
+import numpy as np
+from pygen_src.riscv_instr_pkg import (riscv_instr_name_t, riscv_instr_category_t,
+                                       riscv_instr_format_t, riscv_reg_t, imm_t)
+from pygen_src.isa.riscv_instr import riscv_instr
+from pygen_src.riscv_instr_gen_config import cfg, rcs
+from pygen_src.riscv_instr_columns import riscv_instr_columns
+
+
+# Random instruction stream generated at once as NumPy arrays.
+# The opcode, the GPR operands and the immediate of all the instructions are drawn as arrays,
+# the immediate is sign extended with vectorized bit operations (same as riscv_instr.extend_imm
+# and riscv_compressed_instr.extend_imm).
+# Instructions which need the constraint solver are randomized when the batch is generated,
+# the records of the other instructions are only created when they are read.
+class riscv_instr_batch:
+    def __init__(self, stream, candidates, instr_cnt, category_dist = {}):
+        rng = np.random.default_rng(random.getrandbits(64))
+        desc = [riscv_instr.instr_desc[name] for name in candidates]
+        # Per-opcode attributes
+        has_rs1 = np.array([d.has_rs1 for d in desc], dtype = bool)
+        has_rs2 = np.array([d.has_rs2 for d in desc], dtype = bool)
+        has_rd = np.array([d.has_rd for d in desc], dtype = bool)
+        has_imm = np.array([d.has_imm for d in desc], dtype = bool)
+        imm_len = np.array([d.imm_len for d in desc], dtype = np.uint64)
+        imm_mask = np.array([d.imm_mask for d in desc], dtype = np.uint64)
+        imm_rand_mask = np.array([d.imm_rand_mask for d in desc], dtype = np.uint64)
+        imm_nonzero_mask = np.array([d.imm_nonzero_mask for d in desc], dtype = np.uint64)
+        imm_align = np.array([d.template.imm_align if d.template.is_compressed else 0
+                              for d in desc], dtype = np.uint64)
+        do_extend = np.array([d.instr_name != riscv_instr_name_t.C_LUI for d in desc],
+                             dtype = bool)
+        init_imm = np.array([d.template.imm for d in desc], dtype = np.uint64)
+        is_signed = np.array([not (d.format == riscv_instr_format_t.U_FORMAT or
+                                   d.imm_type in [imm_t.UIMM, imm_t.NZUIMM]) for d in desc],
+                             dtype = bool)
+        is_branch = np.array([d.category == riscv_instr_category_t.BRANCH for d in desc],
+                             dtype = bool)
+        use_solver = np.array([not cfg.fast_gpr_randomize or d.template.has_extra_constraint()
+                               for d in desc], dtype = bool)
+
+        # Opcodes
+        if len(category_dist) > 0:
+            op = riscv_instr.get_instr_dist(tuple(category_dist.items()),
+                                            candidates).sample_array(rng, instr_cnt)
+        else:
+            op = rng.integers(0, len(candidates), instr_cnt)
+        # Do not allow branch instruction as the last instruction because there's no
+        # forward branch target
+        not_branch = np.flatnonzero(~is_branch[op])
+        instr_cnt = not_branch[-1] + 1 if len(not_branch) > 0 else 0
+        op = op[:instr_cnt]
+
+        # GPR operands, drawn from the legal registers of each opcode
+        fast = ~use_solver[op]
+        self.rs1 = np.zeros(instr_cnt, dtype = np.int64)
+        self.rs2 = np.zeros(instr_cnt, dtype = np.int64)
+        self.rd = np.zeros(instr_cnt, dtype = np.int64)
+        for i in np.unique(op[fast]):
+            idx = np.flatnonzero(op == i)
+            pool = stream.get_instr_gpr_pool(desc[i].template)
+            for has_gpr, gpr, gpr_pool in zip([has_rs1, has_rs2, has_rd],
+                                              [self.rs1, self.rs2, self.rd], pool):
+                if has_gpr[i]:
+                    gpr[idx] = np.asarray(gpr_pool, dtype = np.int64)[
+                        rng.integers(0, len(gpr_pool), len(idx))]
+
+        # Immediate
+        imm = rng.integers(0, 1 << 32, instr_cnt, dtype = np.uint64) & imm_rand_mask[op]
+        zero = (imm & imm_nonzero_mask[op] == 0) & (imm_nonzero_mask[op] != 0)
+        while np.any(zero):
+            idx = np.flatnonzero(zero)
+            imm[idx] = (rng.integers(0, 1 << 32, len(idx), dtype = np.uint64) &
+                        imm_rand_mask[op[idx]])
+            zero[idx] = imm[idx] & imm_nonzero_mask[op[idx]] == 0
+        imm = np.where(has_imm[op], imm, init_imm[op])
+        length = imm_len[op]
+        extended = imm & ((np.uint64(1) << length) - np.uint64(1))
+        sign = (extended >> np.maximum(length, np.uint64(1)) - np.uint64(1)) & np.uint64(1)
+        extended = np.where((sign == 1) & (length > 0) & is_signed[op],
+                            extended | imm_mask[op], extended)
+        # Compressed instructions shift the immediate by imm_align, except C_LUI
+        extended = (extended << imm_align[op]) & np.uint64(0xffffffff)
+        imm = np.where(do_extend[op], extended, imm)
+        self.imm = imm
+        if rcs.XLEN == 32:
+            imm_int = imm.astype(np.int64) - ((imm >> np.uint64(31)) << np.uint64(32)).astype(
+                np.int64)
+        else:
+            imm_int = imm.astype(np.int64)
+
+        self.desc = desc
+        self.op = op
+        self.has_rs1 = has_rs1
+        self.has_rs2 = has_rs2
+        self.has_rd = has_rd
+        self.imm_int = imm_int
+        self.records = [None] * instr_cnt
+        for i in np.flatnonzero(~fast):
+            self.records[i] = stream.randomize_gpr(desc[op[i]].record_type(desc[op[i]]))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        if self.records[i] is None:
+            self.records[i] = self.create_record(i)
+        return self.records[i]
+
+    def __iter__(self):
+        for i in range(len(self.records)):
+            yield self[i]
+
+    def create_record(self, i):
+        op = self.op[i]
+        desc = self.desc[op]
+        instr = desc.record_type(desc)
+        if self.has_rs1[op]:
+            instr.rs1 = riscv_reg_t(self.rs1[i])
+        if self.has_rs2[op]:
+            instr.rs2 = riscv_reg_t(self.rs2[i])
+        if self.has_rd[op]:
+            instr.rd = riscv_reg_t(self.rd[i])
+        instr.imm = int(self.imm[i])
+        instr.imm_str = str(self.imm_int[i])
+        return instr
+
+    # Create the records of all the instructions
+    def tolist(self):
+        op = self.op.tolist()
+        rs1 = self.rs1.tolist()
+        rs2 = self.rs2.tolist()
+        rd = self.rd.tolist()
+        imm = self.imm.tolist()
+        imm_int = self.imm_int.tolist()
+        has_rs1 = self.has_rs1.tolist()
+        has_rs2 = self.has_rs2.tolist()
+        has_rd = self.has_rd.tolist()
+        reg = list(riscv_reg_t)
+        for i in range(len(self.records)):
+            if self.records[i] is not None:
+                continue
+            desc = self.desc[op[i]]
+            instr = desc.record_type(desc)
+            if has_rs1[op[i]]:
+                instr.rs1 = reg[rs1[i]]
+            if has_rs2[op[i]]:
+                instr.rs2 = reg[rs2[i]]
+            if has_rd[op[i]]:
+                instr.rd = reg[rd[i]]
+            instr.imm = imm[i]
+            instr.imm_str = str(imm_int[i])
+            self.records[i] = instr
+        return list(self.records)
+
+    # Store the instructions in a riscv_instr_columns list, without creating the records
+    def tocolumns(self):
+        instr_list = riscv_instr_columns()
+        store = instr_list.store
+        row = store.add_rows(len(self.records))
+        instr_list.order = np.arange(row, row + len(self.records))
+        operands = [dict(zip(d.template.record_fields, d.operands)) for d in self.desc]
+        instr_name = np.array([d.instr_name.value for d in self.desc])
+        columns = store.columns
+        columns["instr_name"][instr_list.order] = instr_name[self.op]
+        for field, has_field in zip(["rs1", "rs2", "rd"], [self.has_rs1, self.has_rs2,
+                                                           self.has_rd]):
+            init_value = np.array([op[field].value for op in operands])
+            columns[field][instr_list.order] = np.where(has_field[self.op],
+                                                        getattr(self, field),
+                                                        init_value[self.op])
+        columns["csr"][instr_list.order] = np.array([op["csr"] for op in operands])[self.op]
+        columns["imm"][instr_list.order] = self.imm.astype(np.int64)
+        columns["idx"][instr_list.order] = -1
+        for field in store.flag_fields:
+            columns[field][instr_list.order] = -1
+        columns["has_label"][instr_list.order] = 1
+        columns["atomic"][instr_list.order] = 0
+        columns["process_load_store"][instr_list.order] = 1
+        columns["label_is_idx"][instr_list.order] = 0
+        # Instructions randomized with the constraint solver or with other operand fields
+        # are stored from their records
+        has_operands = np.array([d.template.record_fields == riscv_instr.record_fields
+                                 for d in self.desc], dtype = bool)
+        record_idx = sorted(set(np.flatnonzero(~has_operands[self.op]).tolist()) |
+                            {i for i, instr in enumerate(self.records) if instr is not None})
+        if len(record_idx) > 0:
+            instr_list.order[record_idx] = store.add_records([self[i] for i in record_idx])
+        return instr_list
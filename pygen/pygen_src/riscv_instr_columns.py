@@ -0,0 +1,427 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import types
+import numpy as np
+from pygen_src.riscv_instr_pkg import riscv_instr_name_t, riscv_reg_t
+from pygen_src.isa.riscv_instr import riscv_instr
+from pygen_src.isa.riscv_instr_record import riscv_instr_record
+from pygen_src.riscv_instr_gen_config import rcs
+
+
+# Column storage of the instructions, shared by the riscv_instr_columns lists created from it.
+# Each instruction has a fixed row, the instruction order is kept by riscv_instr_columns.
+# Operands and helper flags are stored in typed arrays, a flag set to None is stored as -1.
+# Labels, comments and the immediate strings set by the post process are kept in side tables,
+# by default the label of a row with label_is_idx is its idx and its imm_str is derived from
+# the immediate.
+# Instructions which cannot be stored in the columns (directed instructions, floating point
+# instructions...) are kept as objects, their instr_name column is -1.
+class riscv_instr_store:
+    int_fields = {"instr_name": np.int16, "csr": np.int16, "rs2": np.int8, "rs1": np.int8,
+                  "rd": np.int8, "imm": np.int64, "idx": np.int64}
+    flag_fields = ("is_branch_target", "has_label", "atomic", "branch_assigned",
+                   "process_load_store", "is_illegal_instr", "is_hint_instr",
+                   "is_local_numeric_label", "label_is_idx")
+    reg_fields = ("rs2", "rs1", "rd")
+    fields = set(int_fields) | set(flag_fields) | {"label", "comment", "imm_str"}
+
+    def __init__(self):
+        self.size = 0
+        self.capacity = 0
+        self.columns = {}
+        for field, dtype in self.int_fields.items():
+            self.columns[field] = np.zeros(0, dtype = dtype)
+        for field in self.flag_fields:
+            self.columns[field] = np.zeros(0, dtype = np.int8)
+        self.label = {}
+        self.comment = {}
+        self.imm_str = {}
+        self.objects = {}
+        self.reg = list(riscv_reg_t)
+        self.instr_names = {instr_name.value: instr_name for instr_name in riscv_instr_name_t}
+        self.attr_cache = {}
+
+    # Allocate n rows, return the first one
+    def add_rows(self, n):
+        row = self.size
+        self.size += n
+        if self.size > self.capacity:
+            self.capacity = max(self.size, 2 * self.capacity)
+            for field, column in self.columns.items():
+                new_column = np.zeros(self.capacity, dtype = column.dtype)
+                new_column[:len(column)] = column
+                self.columns[field] = new_column
+        return row
+
+    # Store an instruction object as a new row
+    def add_object(self, instr):
+        row = self.add_rows(1)
+        self.columns["instr_name"][row] = -1
+        self.objects[row] = instr
+        return row
+
+    # Store the records in new rows, the records of the basic instruction class are stored in
+    # the columns, the other ones as objects
+    def add_records(self, records):
+        row = self.add_rows(len(records))
+        rows = np.arange(row, row + len(records))
+        for i, instr in zip(rows.tolist(), records):
+            if (not isinstance(instr, riscv_instr_record) or
+                    instr.record_fields != riscv_instr.record_fields):
+                self.columns["instr_name"][i] = -1
+                self.objects[i] = instr
+                continue
+            self.columns["instr_name"][i] = instr.instr_name.value
+            self.columns["csr"][i] = instr.csr
+            for field in self.reg_fields:
+                self.columns[field][i] = getattr(instr, field).value
+            self.columns["imm"][i] = instr.imm
+            self.columns["idx"][i] = instr.idx
+            for field in self.flag_fields[:-1]:
+                value = getattr(instr, field)
+                self.columns[field][i] = -1 if value is None else value
+            self.columns["label_is_idx"][i] = 0
+            if instr.label != "":
+                self.label[i] = instr.label
+            if instr.comment != "":
+                self.comment[i] = instr.comment
+            if instr.imm_str != self.get_imm_str(instr.imm):
+                self.imm_str[i] = instr.imm_str
+        return rows
+
+    def get_imm_str(self, imm):
+        if imm >= 1 << (rcs.XLEN - 1):
+            imm -= 1 << rcs.XLEN
+        return str(imm)
+
+    def get(self, row, name):
+        if name in self.int_fields:
+            value = self.columns[name][row].item()
+            if name in self.reg_fields:
+                return self.reg[value]
+            if name == "instr_name":
+                return self.instr_names[value]
+            return value
+        if name in self.flag_fields:
+            value = self.columns[name][row].item()
+            return None if value == -1 else value
+        if name == "label":
+            if self.columns["label_is_idx"][row]:
+                return str(self.columns["idx"][row].item())
+            return self.label.get(row, "")
+        if name == "comment":
+            return self.comment.get(row, "")
+        if name == "imm_str":
+            imm_str = self.imm_str.get(row)
+            if imm_str is None:
+                return self.get_imm_str(self.columns["imm"][row].item())
+            return imm_str
+        raise AttributeError(name)
+
+    # Attribute of an opcode read from its descriptor or its template, the methods are returned
+    # as functions to be bound to the instruction
+    def get_opcode_attr(self, instr_name, name):
+        desc = riscv_instr.instr_desc[riscv_instr_name_t(instr_name)]
+        if name == "desc":
+            attr = (False, desc)
+        elif name in desc._fields:
+            attr = (False, getattr(desc, name))
+        else:
+            value = getattr(type(desc.template), name, None)
+            if isinstance(value, types.FunctionType):
+                attr = (True, value)
+            else:
+                attr = (False, getattr(desc.template, name))
+        self.attr_cache[(instr_name, name)] = attr
+        return attr
+
+    def set(self, row, name, value):
+        if name in self.reg_fields:
+            self.columns[name][row] = value.value
+        elif name in self.int_fields:
+            self.columns[name][row] = value
+        elif name in self.flag_fields:
+            self.columns[name][row] = -1 if value is None else value
+        elif name == "label":
+            self.columns["label_is_idx"][row] = 0
+            self.label[row] = value
+        elif name == "comment":
+            self.comment[row] = value
+        elif name == "imm_str":
+            self.imm_str[row] = value
+        else:
+            raise AttributeError(name)
+
+
+# View of an instruction stored in the columns of a riscv_instr_store. Like riscv_instr_record,
+# the opcode attributes are read from the descriptor of the instruction and the methods of the
+# instruction class are called with the view as self.
+class riscv_instr_row:
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        object.__setattr__(self, "store", store)
+        object.__setattr__(self, "row", row)
+
+    def __getattr__(self, name):
+        if name in ("store", "row"):
+            raise AttributeError(name)
+        store = self.store
+        if name in store.fields:
+            return store.get(self.row, name)
+        instr_name = store.columns["instr_name"][self.row].item()
+        attr = store.attr_cache.get((instr_name, name))
+        if attr is None:
+            attr = store.get_opcode_attr(instr_name, name)
+        is_method, value = attr
+        if is_method:
+            return types.MethodType(value, self)
+        return value
+
+    def __setattr__(self, name, value):
+        self.store.set(self.row, name, value)
+
+
+# List of instructions backed by a riscv_instr_store (struct of arrays).
+# It supports the list operations used on riscv_instr_stream.instr_list, the items are
+# riscv_instr_row views or the instruction objects stored as is. Stream-wide passes can read
+# and write a whole field at once with get_column and set_column.
+class riscv_instr_columns:
+    def __init__(self, instr_list = (), store = None, order = None):
+        self.store = riscv_instr_store() if store is None else store
+        if order is not None:
+            self.order = order
+        else:
+            self.order = self.add(instr_list)
+
+    # Store the instructions in the columns of the store, return their rows
+    def add(self, instr_list):
+        rows = np.zeros(len(instr_list), dtype = np.int64)
+        for i, instr in enumerate(instr_list):
+            if isinstance(instr, riscv_instr_row) and instr.store is self.store:
+                rows[i] = instr.row
+            else:
+                rows[i] = self.store.add_object(instr)
+        return rows
+
+    # Create an instruction list from instruction records, the records are copied to columns
+    @classmethod
+    def from_records(cls, records):
+        instr_list = cls()
+        instr_list.order = instr_list.store.add_records(records)
+        return instr_list
+
+    def item(self, row):
+        instr = self.store.objects.get(row)
+        if instr is None:
+            return riscv_instr_row(self.store, row)
+        return instr
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return riscv_instr_columns(store = self.store, order = self.order[i])
+        return self.item(self.order[i].item())
+
+    def __setitem__(self, i, instr):
+        self.order[i] = self.add([instr])[0]
+
+    def __iter__(self):
+        for row in self.order.tolist():
+            yield self.item(row)
+
+    def __add__(self, other):
+        return riscv_instr_columns(store = self.store,
+                                   order = np.concatenate((self.order, self.add(other))))
+
+    def __radd__(self, other):
+        return riscv_instr_columns(store = self.store,
+                                   order = np.concatenate((self.add(other), self.order)))
+
+    def append(self, instr):
+        self.order = np.append(self.order, self.add([instr]))
+
+    def extend(self, instr_list):
+        self.order = np.concatenate((self.order, self.add(instr_list)))
+
+    def insert(self, i, instr):
+        self.order = np.insert(self.order, min(i, len(self.order)), self.add([instr]))
+
+    def pop(self, i = -1):
+        instr = self[i]
+        self.order = np.delete(self.order, i)
+        return instr
+
+    def clear(self):
+        self.order = np.zeros(0, dtype = np.int64)
+
+    # Copy of the instruction list where the rows stored in columns are converted to
+    # riscv_instr_record objects. Changing the records doesn't change the columns.
+    def get_records(self):
+        store = self.store
+        columns = {field: store.columns[field][self.order].tolist() for field in store.columns}
+        flags = [(field, columns[field]) for field in store.flag_fields[:-1]]
+        reg = store.reg
+        records = []
+        for i, row in enumerate(self.order.tolist()):
+            instr_name = columns["instr_name"][i]
+            if instr_name == -1:
+                records.append(store.objects[row])
+                continue
+            desc = riscv_instr.instr_desc[store.instr_names[instr_name]]
+            instr = desc.record_type(desc)
+            instr.csr = columns["csr"][i]
+            instr.rs2 = reg[columns["rs2"][i]]
+            instr.rs1 = reg[columns["rs1"][i]]
+            instr.rd = reg[columns["rd"][i]]
+            instr.imm = columns["imm"][i]
+            instr.idx = columns["idx"][i]
+            for field, values in flags:
+                setattr(instr, field, None if values[i] == -1 else values[i])
+            if columns["label_is_idx"][i]:
+                instr.label = str(instr.idx)
+            elif row in store.label:
+                instr.label = store.label[row]
+            if row in store.comment:
+                instr.comment = store.comment[row]
+            imm_str = store.imm_str.get(row)
+            instr.imm_str = store.get_imm_str(instr.imm) if imm_str is None else imm_str
+            records.append(instr)
+        return records
+
+    # Labels of the instructions, None for the instructions without label
+    def get_labels(self):
+        store = self.store
+        columns = {field: store.columns[field][self.order].tolist()
+                   for field in ("instr_name", "has_label", "label_is_idx", "idx")}
+        labels = []
+        for i, row in enumerate(self.order.tolist()):
+            if columns["instr_name"][i] == -1:
+                instr = store.objects[row]
+                labels.append(instr.label if instr.has_label else None)
+            elif columns["has_label"][i] in (0, -1):
+                labels.append(None)
+            elif columns["label_is_idx"][i]:
+                labels.append(str(columns["idx"][i]))
+            else:
+                labels.append(store.label.get(row, ""))
+        return labels
+
+    # Assembly strings of the instructions, the same as riscv_instr.convert2asm. The rows stored
+    # in columns are formatted with the template of their opcode from the operand columns
+    # converted to text, without creating an object per instruction.
+    def convert2asm(self):
+        store = self.store
+        order = self.order.tolist()
+        instr_names = store.columns["instr_name"][self.order].tolist()
+        reg_names = [reg.name.lower() for reg in store.reg]
+        operands = {field: [reg_names[value] for value in store.columns[field][self.order].tolist()]
+                    for field in self.store.reg_fields}
+        operands["csr"] = [str(csr) for csr in store.columns["csr"][self.order].tolist()]
+        operands["imm_str"] = [store.get_imm_str(imm) if store.imm_str.get(row) is None
+                               else store.imm_str[row].lower() for row, imm in
+                               zip(order, store.columns["imm"][self.order].tolist())]
+        templates = {}
+        asm_list = []
+        for i, row in enumerate(order):
+            instr_name = instr_names[i]
+            if instr_name == -1:
+                asm_list.append(store.objects[row].convert2asm())
+                continue
+            template = templates.get(instr_name)
+            if template is None:
+                template = self.get_asm_template(instr_name, row, operands)
+                templates[instr_name] = template
+            if not template:
+                asm_list.append(riscv_instr_row(store, row).convert2asm())
+                continue
+            text, columns, has_comment = template
+            asm_str = text.format(*[column[i] for column in columns])
+            if has_comment:
+                comment = store.comment.get(row, "")
+                if comment != "":
+                    asm_str = asm_str + " #" + comment.lower()
+            asm_list.append(asm_str)
+        return asm_list
+
+    # Template of an opcode for convert2asm: the text, the operand columns and whether the
+    # comment is appended. False if the instruction class changes the template key or has
+    # operands which are not stored in the columns.
+    def get_asm_template(self, instr_name, row, operands):
+        template_type = type(riscv_instr.instr_desc[riscv_instr_name_t(instr_name)].template)
+        if (template_type.convert2asm is not riscv_instr.convert2asm or
+                template_type.get_asm_template_key is not riscv_instr.get_asm_template_key):
+            return False
+        # Create the template of the opcode if it doesn't exist yet
+        riscv_instr_row(self.store, row).convert2asm()
+        template = riscv_instr.asm_templates[riscv_instr_name_t(instr_name)]
+        if not set(template.attrs) <= set(operands):
+            return False
+        return (template.text, [operands[attr] for attr in template.attrs],
+                template.has_comment)
+
+    # Rows of the instructions stored as objects and their position in the list
+    def get_objects(self):
+        pos = np.flatnonzero(self.store.columns["instr_name"][self.order] == -1)
+        return [(i, self.store.objects[row]) for i, row in zip(pos.tolist(),
+                                                               self.order[pos].tolist())]
+
+    # Values of a stored field for all the instructions, a flag set to None is read as -1
+    def get_column(self, name):
+        values = self.store.columns[name][self.order]
+        for i, instr in self.get_objects():
+            value = getattr(instr, name)
+            if name in self.store.reg_fields or name == "instr_name":
+                value = value.value
+            values[i] = -1 if value is None else value
+        return values
+
+    # Values of a descriptor field (category, format, is_compressed...) for all the
+    # instructions, enum values are read as int
+    def get_desc_column(self, name):
+        instr_name = self.store.columns["instr_name"][self.order]
+        table = np.zeros(max(riscv_instr_name_t).value + 1, dtype = np.int64)
+        for value in np.unique(instr_name[instr_name >= 0]).tolist():
+            desc = riscv_instr.instr_desc[riscv_instr_name_t(value)]
+            table[value] = self.get_int(getattr(desc.template, name))
+        values = table[np.maximum(instr_name, 0)]
+        for i, instr in self.get_objects():
+            values[i] = self.get_int(getattr(instr, name))
+        return values
+
+    @staticmethod
+    def get_int(value):
+        if value is None:
+            return -1
+        return getattr(value, "value", value)
+
+    # Set a stored field of the instructions selected by mask
+    def set_column(self, name, values, mask = None):
+        if mask is None:
+            mask = np.ones(len(self.order), dtype = bool)
+        values = np.broadcast_to(values, mask.shape)
+        self.store.columns[name][self.order[mask]] = values[mask]
+        for i, instr in self.get_objects():
+            if mask[i]:
+                setattr(instr, name, values[i].item())
+
+    # Use the idx of the instructions selected by mask as their local numeric label
+    def set_numeric_label(self, mask):
+        self.store.columns["label_is_idx"][self.order[mask]] = 1
+        self.store.columns["is_local_numeric_label"][self.order[mask]] = 1
+        for i, instr in self.get_objects():
+            if mask[i]:
+                instr.label = "{}".format(instr.idx)
+                instr.is_local_numeric_label = 1
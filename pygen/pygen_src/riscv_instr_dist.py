@@ -0,0 +1,97 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import random
+import logging
+import sys
+
+
+# Alias table (Vose's alias method) to draw an index with the given weights in constant time
+class riscv_alias_table:
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.prob = [1.0] * self.size
+        self.alias = list(range(self.size))
+        total = sum(weights)
+        if self.size == 0 or total <= 0:
+            logging.critical("Cannot build alias table with weights {}".format(weights))
+            sys.exit(1)
+        scaled = [w * self.size / total for w in weights]
+        small = [i for i in range(self.size) if scaled[i] < 1]
+        large = [i for i in range(self.size) if scaled[i] >= 1]
+        while small and large:
+            s = small.pop()
+            g = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] = scaled[g] + scaled[s] - 1
+            if scaled[g] < 1:
+                small.append(g)
+            else:
+                large.append(g)
+        # Remaining entries are 1 within rounding error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self):
+        i = random.randrange(self.size)
+        if random.random() < self.prob[i]:
+            return i
+        return self.alias[i]
+
+    def sample_n(self, n):
+        return [self.sample() for _ in range(n)]
+
+    # Draw n indexes as a NumPy array with the numpy.random.Generator rng. NumPy is only
+    # imported by the array sampling of the batch generation (--batch_gen_instr).
+    def sample_array(self, rng, n):
+        import numpy as np
+        i = rng.integers(0, self.size, n)
+        return np.where(rng.random(n) < np.asarray(self.prob)[i], i, np.asarray(self.alias)[i])
+
+
+# Weighted instruction sampler: the category is drawn with the weight of category_dist, then
+# the instruction is drawn uniformly among the candidates of this category.
+# instr_names and categories are the candidate instructions and the name of their category.
+class riscv_instr_dist:
+    def __init__(self, category_dist, instr_names, categories):
+        self.instr_by_category = {}
+        # Index of the instructions in instr_names, grouped by category
+        self.idx_by_category = {}
+        for idx, (name, category) in enumerate(zip(instr_names, categories)):
+            if category_dist.get(category, 0) > 0:
+                self.instr_by_category.setdefault(category, []).append(name)
+                self.idx_by_category.setdefault(category, []).append(idx)
+        self.categories = list(self.instr_by_category)
+        if len(self.categories) == 0:
+            logging.critical("No instruction can be generated with category_dist {}".format(
+                             category_dist))
+            sys.exit(1)
+        self.category_table = riscv_alias_table(
+            [category_dist[category] for category in self.categories])
+
+    def sample(self):
+        category = self.categories[self.category_table.sample()]
+        return random.choice(self.instr_by_category[category])
+
+    # Draw n instructions at once, e.g. for a whole instruction list
+    def sample_n(self, n):
+        return [self.sample() for _ in range(n)]
+
+    # Draw n instructions with the numpy.random.Generator rng, return their index in instr_names
+    def sample_array(self, rng, n):
+        import numpy as np
+        category = self.category_table.sample_array(rng, n)
+        size = np.array([len(self.idx_by_category[c]) for c in self.categories])
+        offset = np.concatenate(([0], np.cumsum(size)[:-1]))
+        idx = np.concatenate([self.idx_by_category[c] for c in self.categories])
+        return idx[offset[category] + (rng.random(n) * size[category]).astype(np.int64)]
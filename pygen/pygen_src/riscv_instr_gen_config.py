@@ -30,7 +30,9 @@ from pygen_src.riscv_instr_pkg import (mtvec_mode_t, f_rounding_mode_t,
 @vsc.randobj
 class riscv_instr_gen_config:
 
-    def __init__(self):
+    # The command line options are parsed from argv, or from sys.argv when it is None.
+    # core_setting is the riscv_core_setting module of the target, imported when it is None
+    def __init__(self, argv=None, core_setting=None):
         # ---------------------------------------------------------------------------
         # Random instruction generation settings
         # ---------------------------------------------------------------------------
@@ -63,11 +65,12 @@ class riscv_instr_gen_config:
         self.max_directed_instr_stream_seq = 20
 
         self.init_delegation()
-        self.argv = self.parse_args()
+        self.argv = self.parse_args(argv)
         self.args_dict = vars(self.argv)
 
         global rcs
-        rcs = import_module("pygen_src.target." + self.argv.target + ".riscv_core_setting")
+        rcs = core_setting or import_module("pygen_src.target." + self.argv.target +
+                                            ".riscv_core_setting")
 
         # Dict for delegation configuration for each exception and interrupt
         # When the bit is 1, the corresponding delegation is enabled.
@@ -173,6 +176,13 @@ class riscv_instr_gen_config:
         self.num_of_sub_program = self.argv.num_of_sub_program
         self.instr_cnt = self.argv.instr_cnt
         self.num_of_tests = self.argv.num_of_tests
+        # Number of the generator worker processes, 0 for the number of available cores
+        self.num_of_workers = self.argv.num_of_workers
+        # Seed of the tests, the seed of a test is derived from it and the test index (see
+        # riscv_seed). The tests are seeded randomly when not given.
+        self.seed = self.argv.seed
+        # Number of tests sent to a worker at once
+        self.gen_chunksize = self.argv.gen_chunksize
         # For tests doesn't involve load/store, the data section generation could be skipped
         self.no_data_page = self.argv.no_data_page
         # Options to turn off some specific types of instructions
@@ -287,11 +297,47 @@ class riscv_instr_gen_config:
         # Bit manipulation extension support
         self.enable_b_extension = self.argv.enable_b_extension
         self.enable_bitmanip_groups = self.argv.enable_bitmanip_groups
+        # Sample the GPR operands of the random instructions without the constraint solver
+        self.fast_gpr_randomize = self.argv.fast_gpr_randomize
+        # Generate the random instruction streams at once with NumPy arrays
+        self.batch_gen_instr = self.argv.batch_gen_instr
+        # Store the random instruction streams in columns (riscv_instr_columns)
+        self.columnar_instr_list = self.argv.columnar_instr_list
+        # Directory of the cached illegal instruction encoding pools, no cache when empty
+        self.illegal_instr_pool_cache = self.argv.illegal_instr_pool_cache
+        # Directory of the cached instruction lists, the lists are only cached in memory when
+        # empty, see riscv_instr_list_cache
+        self.instr_list_cache = self.argv.instr_list_cache
+        # Reuse the lines of the boilerplate sections (trap handlers, stacks...) of the
+        # previous programs of the same configuration fields, see riscv_section_cache
+        self.memoize_sections = self.argv.memoize_sections
+        # Directory of the cached boilerplate sections, the sections are only cached in
+        # memory when empty
+        self.section_cache = self.argv.section_cache
+        # Format the lines of the main program when the test file is written, the lines are
+        # not kept in memory
+        self.stream_asm = self.argv.stream_asm
+        # Generate the main program by windows of main_program_window instructions as the test
+        # file is written, see riscv_instr_sequence.iter_instr_windows. 0 to generate it at once.
+        self.main_program_window = self.argv.main_program_window
+        # Generate the main program in main_program_segments segments, each segment in its own
+        # process. 0 to generate it in the generator process.
+        self.main_program_segments = self.argv.main_program_segments
+        # Generate the sections of each hart with a random state of its own, in a pool of
+        # hart_workers processes. 0 to generate the harts one after the other with the random
+        # state of the test.
+        self.hart_workers = self.argv.hart_workers
+        # Log the table of the randomized configuration
+        self.gen_config_table = self.argv.gen_config_table
+        # Memory image formats (bin, hex, vmem) written next to the assembly test
+        self.mem_image = self.argv.mem_image
+        # Write the data pages to binary files included with .incbin
+        self.data_page_incbin = self.argv.data_page_incbin
 
         # -----------------------------------------------------------------------------
         # Command line options for instruction distribution control
         # -----------------------------------------------------------------------------
-        self.dist_control_mode = 0
+        self.dist_control_mode = self.argv.dist_control_mode
         self.category_dist = {}
         self.march_isa = self.argv.march_isa
 
@@ -436,19 +482,15 @@ class riscv_instr_gen_config:
 
     def setup_instr_distribution(self):
         if self.dist_control_mode:
-            category_iter = iter([x for x in riscv_instr_category_t.__members__])
-            category = riscv_instr_category_t(0)
-            while True:
+            for category in riscv_instr_category_t:
                 opts = "dist_{}".format(category.name)
                 opts = opts.lower()
-                if self.args_dict[opts]:
-                    self.category_dist[category] = self.args_dict[opts]
+                if self.args_dict[opts] is not None:
+                    self.category_dist[category.name] = self.args_dict[opts]
                 else:
-                    self.category_dist[category] = 10  # Default ratio
-                logging.info("Set dist[{}] = {}".format(category, self.category_dist[category]))
-                category = next(category_iter)
-                if category != riscv_instr_category_t(0):
-                    break
+                    self.category_dist[category.name] = 10  # Default ratio
+                logging.info("Set dist[{}] = {}".format(category.name,
+                                                        self.category_dist[category.name]))
 
     # Initialize the exception/interrupt delegation associate array, set all delegation default to 0
     def init_delegation(self):
@@ -464,7 +506,9 @@ class riscv_instr_gen_config:
         pass
 
     def post_randomize(self):
-        # Setup the list all reserved registers
+        # Setup the list all reserved registers, the ones of the previous randomization of the
+        # generator process are not kept
+        self.reserved_regs.clear()
         self.reserved_regs.extend((self.tp, self.sp, self.scratch_reg))
         # Need to save all loop registers, and RA/T0
         self.min_stack_len_per_program = 2 * (rcs.XLEN // 8)
@@ -544,9 +588,12 @@ class riscv_instr_gen_config:
             if csr in invalid_lvl:
                 self.invalid_priv_mode_csrs.append(csr)
 
-    def parse_args(self):
+    def parse_args(self, argv=None):
         parse = argparse.ArgumentParser()
         parse.add_argument('--num_of_tests', help = 'num_of_tests', type = int, default = 1)
+        parse.add_argument('--num_of_workers', help = 'num_of_workers', type = int, default = 0)
+        parse.add_argument('--seed', help = 'seed', type = int, default = None)
+        parse.add_argument('--gen_chunksize', help = 'gen_chunksize', type = int, default = 1)
         parse.add_argument('--enable_page_table_exception',
                            help = 'enable_page_table_exception', type = int, default = 0)
         parse.add_argument('--enable_interrupt', help = 'enable_interrupt',
@@ -641,6 +688,37 @@ class riscv_instr_gen_config:
         parse.add_argument('--enable_bitmanip_groups', help = 'enable_bitmanip_groups',
                            default = ['ZBB', 'ZBS', 'ZBP', 'ZBE', 'ZBF',
                                       'ZBC', 'ZBR', 'ZBM', 'ZBT', 'ZB_TMP'], nargs = '*')
+        parse.add_argument('--dist_control_mode', help = 'dist_control_mode',
+                           choices = [0, 1], type = int, default = 0)
+        for category in riscv_instr_category_t:
+            parse.add_argument('--dist_{}'.format(category.name.lower()),
+                               help = 'dist_{}'.format(category.name.lower()),
+                               type = int, default = None)
+        parse.add_argument('--fast_gpr_randomize', help = 'fast_gpr_randomize',
+                           choices = [0, 1], type = int, default = 1)
+        parse.add_argument('--batch_gen_instr', help = 'batch_gen_instr',
+                           choices = [0, 1], type = int, default = 0)
+        parse.add_argument('--columnar_instr_list', help = 'columnar_instr_list',
+                           choices = [0, 1], type = int, default = 0)
+        parse.add_argument('--illegal_instr_pool_cache', help = 'illegal_instr_pool_cache',
+                           default = "")
+        parse.add_argument('--instr_list_cache', help = 'instr_list_cache', default = "")
+        parse.add_argument('--memoize_sections', help = 'memoize_sections',
+                           choices = [0, 1], type = int, default = 0)
+        parse.add_argument('--section_cache', help = 'section_cache', default = "")
+        parse.add_argument('--stream_asm', help = 'stream_asm',
+                           choices = [0, 1], type = int, default = 0)
+        parse.add_argument('--main_program_window', help = 'main_program_window',
+                           type = int, default = 0)
+        parse.add_argument('--main_program_segments', help = 'main_program_segments',
+                           type = int, default = 0)
+        parse.add_argument('--hart_workers', help = 'hart_workers', type = int, default = 0)
+        parse.add_argument('--gen_config_table', help = 'gen_config_table',
+                           choices = [0, 1], type = int, default = 0)
+        parse.add_argument('--mem_image', help = 'mem_image', default = [],
+                           choices = ["bin", "hex", "vmem"], nargs = '*')
+        parse.add_argument('--data_page_incbin', help = 'data_page_incbin',
+                           choices = [0, 1], type = int, default = 0)
         parse.add_argument('--boot_mode', help = 'boot_mode', default = "")
         parse.add_argument('--asm_test_suffix', help = 'asm_test_suffix', default = "")
         parse.add_argument('--march_isa', help = 'march_isa', default = [],
@@ -662,7 +740,7 @@ class riscv_instr_gen_config:
         parse.add_argument("--enable_visualization", action="store_true", default=False,
                            help="Enabling coverage report visualization for pyflow")
         parse.add_argument('--trace_csv', help='List of csv traces', default="")
-        args, unknown = parse.parse_known_args()
+        args, unknown = parse.parse_known_args(argv)
         # TODO
         '''
         if ($value$plusargs("tvec_alignment=%0d", tvec_alignment)) begin
@@ -675,7 +753,7 @@ class riscv_instr_gen_config:
         setup_instr_distribution()
         get_invalid_priv_lvl_csr();
         '''
-        args = parse.parse_args()
+        args = parse.parse_args(argv)
         return args
 
 
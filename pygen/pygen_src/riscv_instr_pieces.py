@@ -0,0 +1,93 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+from bisect import bisect_right
+from pygen_src.riscv_utils import is_instr_columns
+
+
+# Instruction list with pending insertions (piece table).
+# The list is a sequence of pieces, each piece is a range [start, stop) of an instruction list:
+# the original instruction list or an inserted instruction stream. An insertion only splits
+# the piece at the insertion index, the original instruction list is not copied. tolist merges
+# all the pieces in one pass once all the instruction streams are inserted.
+class riscv_instr_pieces:
+    def __init__(self, instr_list):
+        self.base = instr_list
+        self.pieces = [(instr_list, 0, len(instr_list))] if len(instr_list) > 0 else []
+        self.update_offset()
+
+    # Index of the first instruction of each piece
+    def update_offset(self):
+        self.offset = []
+        size = 0
+        for _, start, stop in self.pieces:
+            self.offset.append(size)
+            size += stop - start
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    # Piece holding the instruction at index i and the position of i in this piece
+    def find(self, i):
+        p = bisect_right(self.offset, i) - 1
+        return p, i - self.offset[p]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if i < 0 or i >= self.size:
+            raise IndexError("instruction index out of range")
+        p, pos = self.find(i)
+        instr_list, start, _ = self.pieces[p]
+        return instr_list[start + pos]
+
+    # Insert the instruction stream new_instr at index idx. When replace is 1, the instruction
+    # at idx is removed.
+    def insert_list(self, idx, new_instr, replace = 0):
+        if idx == self.size:
+            p, pos = len(self.pieces), 0
+        else:
+            p, pos = self.find(idx)
+        # The inserted stream is copied, later changes of new_instr don't change this list
+        new_instr = list(new_instr)
+        new_pieces = [(new_instr, 0, len(new_instr))]
+        if p < len(self.pieces):
+            instr_list, start, stop = self.pieces[p]
+            new_pieces = ([(instr_list, start, start + pos)] + new_pieces +
+                          [(instr_list, start + pos + replace, stop)])
+        # Empty pieces are dropped
+        self.pieces[p:p + 1] = [piece for piece in new_pieces if piece[1] < piece[2]]
+        self.update_offset()
+
+    def insert(self, idx, instr):
+        self.insert_list(idx, [instr])
+
+    def append(self, instr):
+        self.insert_list(self.size, [instr])
+
+    # Merge the pieces in a new instruction list, of the same type as the original list
+    def tolist(self):
+        if is_instr_columns(self.base):
+            import numpy as np
+            from pygen_src.riscv_instr_columns import riscv_instr_columns
+            order = []
+            for instr_list, start, stop in self.pieces:
+                if instr_list is self.base:
+                    order.append(self.base.order[start:stop])
+                else:
+                    order.append(self.base.add(instr_list[start:stop]))
+            return riscv_instr_columns(store = self.base.store, order = np.concatenate(order))
+        result = []
+        for instr_list, start, stop in self.pieces:
+            result.extend(instr_list[start:stop])
+        return result
@@ -15,6 +15,8 @@ import vsc
 from enum import Enum, IntEnum, auto
 from bitstring import BitArray
 from importlib import import_module
+from pygen_src.riscv_source_info import patch_vsc_source_info
+patch_vsc_source_info()
 
 
 @vsc.randobj
@@ -1581,14 +1583,14 @@ class riscv_instr_pkg:
 
     # Print the data in the following format
     # 0xabcd, 0x1234, 0x3334 ...
+    # The last byte is not a group of its own, it is appended to the previous group
     def format_data(self, data, byte_per_group=4):
-        string = "0x"
-        for i in range(len(data)):
-            if ((i % byte_per_group == 0) and (i != len(data) - 1) and (
-                    i != 0)):
-                string = string + ", 0x"
-            string = string + "{:02x}".format(data[i])
-        return string
+        data = bytes(data)
+        if len(data) > 1 and (len(data) - 1) % byte_per_group == 0:
+            string = data[:-1].hex(" ", -byte_per_group) + data[-1:].hex()
+        else:
+            string = data.hex(" ", -byte_per_group)
+        return "0x" + string.replace(" ", ", 0x")
 
     # Push general purpose register to stack, this is needed before trap handling
     def push_gpr_to_kernel_stack(self, status, scratch, mprv, sp, tp, instr):
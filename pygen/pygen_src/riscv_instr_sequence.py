@@ -12,13 +12,17 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 import re
 import sys
 import random
+import bisect
+import contextlib
 import logging
 import vsc
 from importlib import import_module
 from collections import defaultdict
 from pygen_src.riscv_instr_gen_config import cfg
 from pygen_src.riscv_instr_stream import riscv_rand_instr_stream
-from pygen_src.riscv_illegal_instr import riscv_illegal_instr, illegal_instr_type_e
+from pygen_src.riscv_utils import is_instr_columns
+from pygen_src.riscv_seed import seed_scope
+from pygen_src.riscv_illegal_instr import riscv_illegal_instr
 from pygen_src.riscv_directed_instr_lib import riscv_pop_stack_instr, riscv_push_stack_instr
 from pygen_src.riscv_instr_pkg import (pkg_ins, riscv_instr_name_t, riscv_reg_t,
                                        riscv_instr_category_t)
@@ -60,6 +64,7 @@ class riscv_instr_sequence:
         self.instr_stack_enter = riscv_push_stack_instr()
         self.instr_stack_exit = riscv_pop_stack_instr()
         self.illegal_instr = riscv_illegal_instr()
+        self.seed = None  # Seed of the windows of the sequence (see iter_instr_windows)
 
     # Main function to generate the instruction stream
     # The main random instruction stream is generated by instr_stream.gen_instr(), which generates
@@ -134,30 +139,16 @@ class riscv_instr_sequence:
         # Insert directed instructions, it's randomly mixed with the random instruction stream.
         for instr in self.directed_instr:
             self.instr_stream.insert_instr_stream(instr.instr_list)
+        if is_instr_columns(self.instr_stream.instr_list):
+            self.post_process_instr_columns()
+            return
         # Assign an index for all instructions, these indexes wont change
         # even a new instruction is injected in the post process.
         for i in range(len(self.instr_stream.instr_list)):
             self.instr_stream.instr_list[i].idx = label_idx
             if(self.instr_stream.instr_list[i].has_label and
                     not(self.instr_stream.instr_list[i].atomic)):
-                if((self.illegal_instr_pct > 0) and
-                   (self.instr_stream.instr_list[i].insert_illegal_instr == 0)):
-                    # The illegal instruction generator always increase PC by 4 when resume
-                    # execution, need to make sure PC + 4 is at the correct instruction boundary.
-                    if self.instr_stream.instr_list[i].is_compressed:
-                        if(i < (len(self.instr_stream.instr_list) - 1)):
-                            if self.instr_stream.instr_list[i + 1].is_compressed:
-                                self.instr_stream.instr_list[i].is_illegal_instr = random.randrange(
-                                    0, min(100, self.illegal_instr_pct))
-                    else:
-                        self.instr_stream.instr_list[i].is_illegal_instr = random.randrange(
-                            0, min(100, self.illegal_instr_pct))
-                if(self.hint_instr_pct > 0 and
-                        (self.instr_stream.instr_list[i].is_illegal_instr == 0)):
-                    if self.instr_stream.instr_list[i].is_compressed:
-                        self.instr_stream.instr_list[i].is_hint_instr = random.randrange(
-                            0, min(100, self.hint_instr_pct))
-
+                self.randomize_illegal_hint_instr(i)
                 self.instr_stream.instr_list[i].label = "{}".format(label_idx)
                 self.instr_stream.instr_list[i].is_local_numeric_label = 1
                 label_idx += 1
@@ -197,6 +188,79 @@ class riscv_instr_sequence:
             j += 1
         logging.info("Finished post-processing instructions")
 
+    def randomize_illegal_hint_instr(self, i, instr_list = None):
+        if instr_list is None:
+            instr_list = self.instr_stream.instr_list
+        if((self.illegal_instr_pct > 0) and
+           (instr_list[i].insert_illegal_instr == 0)):
+            # The illegal instruction generator always increase PC by 4 when resume
+            # execution, need to make sure PC + 4 is at the correct instruction boundary.
+            if instr_list[i].is_compressed:
+                if(i < (len(instr_list) - 1)):
+                    if instr_list[i + 1].is_compressed:
+                        instr_list[i].is_illegal_instr = random.randrange(
+                            0, min(100, self.illegal_instr_pct))
+            else:
+                instr_list[i].is_illegal_instr = random.randrange(
+                    0, min(100, self.illegal_instr_pct))
+        if(self.hint_instr_pct > 0 and
+                (instr_list[i].is_illegal_instr == 0)):
+            if instr_list[i].is_compressed:
+                instr_list[i].is_hint_instr = random.randrange(
+                    0, min(100, self.hint_instr_pct))
+
+    # post_process_instr of an instruction list stored in columns (riscv_instr_columns).
+    # The index and label assignment and the removal of unused labels are done with array
+    # operations, only the branch instructions are processed one by one. The result and the
+    # random values drawn are the same as post_process_instr.
+    def post_process_instr_columns(self):
+        import numpy as np
+        instr_list = self.instr_stream.instr_list
+        labeled = (instr_list.get_column("has_label") > 0) & ~(instr_list.get_column("atomic") > 0)
+        # Index of an instruction: number of labeled instructions before it
+        idx = np.cumsum(labeled) - labeled
+        instr_list.set_column("idx", idx)
+        label_idx = int(np.count_nonzero(labeled))
+        if self.illegal_instr_pct > 0 or self.hint_instr_pct > 0:
+            for i in np.flatnonzero(labeled).tolist():
+                self.randomize_illegal_hint_instr(i)
+        instr_list.set_numeric_label(labeled)
+        # Generate branch target
+        branch_idx = [random.randint(1, cfg.max_branch_step) for _ in range(30)]
+        branch_cnt = 0
+        is_branch = ((instr_list.get_desc_column("category") ==
+                      riscv_instr_category_t.BRANCH.value) &
+                     ~(instr_list.get_column("branch_assigned") > 0) &
+                     ~(instr_list.get_column("is_illegal_instr") > 0))
+        # First branch instruction targeting each label
+        first_branch = np.full(label_idx, len(instr_list))
+        for j in np.flatnonzero(is_branch).tolist():
+            branch_target_label = idx[j].item() + branch_idx[branch_cnt]
+            if branch_target_label >= label_idx:
+                branch_target_label = label_idx - 1
+            branch_cnt += 1
+            if branch_cnt == len(branch_idx):
+                branch_cnt = 0
+                random.shuffle(branch_idx)
+            logging.info("Processing branch instruction[%0d]:%0s # %0d -> %0d", j,
+                         instr_list[j].convert2asm(), idx[j], branch_target_label)
+            instr_list[j].imm_str = "{}f".format(branch_target_label)
+            instr_list[j].branch_assigned = 1
+            if 0 <= branch_target_label and first_branch[branch_target_label] > j:
+                first_branch[branch_target_label] = j
+        # Remove the local label which is not used as branch target, a label is kept when
+        # it's the target of a branch instruction placed before it or of the instruction itself
+        local = (instr_list.get_column("has_label") > 0) & \
+            (instr_list.get_column("is_local_numeric_label") > 0)
+        label = np.where(labeled, idx, -1)
+        for i in np.flatnonzero(local & ~labeled).tolist():
+            label[i] = int(instr_list[i].label)
+        pos = np.arange(len(instr_list))
+        used = (label >= 0) & (label < label_idx)
+        used[used] = first_branch[label[used]] <= pos[used]
+        instr_list.set_column("has_label", 0, local & ~used)
+        logging.info("Finished post-processing instructions")
+
     # Inject a jump instruction stream
     # This function is called by riscv_asm_program_gen with the target program label
     # The jump routine is implmented with an atomic instruction stream(riscv_jump_instr). Similar
@@ -225,22 +289,31 @@ class riscv_instr_sequence:
         prefix = ''
         string = ''
         self.instr_string_list.clear()
+        instr_list = self.instr_stream.instr_list
+        if len(instr_list) > 0:
+            instr_list[0].has_label = 1
+        if is_instr_columns(instr_list):
+            # Labels and assembly strings read from the columns directly
+            label_list = instr_list.get_labels()
+            asm_list = instr_list.convert2asm()
+        else:
+            label_list = [instr.label if instr.has_label else None for instr in instr_list]
+            asm_list = [instr.convert2asm() for instr in instr_list]
 
-        for i in range(len(self.instr_stream.instr_list)):
+        for i in range(len(asm_list)):
             if i == 0:
                 if no_label:
                     prefix = pkg_ins.format_string(string = ' ', length = pkg_ins.LABEL_STR_LEN)
                 else:
                     prefix = pkg_ins.format_string(string = '{}:'.format(
                         self.label_name), length = pkg_ins.LABEL_STR_LEN)
-                self.instr_stream.instr_list[i].has_label = 1
             else:
-                if self.instr_stream.instr_list[i].has_label:
+                if label_list[i] is not None:
                     prefix = pkg_ins.format_string(string = '{}:'.format(
-                        self.instr_stream.instr_list[i].label), length = pkg_ins.LABEL_STR_LEN)
+                        label_list[i]), length = pkg_ins.LABEL_STR_LEN)
                 else:
                     prefix = pkg_ins.format_string(string = " ", length = pkg_ins.LABEL_STR_LEN)
-            string = prefix + self.instr_stream.instr_list[i].convert2asm()
+            string = prefix + asm_list[i]
             self.instr_string_list.append(string)
             if(rcs.support_pmp and not re.search("main", self.label_name)):
                 self.instr_string_list.insert(0, ".align 2")
@@ -279,31 +352,312 @@ class riscv_instr_sequence:
             sys.exit(1)
         self.instr_string_list.append(routine_str)
 
+    # The illegal and HINT instructions are generated first with their random insertion index,
+    # then they are merged with instr_string_list in one pass (merge_instr_string)
     def insert_illegal_hint_instr(self):
+        insert_list = self.gen_illegal_hint_instr(len(self.instr_string_list))
+        if len(insert_list) > 0:
+            self.instr_string_list[:] = self.merge_instr_string(self.instr_string_list,
+                                                                insert_list)
+
+    # Generate the illegal and HINT instructions inserted in a list of line_cnt strings, return
+    # the (index, string) pairs in insertion order. The counts are the ones of the ratios for
+    # the instruction count of the sequence when not given.
+    def gen_illegal_hint_instr(self, line_cnt, illegal_instr_cnt = None, hint_instr_cnt = None):
         idx = 0
         insert_str = ""
+        insert_list = []
         self.illegal_instr.initialize()
-        bin_instr_cnt = int(self.instr_cnt * cfg.illegal_instr_ratio / 1000)
+        if illegal_instr_cnt is None:
+            illegal_instr_cnt = int(self.instr_cnt * cfg.illegal_instr_ratio / 1000)
+        if hint_instr_cnt is None:
+            hint_instr_cnt = int(self.instr_cnt * cfg.hint_instr_ratio / 1000)
+        bin_instr_cnt = illegal_instr_cnt
         if bin_instr_cnt >= 0:
             logging.info("Injecting {} illegal instructions, ratio {}/100".
                          format(bin_instr_cnt, cfg.illegal_instr_ratio))
             for _ in range(bin_instr_cnt):
-                with vsc.randomize_with(self.illegal_instr):
-                    self.illegal_instr.exception != illegal_instr_type_e.kHintInstr
+                self.illegal_instr.randomize_from_pool(hint = 0)
                 insert_str = "{}.4byte {} # {}".format(pkg_ins.indent,
                                                        self.illegal_instr.get_bin_str(),
                                                        self.illegal_instr.comment)
-                idx = random.randrange(0, len(self.instr_string_list))
-                self.instr_string_list.insert(idx, insert_str)
-        bin_instr_cnt = int(self.instr_cnt * cfg.hint_instr_ratio / 1000)
+                idx = random.randrange(0, line_cnt + len(insert_list))
+                insert_list.append((idx, insert_str))
+        bin_instr_cnt = hint_instr_cnt
         if bin_instr_cnt >= 0:
             logging.info("Injecting {} HINT instructions, ratio {}/100".format(
                 bin_instr_cnt, cfg.hint_instr_ratio))
             for _ in range(int(bin_instr_cnt)):
-                with vsc.randomize_with(self.illegal_instr):
-                    self.illegal_instr.exception == illegal_instr_type_e.kHintInstr
+                self.illegal_instr.randomize_from_pool(hint = 1)
                 insert_str = "{}.2byte {} # {}".format(pkg_ins.indent,
                                                        self.illegal_instr.get_bin_str(),
                                                        self.illegal_instr.comment)
-                idx = random.randrange(0, len(self.instr_string_list))
-                self.instr_string_list.insert(idx, insert_str)
+                idx = random.randrange(0, line_cnt + len(insert_list))
+                insert_list.append((idx, insert_str))
+        return insert_list
+
+    # Insert the (index, string) pairs of insert_list in string_list in one pass. The result is
+    # the same as calling string_list.insert(index, string) for each pair in order.
+    def merge_instr_string(self, string_list, insert_list):
+        size = len(string_list) + len(insert_list)
+        # Fenwick tree of the free positions of the result
+        tree = [i & -i for i in range(size + 1)]
+        result = [None] * size
+        # The index of the last inserted string is its final position. The index of an earlier
+        # string is its rank among the positions not taken by the strings inserted after it.
+        for idx, string in reversed(insert_list):
+            pos = 0
+            rank = idx + 1
+            step = 1 << size.bit_length()
+            while step:
+                if pos + step <= size and tree[pos + step] < rank:
+                    pos += step
+                    rank -= tree[pos]
+                step >>= 1
+            result[pos] = string
+            i = pos + 1
+            while i <= size:
+                tree[i] -= 1
+                i += i & -i
+        # The original strings take the remaining positions in order
+        string_iter = iter(string_list)
+        return [next(string_iter) if string is None else string for string in result]
+
+    # Final positions of the (index, string) pairs of insert_list, as placed by
+    # merge_instr_string, without the list of strings. Return the (position, string) pairs
+    # sorted by position.
+    def get_insert_positions(self, insert_list):
+        taken = []
+        result = []
+        # The index of an inserted string is its rank among the positions not taken by the
+        # strings inserted after it
+        for idx, string in reversed(insert_list):
+            pos = idx
+            cnt = bisect.bisect_right(taken, pos)
+            while idx + cnt != pos:
+                pos = idx + cnt
+                cnt = bisect.bisect_right(taken, pos)
+            bisect.insort(taken, pos)
+            result.append((pos, string))
+        result.sort(key = lambda item: item[0])
+        return result
+
+    # Streaming version of generate_instr_stream: return an iterator of the lines of the
+    # instruction stream, the lines are formatted by chunks of chunk_size instructions when the
+    # iterator is read and instr_string_list is not built. The random values are drawn when
+    # this function is called, the lines are the same as generate_instr_stream. The counts of
+    # illegal and HINT instructions are the ones of gen_illegal_hint_instr when not given.
+    def iter_instr_stream(self, no_label = 0, chunk_size = 4096, illegal_instr_cnt = None,
+                          hint_instr_cnt = None):
+        instr_cnt = len(self.instr_stream.instr_list)
+        align_cnt = instr_cnt if (rcs.support_pmp and not re.search("main", self.label_name)) \
+            else 0
+        insert_list = self.get_insert_positions(
+            self.gen_illegal_hint_instr(align_cnt + instr_cnt, illegal_instr_cnt, hint_instr_cnt))
+        self.instr_string_list.clear()
+        if not self.is_main_program:
+            self.generate_return_routine(pkg_ins.format_string(str(instr_cnt - 1),
+                                                               pkg_ins.LABEL_STR_LEN))
+        return_routine = list(self.instr_string_list)
+        self.instr_string_list.clear()
+        return self.merge_instr_lines(self.iter_instr_lines(no_label, align_cnt, chunk_size),
+                                      insert_list, return_routine)
+
+    # Lines of the instructions, preceded by align_cnt ".align 2" lines
+    def iter_instr_lines(self, no_label, align_cnt, chunk_size):
+        for _ in range(align_cnt):
+            yield ".align 2"
+        instr_list = self.instr_stream.instr_list
+        if len(instr_list) > 0:
+            instr_list[0].has_label = 1
+        no_label_prefix = pkg_ins.format_string(string = " ", length = pkg_ins.LABEL_STR_LEN)
+        for start in range(0, len(instr_list), chunk_size):
+            chunk = instr_list[start:start + chunk_size]
+            if is_instr_columns(chunk):
+                label_list = chunk.get_labels()
+                asm_list = chunk.convert2asm()
+            else:
+                label_list = [instr.label if instr.has_label else None for instr in chunk]
+                asm_list = [instr.convert2asm() for instr in chunk]
+            for i, label, asm_str in zip(range(start, start + len(asm_list)), label_list,
+                                         asm_list):
+                if i == 0:
+                    prefix = no_label_prefix if no_label else pkg_ins.format_string(
+                        string = "{}:".format(self.label_name), length = pkg_ins.LABEL_STR_LEN)
+                elif label is not None:
+                    prefix = pkg_ins.format_string(string = "{}:".format(label),
+                                                   length = pkg_ins.LABEL_STR_LEN)
+                else:
+                    prefix = no_label_prefix
+                yield prefix + asm_str
+
+    # Merge the (position, string) pairs sorted by position with the lines, then add the tail
+    def merge_instr_lines(self, lines, insert_list, tail):
+        pos = 0
+        insert_iter = iter(insert_list)
+        insert = next(insert_iter, None)
+        for line in lines:
+            while insert is not None and insert[0] == pos:
+                yield insert[1]
+                pos += 1
+                insert = next(insert_iter, None)
+            yield line
+            pos += 1
+        while insert is not None:
+            yield insert[1]
+            insert = next(insert_iter, None)
+        yield from tail
+
+    # ----------------------------------------------------------------------------------------------
+    # Generation by windows
+
+    # The instruction sequence is generated, post-processed and formatted by windows of
+    # window_size instructions, only the instructions of one window are kept in memory. This is
+    # an iterator of the lines of the sequence, a window is generated when the lines of the
+    # previous one have been read.
+    # The local labels are numbered across the windows. A forward branch targets a label at most
+    # cfg.max_branch_step labels ahead, in its window or in the next ones: the targets beyond the
+    # window are kept until their window is post-processed. The branches targeting a label past
+    # the last one target the last label, as in post_process_instr: these labels are defined on
+    # the line before the last labeled instruction.
+    # gen_directed_instr(start, end) returns the directed instruction streams inserted in the
+    # window of the instructions start to end - 1, the illegal and HINT instructions are
+    # distributed over the windows in proportion to their size.
+    def iter_instr_windows(self, window_size, gen_directed_instr, no_branch = 0):
+        self.is_main_program = 1
+        label_idx = 0
+        branch_idx = []
+        branch_cnt = 0
+        # Labels of the next windows which are branch targets
+        branch_target = set()
+        illegal_instr_cnt = int(self.instr_cnt * cfg.illegal_instr_ratio / 1000)
+        hint_instr_cnt = int(self.instr_cnt * cfg.hint_instr_ratio / 1000)
+        no_label_prefix = pkg_ins.format_string(string = " ", length = pkg_ins.LABEL_STR_LEN)
+        for start in range(0, self.instr_cnt, window_size):
+            end = min(start + window_size, self.instr_cnt)
+            is_last_window = end == self.instr_cnt
+            # A window is generated with the random state of its node of the seed tree
+            with self.get_window_scope(start):
+                if not branch_idx:
+                    branch_idx = [random.randint(1, cfg.max_branch_step) for _ in range(30)]
+                self.instr_stream.initialize_instr_list(end - start)
+                logging.info("Start generating instruction {} to {}".format(start, end))
+                self.instr_stream.gen_instr(no_branch = no_branch, no_load_store = 1,
+                                            is_debug_program = self.is_debug_program)
+                for instr in gen_directed_instr(start, end):
+                    self.instr_stream.insert_instr_stream(instr.instr_list)
+                instr_list = self.instr_stream.instr_list
+                if is_instr_columns(instr_list):
+                    instr_list = instr_list.get_records()
+                self.instr_stream.instr_list = []
+                # Same as post_process_instr, with the label numbers of the window
+                for i in range(len(instr_list)):
+                    instr_list[i].idx = label_idx
+                    if instr_list[i].has_label and not instr_list[i].atomic:
+                        self.randomize_illegal_hint_instr(i, instr_list)
+                        instr_list[i].label = "{}".format(label_idx)
+                        instr_list[i].is_local_numeric_label = 1
+                        label_idx += 1
+                for j in range(len(instr_list)):
+                    if (instr_list[j].category == riscv_instr_category_t.BRANCH and
+                            not instr_list[j].branch_assigned and
+                            not instr_list[j].is_illegal_instr):
+                        branch_target_label = instr_list[j].idx + branch_idx[branch_cnt]
+                        if is_last_window and branch_target_label >= label_idx:
+                            branch_target_label = label_idx - 1
+                        branch_cnt += 1
+                        if branch_cnt == len(branch_idx):
+                            branch_cnt = 0
+                            random.shuffle(branch_idx)
+                        logging.info("Processing branch instruction[%0d]:%0s # %0d -> %0d",
+                                     start + j, instr_list[j].convert2asm(),
+                                     instr_list[j].idx, branch_target_label)
+                        instr_list[j].imm_str = "{}f".format(branch_target_label)
+                        instr_list[j].branch_assigned = 1
+                        branch_target.add(branch_target_label)
+                    # Remove the local label which is not used as branch target
+                    if instr_list[j].has_label and instr_list[j].is_local_numeric_label:
+                        idx = int(instr_list[j].label)
+                        if idx not in branch_target:
+                            instr_list[j].has_label = 0
+                        branch_target.discard(idx)
+                # Labels past the last one targeted by the branches of the previous windows
+                end_labels = sorted(branch_target) if is_last_window else []
+                branch_target.difference_update(end_labels)
+                lines = []
+                for i, instr in enumerate(instr_list):
+                    if start == 0 and i == 0:
+                        prefix = pkg_ins.format_string(string = "{}:".format(self.label_name),
+                                                       length = pkg_ins.LABEL_STR_LEN)
+                        instr.has_label = 1
+                    elif end_labels and instr.is_local_numeric_label and \
+                            int(instr.label) == label_idx - 1:
+                        lines.extend(pkg_ins.format_string("{}:".format(label),
+                                                           pkg_ins.LABEL_STR_LEN).rstrip()
+                                     for label in end_labels)
+                        end_labels = []
+                        prefix = pkg_ins.format_string(string = "{}:".format(instr.label),
+                                                       length = pkg_ins.LABEL_STR_LEN)
+                    elif instr.has_label:
+                        prefix = pkg_ins.format_string(string = "{}:".format(instr.label),
+                                                       length = pkg_ins.LABEL_STR_LEN)
+                    else:
+                        prefix = no_label_prefix
+                    lines.append(prefix + instr.convert2asm())
+                # The last labeled instruction is in a previous window
+                lines.extend(pkg_ins.format_string("{}:".format(label),
+                                                   pkg_ins.LABEL_STR_LEN).rstrip()
+                             for label in end_labels)
+                del instr_list
+                insert_list = self.gen_illegal_hint_instr(
+                    len(lines),
+                    illegal_instr_cnt * end // self.instr_cnt -
+                    illegal_instr_cnt * start // self.instr_cnt,
+                    hint_instr_cnt * end // self.instr_cnt -
+                    hint_instr_cnt * start // self.instr_cnt)
+            yield from self.merge_instr_lines(lines, self.get_insert_positions(insert_list), [])
+        logging.info("Finishing instruction generation")
+
+    # Random state of the window starting at the instruction start: the seed tree node of the
+    # window when the sequence is seeded, the random state of the caller otherwise
+    def get_window_scope(self, start):
+        if self.seed is None:
+            return contextlib.nullcontext()
+        return seed_scope(self.seed, "window", start)
+
+    # ----------------------------------------------------------------------------------------------
+    # Generation by segments
+
+    # Post-process a segment of the main program generated in its own process (see
+    # riscv_asm_program_gen.gen_main_program_segments). The segment is post-processed as a
+    # program of its own, its branches target its labels. Return the number of local labels of
+    # the segment and the positions of the branch instructions given a local label target, the
+    # labels are renumbered by renumber_local_labels once the labels of the previous segments
+    # are known.
+    def post_process_segment(self):
+        for instr in self.directed_instr:
+            self.instr_stream.insert_instr_stream(instr.instr_list)
+        self.directed_instr = []
+        instr_list = self.instr_stream.instr_list
+        if is_instr_columns(instr_list):
+            instr_list = instr_list.get_records()
+            self.instr_stream.instr_list = instr_list
+        label_cnt = 0
+        branch_pos = []
+        for j, instr in enumerate(instr_list):
+            if instr.has_label and not instr.atomic:
+                label_cnt += 1
+            if instr.category == riscv_instr_category_t.BRANCH and not instr.branch_assigned:
+                branch_pos.append(j)
+        self.post_process_instr()
+        return label_cnt, [j for j in branch_pos if instr_list[j].branch_assigned]
+
+    # Add offset to the local labels of the segment and to the targets of the branches
+    # post-processed by post_process_segment
+    def renumber_local_labels(self, offset, branch_pos):
+        instr_list = self.instr_stream.instr_list
+        for instr in instr_list:
+            if instr.has_label and instr.is_local_numeric_label:
+                instr.label = "{}".format(int(instr.label) + offset)
+        for j in branch_pos:
+            instr_list[j].imm_str = "{}f".format(int(instr_list[j].imm_str[:-1]) + offset)
@@ -14,10 +14,13 @@ import random
 import logging
 import sys
 import vsc
+from vsc.model.rand_state import RandState
 from pygen_src.riscv_instr_pkg import riscv_instr_name_t,\
     riscv_instr_category_t, riscv_instr_format_t, riscv_reg_t
 from pygen_src.isa.riscv_instr import riscv_instr
+from pygen_src.isa.riscv_instr_record import riscv_instr_record
 from pygen_src.riscv_instr_gen_config import cfg
+from pygen_src.riscv_instr_pieces import riscv_instr_pieces
 
 
 # Base class for RISC-V instruction stream
@@ -37,6 +40,34 @@ class riscv_instr_stream:
         self.reserved_rd = vsc.list_t(vsc.enum_t(riscv_reg_t))
         self.hart = 0
 
+    # The instruction list of a stream generated by riscv_instr_batch is only created when
+    # it's read, the pending insertions of insert_instr and insert_instr_stream are merged
+    # when it's read
+    @property
+    def instr_list(self):
+        if self.instr_batch is not None:
+            if cfg.columnar_instr_list:
+                self._instr_list = self.instr_batch.tocolumns()
+            else:
+                self._instr_list = self.instr_batch.tolist()
+            self.instr_batch = None
+        if self.instr_pieces is not None:
+            self._instr_list = self.instr_pieces.tolist()
+            self.instr_pieces = None
+        return self._instr_list
+
+    @instr_list.setter
+    def instr_list(self, instr_list):
+        self.instr_batch = None
+        self.instr_pieces = None
+        self._instr_list = instr_list
+
+    # Instruction list with the pending insertions
+    def get_instr_pieces(self):
+        if self.instr_pieces is None:
+            self.instr_pieces = riscv_instr_pieces(self.instr_list)
+        return self.instr_pieces
+
     # Initialize the instruction stream, create each instruction instance
     def initialize_instr_list(self, instr_cnt):
         self.instr_list.clear()
@@ -51,26 +82,29 @@ class riscv_instr_stream:
     # Insert an instruction to the existing instruction stream at the given index
     # When index is -1, the instruction is injected at a random location
     def insert_instr(self, instr, idx = -1):
-        current_instr_cnt = len(self.instr_list)
+        instr_list = self.get_instr_pieces()
+        current_instr_cnt = len(instr_list)
         # TODO
         if idx == -1:
             idx = random.randint(0, current_instr_cnt - 1)
-            while self.instr_list[idx].atomic:
+            while instr_list[idx].atomic:
                 idx = idx + 1
                 if idx == (current_instr_cnt - 1):
-                    self.instr_list.append(instr)
+                    instr_list.append(instr)
                     return
         elif idx > current_instr_cnt or idx < 0:
             logging.error("Cannot insert instr:{} at idx {}".format(instr.convert2asm(), idx))
             sys.exit(1)
-        self.instr_list.insert(idx, instr)
+        instr_list.insert(idx, instr)
 
     # Insert an instruction to the existing instruction stream at the given index
     # When index is -1, the instruction is injected at a random location
     # When replace is 1, the original instruction at the inserted position will be replaced
+    # The instruction streams are inserted in a riscv_instr_pieces list, they are merged in one
+    # pass when instr_list is read.
     def insert_instr_stream(self, new_instr, idx = -1, replace = 0):
-        current_instr_cnt = len(self.instr_list)
-
+        instr_list = self.get_instr_pieces()
+        current_instr_cnt = len(instr_list)
         if current_instr_cnt == 0:
             self.instr_list = new_instr
             return
@@ -80,15 +114,15 @@ class riscv_instr_stream:
             # cares must be taken to avoid targeting
             # an atomic instruction (while atomic, find a new idx)
             for i in range(10):
-                if self.instr_list[idx].atomic:
+                if instr_list[idx].atomic:
                     break
                 idx = random.randint(0, current_instr_cnt - 1)
-            if self.instr_list[idx].atomic:
-                for i in range(len(self.instr_list)):
-                    if not self.instr_list[i].atomic:
+            if instr_list[idx].atomic:
+                for i in range(len(instr_list)):
+                    if not instr_list[i].atomic:
                         idx = i
                         break
-                if self.instr_list[idx].atomic:
+                if instr_list[idx].atomic:
                     logging.critical("Cannot inject the instruction")
                     sys.exit(1)
         elif idx > current_instr_cnt or idx < 0:
@@ -98,19 +132,9 @@ class riscv_instr_stream:
         # The label of the original instruction will be copied to the head
         # of inserted instruction stream.
         if replace:
-            new_instr[0].label = self.instr_list[idx].label
-            new_instr[0].has_label = self.instr_list[idx].has_label
-            if idx == 0:
-                self.instr_list = new_instr + self.instr_list[idx + 1:current_instr_cnt]
-            else:
-                self.instr_list = self.instr_list[0:idx] + new_instr + \
-                    self.instr_list[idx + 1:current_instr_cnt]
-        else:
-            if idx == 0:
-                self.instr_list = new_instr + self.instr_list[idx:current_instr_cnt]
-            else:
-                self.instr_list = self.instr_list[0:idx] + new_instr + \
-                    self.instr_list[idx:current_instr_cnt]
+            new_instr[0].label = instr_list[idx].label
+            new_instr[0].has_label = instr_list[idx].has_label
+        instr_list.insert_list(idx, new_instr, replace)
 
     # Mix the input instruction stream with the original instruction, the instruction order is
     # preserved. When 'contained' is set, the original instruction stream will be inside the
@@ -153,7 +177,12 @@ class riscv_rand_instr_stream(riscv_instr_stream):
         super().__init__()
         self.kernel_mode = 0
         self.allowed_instr = []
-        self.category_dist = []
+        self.category_dist = {}
+        # Legal rs1/rs2/rd register pools used by the direct GPR sampling in randomize_gpr
+        self.gpr_pool = None
+        self.unrestricted_gpr_pool = None
+        # Legal rs1/rs2/rd registers per instruction name, see get_instr_gpr_pool
+        self.instr_gpr_pool = {}
 
     @vsc.constraint
     def avail_reg_c(self):
@@ -164,7 +193,7 @@ class riscv_rand_instr_stream(riscv_instr_stream):
             self.instr_list.append(None)
 
     def setup_allowed_instr(self, no_branch = 0, no_load_store = 1):
-        self.allowed_instr = riscv_instr.basic_instr
+        self.allowed_instr = riscv_instr.basic_instr.copy()
         if no_branch == 0:
             self.allowed_instr.extend(
                 riscv_instr.instr_category[riscv_instr_category_t.BRANCH.name])
@@ -174,6 +203,32 @@ class riscv_rand_instr_stream(riscv_instr_stream):
             self.allowed_instr.extend(
                 riscv_instr.instr_category[riscv_instr_category_t.STORE.name])
         self.setup_instruction_dist(no_branch, no_load_store)
+        self.setup_gpr_pool()
+
+    # Compute the legal register pools of this stream from avail_regs, reserved_rd and
+    # cfg.reserved_regs. The pools are reused by randomize_gpr for every instruction of the
+    # stream, so it must be called again if any of these settings is changed afterwards.
+    def setup_gpr_pool(self):
+        reserved = set(self.reserved_rd)
+        reserved.update(cfg.reserved_regs)
+        all_regs = list(riscv_reg_t)
+        if len(self.avail_regs) > 0:
+            src_regs = [riscv_reg_t(reg) for reg in self.avail_regs]
+        else:
+            src_regs = all_regs
+        dst_regs = [reg for reg in src_regs if reg not in reserved]
+        self.gpr_pool = {"rs1": src_regs,
+                         "rs2": src_regs,
+                         "rd": dst_regs,
+                         # CB_FORMAT instructions use rs1 as the destination register
+                         "cb_rs1": dst_regs}
+        # Pools of the operands which have no legal register in avail_regs
+        all_dst_regs = [reg for reg in all_regs if reg not in reserved]
+        self.unrestricted_gpr_pool = {"rs1": all_regs,
+                                      "rs2": all_regs,
+                                      "rd": all_dst_regs,
+                                      "cb_rs1": all_dst_regs}
+        self.instr_gpr_pool = {}
 
     def randomize_avail_regs(self):
         pass
@@ -193,7 +248,7 @@ class riscv_rand_instr_stream(riscv_instr_stream):
 
     def setup_instruction_dist(self, no_branch = 0, no_load_store = 1):
         if cfg.dist_control_mode:
-            self.category_dist = cfg.category_dist
+            self.category_dist = cfg.category_dist.copy()
             if no_branch:
                 self.category_dist[riscv_instr_category_t.BRANCH.name] = 0
             if no_load_store:
@@ -203,6 +258,9 @@ class riscv_rand_instr_stream(riscv_instr_stream):
 
     def gen_instr(self, no_branch = 0, no_load_store = 1, is_debug_program = 0):
         self.setup_allowed_instr(no_branch, no_load_store)
+        if cfg.batch_gen_instr:
+            self.gen_instr_batch(is_debug_program)
+            return
         for i in range(len(self.instr_list)):
             self.instr_list[i] = self.randomize_instr(self.instr_list[i], is_debug_program)
         # Do not allow branch instruction as the last instruction because there's no
@@ -211,8 +269,41 @@ class riscv_rand_instr_stream(riscv_instr_stream):
             self.instr_list.pop()
             if len(self.instr_list) == 0:
                 break
+        if cfg.columnar_instr_list:
+            from pygen_src.riscv_instr_columns import riscv_instr_columns
+            self.instr_list = riscv_instr_columns.from_records(self.instr_list)
+
+    # Generate the whole instruction list at once with riscv_instr_batch, the instruction
+    # objects are only created when instr_list is read
+    def gen_instr_batch(self, is_debug_program = 0):
+        # NumPy and the batch generation are only imported with --batch_gen_instr
+        from pygen_src.riscv_instr_batch import riscv_instr_batch
+        exclude_instr = self.get_exclude_instr(is_debug_program)
+        candidates = riscv_instr.get_instr_candidates(tuple(self.allowed_instr),
+                                                      tuple(exclude_instr), (), (), (), ())
+        if len(candidates) == 0:
+            logging.critical("Cannot generate random instruction")
+            sys.exit(1)
+        if cfg.dist_control_mode:
+            category_dist = self.category_dist
+        else:
+            category_dist = {}
+        self.instr_batch = riscv_instr_batch(self, candidates, len(self.instr_list),
+                                             category_dist)
 
     def randomize_instr(self, instr, is_in_debug = 0, disable_dist = 0, include_group = []):
+        exclude_instr = self.get_exclude_instr(is_in_debug)
+        if cfg.dist_control_mode and not disable_dist:
+            category_dist = self.category_dist
+        else:
+            category_dist = {}
+        instr = riscv_instr.get_rand_instr_record(
+            include_instr = self.allowed_instr, exclude_instr = exclude_instr,
+            include_group = include_group, category_dist = category_dist)
+        instr = self.randomize_gpr(instr)
+        return instr
+
+    def get_exclude_instr(self, is_in_debug = 0):
         exclude_instr = []
         is_SP_in_reserved_rd = riscv_reg_t.SP in self.reserved_rd
         is_SP_in_reserved_regs = riscv_reg_t.SP in cfg.reserved_regs
@@ -232,13 +323,66 @@ class riscv_rand_instr_stream(riscv_instr_stream):
             elif (not cfg.no_ebreak and not cfg.enable_ebreak_in_debug_rom):
                 exclude_instr.extend([riscv_instr_name_t.EBREAK.name,
                                       riscv_instr_name_t.C_EBREAK.name])
-        instr = riscv_instr.get_rand_instr(
-            include_instr = self.allowed_instr, exclude_instr = exclude_instr,
-            include_group = include_group)
-        instr = self.randomize_gpr(instr)
-        return instr
+        return exclude_instr
 
+    # Randomize the GPR operands and the immediate of the instruction. Instructions without
+    # extra constraints are sampled directly from the legal register pools of the stream,
+    # the others fall back to the constraint solver. A riscv_instr_record is randomized through
+    # the template of its instruction, the result is then copied to the record.
     def randomize_gpr(self, instr):
+        if not cfg.fast_gpr_randomize or instr.has_extra_constraint():
+            if isinstance(instr, riscv_instr_record):
+                template = instr.desc.template
+                # Start from a new random state, as a new copy of the template would do
+                template.set_randstate(RandState.mk())
+                self.randomize_gpr_with_solver(template)
+                instr.load_operands(template)
+                return instr
+            return self.randomize_gpr_with_solver(instr)
+        rs1_pool, rs2_pool, rd_pool = self.get_instr_gpr_pool(instr)
+        if instr.has_rs1:
+            instr.rs1 = random.choice(rs1_pool)
+        if instr.has_rs2:
+            instr.rs2 = random.choice(rs2_pool)
+        if instr.has_rd:
+            instr.rd = random.choice(rd_pool)
+        if instr.has_imm:
+            imm_rand_mask = instr.get_imm_rand_mask()
+            imm_nonzero_mask = instr.get_imm_nonzero_mask()
+            instr.imm = random.getrandbits(32) & imm_rand_mask
+            while imm_nonzero_mask and not instr.imm & imm_nonzero_mask:
+                instr.imm = random.getrandbits(32) & imm_rand_mask
+        instr.post_randomize()
+        return instr
+
+    # Legal rs1, rs2 and rd registers of the instruction, cached per instruction name.
+    # The CIW/CL/CS/CB/CA formats only use x8-x15 and c.addi16sp only sp, avail_regs may have
+    # none of them: these operands are then sampled from the registers outside avail_regs.
+    def get_instr_gpr_pool(self, instr):
+        if self.gpr_pool is None:
+            self.setup_gpr_pool()
+        pool = self.instr_gpr_pool.get(instr.instr_name)
+        if pool is None:
+            pool = []
+            for operand, has_operand in [("rs1", instr.has_rs1), ("rs2", instr.has_rs2),
+                                         ("rd", instr.has_rd)]:
+                if operand == "rs1" and instr.format == riscv_instr_format_t.CB_FORMAT:
+                    key = "cb_rs1"
+                else:
+                    key = operand
+                regs = instr.get_gpr_pool(operand, self.gpr_pool[key])
+                if has_operand and not regs:
+                    regs = instr.get_gpr_pool(operand, self.unrestricted_gpr_pool[key])
+                if has_operand and not regs:
+                    logging.critical("Cannot randomize the GPR of {}".format(
+                        instr.instr_name.name))
+                    sys.exit(1)
+                pool.append(regs)
+            pool = tuple(pool)
+            self.instr_gpr_pool[instr.instr_name] = pool
+        return pool
+
+    def randomize_gpr_with_solver(self, instr):
         with instr.randomize_with() as it:
             with vsc.if_then(self.avail_regs.size > 0):
                 with vsc.if_then(instr.has_rs1):
@@ -10,6 +10,8 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 
+import sys
+import logging
 import vsc
 from pygen_src.isa.riscv_instr import riscv_instr
 from pygen_src.riscv_instr_pkg import (riscv_pseudo_instr_name_t, riscv_instr_format_t,
@@ -34,14 +36,20 @@ class riscv_pseudo_instr(riscv_instr):
                      riscv_instr_category_t.LOAD, riscv_instr_group_t.RV32I)
     '''
 
-    # Convert the instruction to assembly code
-    def convert2asm(self, prefix = ""):
+    def get_asm_template_key(self):
+        return (riscv_pseudo_instr_name_t, self.pseudo_instr_name)
+
+    # Assembly format of the instruction, see riscv_instr.get_asm_format
+    def get_asm_format(self):
         asm_str = pkg_ins.format_string(self.get_instr_name(), pkg_ins.MAX_INSTR_STR_LEN)
         # instr rd,imm
-        asm_str = "{}{}, {}".format(asm_str, self.rd.name, self.get_imm())
-        if self.comment != "":
-            asm_str = "{} #{}".format(asm_str, self.comment)
-        return asm_str.lower()
+        return asm_str + "{rd}, {imm}", 1
 
     def get_instr_name(self):
         return self.pseudo_instr_name.name
+
+    # The pseudo instructions are expanded by the assembler, they have no binary encoding
+    def convert2bin(self):
+        logging.critical("No binary encoding for pseudo instruction %0s",
+                         self.pseudo_instr_name.name)
+        sys.exit(1)
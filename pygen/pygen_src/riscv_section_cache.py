@@ -0,0 +1,48 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from pygen_src.isa.riscv_instr_list_cache import riscv_instr_list_cache  # NOQA
+
+
+# ---------------------------------------------------------------------------------------------
+# Cache of the boilerplate sections of riscv_asm_program_gen (program header, trap handlers,
+# trap vector init, interrupt handlers, user and kernel stacks). The lines of these sections
+# only depend on the target and on a few configuration fields (mtvec_mode, gpr, scratch_reg,
+# sp/tp, ...), they are keyed by the generator class, the section, its arguments, the target,
+# the values of these fields and a digest of the generator sources and of the core setting
+# (see riscv_asm_program_gen.memoize_section). The sections are only cached with
+# --memoize_sections=1. The entries are kept in memory by the worker and, with
+# --section_cache, in a cache directory shared by the generator processes. The hit/miss counts
+# are reported by:
+#   python3 pygen/pygen_src/riscv_section_cache.py <cache directory>
+# ---------------------------------------------------------------------------------------------
+class riscv_section_cache(riscv_instr_list_cache):
+    version = 1
+    file_prefix = "section"
+    log_file_name = "section_cache.log"
+
+
+def main():
+    parse = argparse.ArgumentParser(description = "Report of a boilerplate section cache")
+    parse.add_argument('path', help = 'Cache directory (--section_cache of the generator)')
+    args = parse.parse_args()
+    if not os.path.isdir(args.path):
+        sys.exit("No cache directory {}".format(args.path))
+    print(riscv_section_cache.report(args.path))
+
+
+if __name__ == "__main__":
+    main()
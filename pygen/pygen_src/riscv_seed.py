@@ -0,0 +1,55 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import random
+import hashlib
+import contextlib
+from pygen_src.isa.riscv_instr import riscv_instr
+
+
+# ---------------------------------------------------------------------------------------------
+# Seed tree of the generation. The seed of a test is derived from --seed and the test index,
+# the seeds of the nodes of a test (harts, programs and data sections of a hart, directed
+# instruction streams, windows and segments of a main program, data pages) are derived from
+# the seed of the test and the path of the node. The seed of a node does not depend on the
+# order the nodes are generated in, nor on the process generating them: a node is generated
+# the same with any number of test, hart or segment workers.
+# ---------------------------------------------------------------------------------------------
+
+# Seed of the node path of the seed tree rooted at seed
+def derive_seed(seed, *path):
+    node = " ".join(str(name) for name in (seed,) + path)
+    return int.from_bytes(hashlib.sha256(node.encode()).digest()[:8], "little")
+
+
+# Seed the random states of the generator with seed: the random module, which also seeds the
+# random states of the new pyvsc objects and the NumPy generators of the batch generation, and
+# the random states of the template instructions (see riscv_instr.seed_templates)
+def seed_generator(seed):
+    random.seed(seed)
+    riscv_instr.seed_templates(derive_seed(seed, "templates"))
+
+
+# Generate the node path of the seed tree rooted at seed: the generator is seeded with the
+# seed of the node, the random state of the random module is restored on exit and the
+# templates are given new random states derived from the ones of the parent node
+@contextlib.contextmanager
+def seed_scope(seed, *path):
+    state = random.getstate()
+    template_seed = riscv_instr.template_seed
+    seed_generator(derive_seed(seed, *path))
+    try:
+        yield
+    finally:
+        random.setstate(state)
+        riscv_instr.seed_templates(None if template_seed is None else
+                                   derive_seed(template_seed, *path))
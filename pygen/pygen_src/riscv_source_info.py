@@ -0,0 +1,51 @@
+"""
+Copyright 2020 Google LLC
+Copyright 2020 PerfectVIPs Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+
+import sys
+import inspect
+from collections import namedtuple
+import vsc.methods
+import vsc.rand_obj
+import vsc.model.source_info
+
+# File name and line number of a frame of the call stack, as read by pyvsc from inspect.stack()
+frame_info = namedtuple("frame_info", ["filename", "lineno"])
+
+
+# Same as inspect.stack() for the file names and line numbers of the frames, the source
+# lines of the frames are not read
+def stack(context = 1):
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        frames.append(frame_info(frame.f_code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    return frames
+
+
+# The inspect module with the stack above, the other attributes are the ones of inspect
+class riscv_inspect_proxy:
+    stack = staticmethod(stack)
+
+    def __getattr__(self, name):
+        return getattr(inspect, name)
+
+
+# pyvsc records the source location of each constraint when the randomized classes are
+# defined, and of each randomized object when it is created, with inspect.stack(). It reads
+# the source lines of all the frames of the call stack and is most of the import time of the
+# generator modules. The inspect module of these pyvsc modules is replaced by a proxy with the
+# stack above, their other uses of inspect are unchanged.
+def patch_vsc_source_info():
+    for module in [vsc.methods, vsc.rand_obj, vsc.model.source_info]:
+        if module.inspect is inspect:
+            module.inspect = riscv_inspect_proxy()
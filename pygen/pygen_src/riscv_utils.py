@@ -13,45 +13,49 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 import sys
 import logging
-import pandas as pd
-from tabulate import tabulate
+from importlib import import_module
 from pygen_src.riscv_instr_gen_config import cfg
-from pygen_src.riscv_directed_instr_lib import (riscv_directed_instr_stream,
-                                                riscv_int_numeric_corner_stream,
-                                                riscv_jal_instr, riscv_mem_access_stream)
-from pygen_src.riscv_amo_instr_lib import (riscv_lr_sc_instr_stream, riscv_amo_instr_stream)
-from pygen_src.riscv_load_store_instr_lib import (riscv_load_store_rand_instr_stream,
-                                                  riscv_load_store_hazard_instr_stream,
-                                                  riscv_load_store_stress_instr_stream,
-                                                  riscv_single_load_store_instr_stream)
 
 
 # ----------------------------------------------------------
 # pyflow commmon utility helpers functions
 # ----------------------------------------------------------
 
-def factory(obj_of):
-    objs = {
-        "riscv_directed_instr_stream": riscv_directed_instr_stream,
-        "riscv_int_numeric_corner_stream": riscv_int_numeric_corner_stream,
-        "riscv_jal_instr": riscv_jal_instr,
-        "riscv_mem_access_stream": riscv_mem_access_stream,
-        "riscv_lr_sc_instr_stream": riscv_lr_sc_instr_stream,
-        "riscv_amo_instr_stream": riscv_amo_instr_stream,
-        "riscv_load_store_rand_instr_stream": riscv_load_store_rand_instr_stream,
-        "riscv_load_store_hazard_instr_stream": riscv_load_store_hazard_instr_stream,
-        "riscv_load_store_stress_instr_stream": riscv_load_store_stress_instr_stream,
-        "riscv_single_load_store_instr_stream": riscv_single_load_store_instr_stream
-    }
+# Whether instr_list is stored in columns. riscv_instr_columns (and NumPy) is only imported
+# when a list is stored in columns (--columnar_instr_list)
+def is_instr_columns(instr_list):
+    module = sys.modules.get("pygen_src.riscv_instr_columns")
+    return module is not None and isinstance(instr_list, module.riscv_instr_columns)
+
+
+# Modules of the directed instruction streams, they are imported when a stream is created
+directed_instr_stream_modules = {
+    "riscv_directed_instr_stream": "riscv_directed_instr_lib",
+    "riscv_int_numeric_corner_stream": "riscv_directed_instr_lib",
+    "riscv_jal_instr": "riscv_directed_instr_lib",
+    "riscv_mem_access_stream": "riscv_directed_instr_lib",
+    "riscv_lr_sc_instr_stream": "riscv_amo_instr_lib",
+    "riscv_amo_instr_stream": "riscv_amo_instr_lib",
+    "riscv_load_store_rand_instr_stream": "riscv_load_store_instr_lib",
+    "riscv_load_store_hazard_instr_stream": "riscv_load_store_instr_lib",
+    "riscv_load_store_stress_instr_stream": "riscv_load_store_instr_lib",
+    "riscv_single_load_store_instr_stream": "riscv_load_store_instr_lib"
+}
 
+
+def factory(obj_of):
     try:
-        return objs[obj_of]()
+        module = import_module("pygen_src." + directed_instr_stream_modules[obj_of])
     except KeyError:
         logging.critical("Cannot Create object of %s", obj_of)
         sys.exit(1)
+    return getattr(module, obj_of)()
 
 
+# pandas and tabulate are only imported when the table is printed (--gen_config_table)
 def gen_config_table():
+    import pandas as pd
+    from tabulate import tabulate
     data = []
     for key, value in cfg.__dict__.items():
         # Ignoring the unneccesary attributes
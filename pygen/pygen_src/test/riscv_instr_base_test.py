@@ -10,10 +10,14 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 
+import os
 import sys
 import logging
 import time
+import random
+import traceback
 import multiprocessing
+from vsc.model.rand_state import RandState
 sys.path.append("pygen/")
 from pygen_src.riscv_instr_pkg import *
 from pygen_src.riscv_instr_gen_config import cfg  # NOQA
@@ -22,6 +26,7 @@ for isa in rcs.supported_isa:
 from pygen_src.isa.riscv_instr import riscv_instr  # NOQA
 from pygen_src.riscv_asm_program_gen import riscv_asm_program_gen  # NOQA
 from pygen_src.riscv_utils import gen_config_table
+from pygen_src.riscv_seed import derive_seed, seed_generator  # NOQA
 
 
 # Base test
@@ -31,22 +36,72 @@ class riscv_instr_base_test:
         self.asm_file_name = cfg.argv.asm_file_name
         self.asm = ""
 
+    # The tests are generated by a pool of worker processes bounded by the number of cores,
+    # a failing test is reported and does not stop the other tests
     def run(self):
-        with multiprocessing.Pool(processes = cfg.num_of_tests) as pool:
-            pool.map(self.run_phase, list(range(cfg.num_of_tests)))
+        num_of_workers = cfg.num_of_workers
+        if num_of_workers <= 0:
+            num_of_workers = (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity")
+                              else os.cpu_count())
+        num_of_workers = min(num_of_workers, cfg.num_of_tests)
+        # A single worker runs in this process
+        pool = None
+        if num_of_workers > 1:
+            pool = multiprocessing.Pool(processes = num_of_workers,
+                                        initializer = self.init_worker)
+            results = pool.imap_unordered(self.run_test, range(cfg.num_of_tests),
+                                          chunksize = max(cfg.gen_chunksize, 1))
+        else:
+            self.init_worker()
+            results = map(self.run_test, range(cfg.num_of_tests))
+        failed_tests = []
+        for done, (num, error) in enumerate(results, 1):
+            if error:
+                failed_tests.append(num + self.start_idx)
+                logging.error("Test {} failed:\n{}".format(num + self.start_idx, error))
+            logging.info("{}/{} tests done, {} failed".format(
+                done, cfg.num_of_tests, len(failed_tests)))
+        if pool:
+            pool.close()
+            pool.join()
+        if failed_tests:
+            logging.critical("Failed tests: {}".format(sorted(failed_tests)))
+            sys.exit(1)
 
+    # The template instructions of the registry are created once per worker. With the cache
+    # directory of the instruction lists, only the ones of the cached lists are created by
+    # create_instr_list.
+    def init_worker(self):
+        if not cfg.instr_list_cache:
+            riscv_instr.create_instr_templates()
+
+    def run_test(self, num):
+        try:
+            self.run_phase(num)
+        except (Exception, SystemExit):
+            return num, traceback.format_exc()
+        return num, ""
+
+    # The random states of the test are seeded from the seed of the test, the test does not
+    # depend on the tests generated before by the worker
     def run_phase(self, num):
+        test_seed = (derive_seed(cfg.seed, num + self.start_idx) if cfg.seed is not None
+                     else random.getrandbits(64))
+        logging.info("Seed of test {}: {}".format(num + self.start_idx, test_seed))
+        seed_generator(test_seed)
+        cfg.set_randstate(RandState.mkFromSeed(test_seed, "cfg"))
         self.randomize_cfg()
         self.asm = riscv_asm_program_gen()
+        self.asm.seed = test_seed
         riscv_instr.create_instr_list(cfg)
+        asm_file_name = self.asm_file_name
         if cfg.asm_test_suffix != "":
-            self.asm_file_name = "{}.{}".format(self.asm_file_name,
-                                                cfg.asm_test_suffix)
+            asm_file_name = "{}.{}".format(asm_file_name, cfg.asm_test_suffix)
         self.asm.get_directed_instr_stream()
-        test_name = "{}_{}.S".format(self.asm_file_name,
-                                     num + self.start_idx)
+        test_name = "{}_{}.S".format(asm_file_name, num + self.start_idx)
         self.apply_directed_instr()
         logging.info("All directed instruction is applied")
+        self.asm.test_name = test_name
         self.asm.gen_program()
         self.asm.gen_test_file(test_name)
         logging.info("TEST GENERATION DONE")
@@ -54,7 +109,8 @@ class riscv_instr_base_test:
     def randomize_cfg(self):
         cfg.randomize()
         logging.info("riscv_instr_gen_config is randomized")
-        gen_config_table()
+        if cfg.gen_config_table:
+            gen_config_table()
 
     def apply_directed_instr(self):
         pass
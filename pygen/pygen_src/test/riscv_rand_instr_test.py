@@ -28,7 +28,8 @@ class riscv_rand_instr_test(riscv_instr_base_test):
         cfg.num_of_sub_program = 5
         cfg.randomize()
         logging.info("riscv_instr_gen_config is randomized")
-        gen_config_table()
+        if cfg.gen_config_table:
+            gen_config_table()
 
     def apply_directed_instr(self):
         # Mix below directed instruction streams with the random instructions
@@ -43,6 +44,7 @@ class riscv_rand_instr_test(riscv_instr_base_test):
 
 start_time = time.time()
 riscv_rand_test_ins = riscv_rand_instr_test()
-riscv_rand_test_ins.run()
-end_time = time.time()
-logging.info("Total execution time: {}s".format(round(end_time - start_time)))
+if cfg.argv.gen_test == "riscv_rand_instr_test":
+    riscv_rand_test_ins.run()
+    end_time = time.time()
+    logging.info("Total execution time: {}s".format(round(end_time - start_time)))
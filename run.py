@@ -17,10 +17,15 @@ Regression script for RISC-V random instruction generator
 """
 
 import argparse
+import json
 import os
 import random
 import re
+import shlex
+import socket
+import subprocess
 import sys
+import time
 import logging
 
 from scripts.lib import *
@@ -239,7 +244,8 @@ def run_csr_test(cmd_list, cwd, csr_file, isa, iterations, lsf_cmd,
 def do_simulate(sim_cmd, simulator, test_list, cwd, sim_opts, seed_gen,
                 csr_file,
                 isa, end_signature_addr, lsf_cmd, timeout_s, log_suffix,
-                batch_size, output_dir, verbose, check_return_code, debug_cmd, target):
+                batch_size, output_dir, verbose, check_return_code, debug_cmd, target,
+                pygen_server=""):
     """Run  the instruction generator
 
     Args:
@@ -260,6 +266,9 @@ def do_simulate(sim_cmd, simulator, test_list, cwd, sim_opts, seed_gen,
       verbose               : Verbose logging
       check_return_code     : Check return code of the command
       debug_cmd             : Produce the debug cmd log without running
+      target                : Predefined target
+      pygen_server          : UNIX socket of the pygen generator server, the pyflow
+                              generation is sent to the server when specified
     """
     cmd_list = []
     sim_cmd = re.sub("<out>", os.path.abspath(output_dir), sim_cmd)
@@ -333,9 +342,13 @@ def do_simulate(sim_cmd, simulator, test_list, cwd, sim_opts, seed_gen,
                         logging.info(
                             "Running {}, batch {}/{}, test_cnt:{}".format(
                                 test['test'], i + 1, batch_cnt, test_cnt))
-                        run_cmd(cmd, timeout_s,
-                                check_return_code=check_return_code,
-                                debug_cmd=debug_cmd)
+                        if pygen_server and not debug_cmd:
+                            pygen_server_gen(pygen_server, cmd, rand_seed,
+                                             timeout_s, check_return_code)
+                        else:
+                            run_cmd(cmd, timeout_s,
+                                    check_return_code=check_return_code,
+                                    debug_cmd=debug_cmd)
     if sim_seed:
         with open(('{}/seed.yaml'.format(os.path.abspath(output_dir))),
                   'w') as outfile:
@@ -380,26 +393,187 @@ def gen(test_list, argv, output_dir, cwd):
     # Run the instruction generator
     if not argv.co:
         seed_gen = SeedGen(argv.start_seed, argv.seed, argv.seed_yaml)
-        do_simulate(sim_cmd, argv.simulator, test_list, cwd, argv.sim_opts,
-                    seed_gen,
-                    argv.csr_yaml, argv.isa, argv.end_signature_addr,
-                    argv.lsf_cmd,
-                    argv.gen_timeout, argv.log_suffix, argv.batch_size,
-                    output_dir,
-                    argv.verbose, check_return_code, argv.debug, argv.target)
+        # The pyflow generation is sent to the generator server, it is started
+        # for this run when its socket does not exist
+        pygen_server = ""
+        server_process = None
+        if argv.simulator == "pyflow" and argv.pygen_server and not argv.lsf_cmd:
+            pygen_server = argv.pygen_server
+            if not argv.debug:
+                server_process = start_pygen_server(pygen_server, argv.target,
+                                                    cwd, output_dir,
+                                                    argv.gen_timeout)
+        try:
+            do_simulate(sim_cmd, argv.simulator, test_list, cwd, argv.sim_opts,
+                        seed_gen,
+                        argv.csr_yaml, argv.isa, argv.end_signature_addr,
+                        argv.lsf_cmd,
+                        argv.gen_timeout, argv.log_suffix, argv.batch_size,
+                        output_dir,
+                        argv.verbose, check_return_code, argv.debug, argv.target,
+                        pygen_server)
+        finally:
+            if server_process:
+                stop_pygen_server(server_process, pygen_server)
+
+
+def start_pygen_server(pygen_server, target, cwd, output_dir, timeout_s):
+    """Start the pygen generator server if its socket does not exist
 
+    Args:
+      pygen_server : UNIX socket of the server
+      target       : Predefined target of the generator
+      cwd          : Filesystem path to RISCV-DV repo
+      output_dir   : Output directory of the server log
+      timeout_s    : Timeout limit of the server start in seconds
 
-def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd):
+    Returns:
+      The server process, None if the server is already running
+    """
+    if os.path.exists(pygen_server):
+        logging.info("Using the pygen generator server {}".format(pygen_server))
+        return None
+    log = "{}/pygen_server.log".format(output_dir)
+    logging.info("Starting the pygen generator server {}, log: {}".format(
+        pygen_server, log))
+    with open(log, "w") as log_file:
+        process = subprocess.Popen(
+            [sys.executable, "{}/pygen/pygen_src/riscv_gen_server.py".format(cwd),
+             "--target={}".format(target), "--socket={}".format(pygen_server)],
+            stdout=log_file, stderr=subprocess.STDOUT)
+    start_time = time.time()
+    while not os.path.exists(pygen_server):
+        if process.poll() is not None or time.time() - start_time > timeout_s:
+            process.kill()
+            logging.error("Cannot start the pygen generator server, see {}".format(
+                log))
+            sys.exit(RET_FAIL)
+        time.sleep(0.1)
+    return process
+
+
+def stop_pygen_server(process, pygen_server):
+    """Stop the pygen generator server started by start_pygen_server
+
+    Args:
+      process      : Server process
+      pygen_server : UNIX socket of the server
+    """
+    process.terminate()
+    process.wait()
+    if os.path.exists(pygen_server):
+        os.remove(pygen_server)
+
+
+def pygen_server_gen(pygen_server, cmd, seed, timeout_s, check_return_code):
+    """Send the pyflow generator command to the pygen generator server
+
+    The test script and its options are taken from the command line, the tests
+    are generated as by running the command.
+
+    Args:
+      pygen_server      : UNIX socket of the server
+      cmd               : pyflow generator command
+      seed              : Seed of the tests
+      timeout_s         : Timeout limit in seconds
+      check_return_code : Exit on a generation failure
+    """
+    tokens = shlex.split(cmd)
+    script = next(i for i, token in enumerate(tokens) if token.endswith(".py"))
+    request = {"script": tokens[script], "argv": tokens[script + 1:],
+               "seed": seed, "cwd": os.getcwd()}
+    logging.debug(cmd)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout_s)
+            client.connect(pygen_server)
+            client.sendall((json.dumps(request) + "\n").encode())
+            response = client.makefile().readline()
+    except socket.timeout:
+        logging.error("Timeout[{}s]: {}".format(timeout_s, cmd))
+        return
+    except OSError as error:
+        logging.error("Cannot reach the pygen generator server {}: {}".format(
+            pygen_server, error))
+        sys.exit(RET_FAIL)
+    result = json.loads(response)
+    if result["status"] != "passed":
+        logging.error("ERROR return code: {}, cmd:{}\n{}".format(
+            result["returncode"], cmd, result["error"]))
+        if check_return_code:
+            sys.exit(RET_FAIL)
+        return
+    logging.info("Generated {} tests in {:.2f}s".format(
+        len(result["asm"]), result["time"]["total"]))
+
+
+def pygen_elf_emit(cmd, asm, elf, binary, cwd):
+    """Assemble and link the program with the in-process ELF emitter of pygen
+
+    The ISA, ABI, include directories and linker script are read from the
+    riscv-gcc command line, the ELF and the plain binary are written directly.
+
+    Args:
+      cmd    : riscv-gcc command line of the program
+      asm    : Assembly program
+      elf    : Output ELF file
+      binary : Output plain binary
+      cwd    : Root directory of riscv-dv
+    """
+    # The emitter is imported when used, the gcc flow does not need pygen
+    if os.path.join(cwd, "pygen") not in sys.path:
+        sys.path.append(os.path.join(cwd, "pygen"))
+    from pygen_src.riscv_elf_emitter import emit_elf
+    opts = cmd.split()
+    isa = [opt[7:] for opt in opts if opt.startswith("-march=")][-1]
+    mabi = [opt[6:] for opt in opts if opt.startswith("-mabi=")][-1]
+    include_dirs = [opt[2:] for opt in opts if opt.startswith("-I")]
+    link_script = [opt[2:] for opt in opts if opt.startswith("-T")][-1]
+    relax = "-mno-relax" not in opts
+    emit_elf(asm, elf, binary, isa, mabi, include_dirs, link_script, relax)
+
+
+def compare_binary(binary, ref_binary):
+    """Compare the plain binary of the ELF emitter with the one of riscv-gcc
+
+    Args:
+      binary     : Plain binary written by the ELF emitter
+      ref_binary : Plain binary converted from the riscv-gcc ELF
+
+    Returns:
+      True if the binaries are the same
+    """
+    with open(binary, "rb") as f:
+        data = f.read()
+    with open(ref_binary, "rb") as f:
+        ref_data = f.read()
+    if data == ref_data:
+        logging.info("{} matches {}".format(binary, ref_binary))
+        return True
+    offset = next((i for i, (a, b) in enumerate(zip(data, ref_data)) if a != b),
+                  min(len(data), len(ref_data)))
+    logging.error("{} ({} bytes) differs from {} ({} bytes) at offset 0x{:x}".format(
+        binary, len(data), ref_binary, len(ref_data), offset))
+    return False
+
+
+def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd,
+                elf_emitter="gcc", elf_emitter_check=False):
     """Use riscv gcc toolchain to compile the assembly program
 
     Args:
-      test_list  : List of assembly programs to be compiled
-      output_dir : Output directory of the ELF files
-      isa        : ISA variant passed to GCC
-      mabi       : MABI variant passed to GCC
-      debug_cmd  : Produce the debug cmd log without running
+      test_list         : List of assembly programs to be compiled
+      output_dir        : Output directory of the ELF files
+      isa               : ISA variant passed to GCC
+      mabi              : MABI variant passed to GCC
+      debug_cmd         : Produce the debug cmd log without running
+      elf_emitter       : gcc, or pygen to write the ELF and the binary in-process
+      elf_emitter_check : Also compile with gcc and compare the binaries of pygen
     """
     cwd = os.path.dirname(os.path.realpath(__file__))
+    # With the pygen ELF emitter, the options are read from the gcc command line and gcc
+    # only runs for the cross-check
+    run_gcc = elf_emitter == "gcc" or elf_emitter_check
     for test in test_list:
         for i in range(0, test['iterations']):
             if 'no_gcc' in test and test['no_gcc'] == 1:
@@ -418,7 +592,8 @@ def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd):
              -nostartfiles {} \
              -I{}/user_extension \
              -T{}/scripts/link.ld {} -o {} ".format(
-                get_env_var("RISCV_GCC", debug_cmd=debug_cmd), asm, cwd,
+                get_env_var("RISCV_GCC", debug_cmd=debug_cmd) if run_gcc else "riscv-gcc",
+                asm, cwd,
                 cwd, opts, elf))
             if 'gcc_opts' in test:
                 cmd += test['gcc_opts']
@@ -432,6 +607,17 @@ def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd):
                 cmd += (" -march={}".format(test_isa))
             if not re.search('mabi', cmd):
                 cmd += (" -mabi={}".format(mabi))
+            if elf_emitter == "pygen":
+                logging.info("Assembling {} with the pygen ELF emitter".format(asm))
+                if not debug_cmd:
+                    pygen_elf_emit(cmd, asm, elf, binary, cwd)
+                if not elf_emitter_check:
+                    continue
+                # Cross-check: compile with gcc to separate files and compare the binaries
+                gcc_elf = prefix + "_gcc.o"
+                gcc_binary = prefix + "_gcc.bin"
+                cmd = cmd.replace(" -o {} ".format(elf), " -o {} ".format(gcc_elf))
+                elf, binary = gcc_elf, gcc_binary
             logging.info("Compiling {}".format(asm))
             run_cmd_output(cmd.split(), debug_cmd=debug_cmd)
             # Convert the ELF to plain binary, used in RTL sim
@@ -439,6 +625,8 @@ def gcc_compile(test_list, output_dir, isa, mabi, opts, debug_cmd):
             cmd = ("{} -O binary {} {}".format(
                 get_env_var("RISCV_OBJCOPY", debug_cmd=debug_cmd), elf, binary))
             run_cmd_output(cmd.split(), debug_cmd=debug_cmd)
+            if elf_emitter == "pygen" and not debug_cmd:
+                compare_binary(prefix + ".bin", binary)
 
 
 def run_assembly(asm_test, iss_yaml, isa, mabi, gcc_opts, iss_opts, output_dir,
@@ -788,6 +976,13 @@ def parse_args(cwd):
                         help="Simulation options for the generator")
     parser.add_argument("--gcc_opts", type=str, default="",
                         help="GCC compile options")
+    parser.add_argument("--elf_emitter", type=str, default="gcc",
+                        choices=["gcc", "pygen"],
+                        help="Tool writing the ELF and the plain binary: gcc "
+                             "(riscv-gcc and objcopy) or pygen (in-process emitter)")
+    parser.add_argument("--elf_emitter_check", action="store_true", default=False,
+                        help="With --elf_emitter=pygen, also compile with riscv-gcc "
+                             "and objcopy and compare the plain binaries")
     parser.add_argument("-s", "--steps", type=str, default="all",
                         help="Run steps: gen,gcc_compile,iss_sim,iss_cmp",
                         dest="steps")
@@ -800,6 +995,13 @@ def parse_args(cwd):
                         help="mabi used for compilation", dest="mabi")
     parser.add_argument("--gen_timeout", type=int, default=360,
                         help="Generator timeout limit in seconds")
+    parser.add_argument("--pygen_server", type=str, default="",
+                        help="UNIX socket of the pygen generator server, the "
+                             "pyflow generation is sent to it. The server is "
+                             "started for this run if the socket does not exist")
+    parser.add_argument("--profile_startup", action="store_true", default=False,
+                        help="Report the import time breakdown of the generator, "
+                             "ISS compare and coverage entry points, then exit")
     parser.add_argument("--end_signature_addr", type=str, default="0",
                         help="Address that privileged CSR test writes to at EOT")
     parser.add_argument("--iss_opts", type=str, default="",
@@ -971,6 +1173,11 @@ def main():
         args = parse_args(cwd)
         setup_logging(args.verbose)
 
+        if args.profile_startup:
+            from scripts.profile_startup import profile_startup
+            print(profile_startup(cwd, args.target))
+            sys.exit(RET_SUCCESS)
+
         # Create output directory
         output_dir = create_output(args.o, args.noclean)
 
@@ -1120,7 +1327,8 @@ def main():
             # Compile the assembly program to ELF, convert to plain binary
             if args.steps == "all" or re.match(".*gcc_compile.*", args.steps):
                 gcc_compile(matched_list, output_dir, args.isa, args.mabi,
-                            args.gcc_opts, args.debug)
+                            args.gcc_opts, args.debug, args.elf_emitter,
+                            args.elf_emitter_check)
 
             # Run ISS simulation
             if args.steps == "all" or re.match(".*iss_sim.*", args.steps):
@@ -0,0 +1,148 @@
+"""
+Copyright 2020 Google LLC
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+     http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Import time breakdown of the generator, ISS compare and coverage entry points
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = ["generator", "iss_compare", "coverage"]
+
+
+def get_entry_point_code(entry_point, target):
+    """Python code importing the modules of an entry point
+
+    Args:
+      entry_point : generator, iss_compare or coverage
+      target      : pygen target
+
+    Returns:
+      code        : Code run with "python3 -c", from the riscv-dv directory
+    """
+    if entry_point == "generator":
+        # pygen test script of the pyflow generation, without generating the tests
+        argv = ["--target={}".format(target), "--gen_test=profile_startup"]
+        modules = ["pygen_src.test.riscv_instr_base_test"]
+    elif entry_point == "iss_compare":
+        # run.py --steps iss_cmp
+        argv = []
+        modules = ["run"]
+    else:
+        # pygen coverage test run by cov.py, it is run when imported
+        argv = ["--target={}".format(target)]
+        modules = ["cov", "pygen_src.riscv_instr_pkg", "pygen_src.isa.riscv_cov_instr",
+                   "pygen_src.riscv_instr_cover_group"]
+    return ("import sys; sys.argv = [sys.argv[0]] + {}; sys.path[:0] = ['.', 'pygen']; "
+            "{}".format(argv, "; ".join("import " + module for module in modules)))
+
+
+def parse_importtime(log):
+    """Parse the "-X importtime" output of a Python process
+
+    Args:
+      log     : stderr of the process
+
+    Returns:
+      modules : List of (self time in us, cumulative time in us, depth, module name)
+    """
+    modules = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return modules
+
+
+def profile_entry_point(entry_point, cwd, target, top=15):
+    """Report the import time breakdown of an entry point
+
+    Args:
+      entry_point : generator, iss_compare or coverage
+      cwd         : riscv-dv directory
+      target      : pygen target
+      top         : Number of modules listed
+
+    Returns:
+      report      : Report text
+    """
+    start_time = time.time()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                              get_entry_point_code(entry_point, target)],
+                             cwd=cwd, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    wall_time = time.time() - start_time
+    modules = parse_importtime(process.stderr)
+    import_time = sum(module[1] for module in modules if module[2] == 0)
+    report = ["{}: {:.3f}s startup, {:.3f}s of imports, {} modules{}".format(
+        entry_point, wall_time, import_time / 1e6, len(modules),
+        "" if process.returncode == 0 else
+        " (exit status {})".format(process.returncode))]
+    report.append("  {:>10} {:>10}  {}".format("self ms", "cumul. ms",
+                                               "top-level imports"))
+    for self_us, cumulative_us, depth, name in sorted(
+            [module for module in modules if module[2] == 0],
+            key=lambda module: -module[1])[:top]:
+        report.append("  {:>10.1f} {:>10.1f}  {}".format(
+            self_us / 1e3, cumulative_us / 1e3, name))
+    report.append("  {:>10} {:>10}  {}".format("self ms", "cumul. ms",
+                                               "slowest modules"))
+    for self_us, cumulative_us, depth, name in sorted(
+            modules, key=lambda module: -module[0])[:top]:
+        report.append("  {:>10.1f} {:>10.1f}  {}".format(
+            self_us / 1e3, cumulative_us / 1e3, name))
+    return "\n".join(report)
+
+
+def profile_startup(cwd, target, entry_points=ENTRY_POINTS, top=15):
+    """Report the import time breakdown of the entry points
+
+    Args:
+      cwd          : riscv-dv directory
+      target       : pygen target
+      entry_points : List of entry points
+      top          : Number of modules listed per entry point
+
+    Returns:
+      report       : Report text
+    """
+    return "\n\n".join(profile_entry_point(entry_point, cwd, target, top)
+                       for entry_point in entry_points)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", type=str, default="rv32imc",
+                        help="pygen target")
+    parser.add_argument("--entry_point", type=str, default=",".join(ENTRY_POINTS),
+                        help="Comma separated entry points: {}".format(
+                            ",".join(ENTRY_POINTS)))
+    parser.add_argument("--top", type=int, default=15,
+                        help="Number of modules listed per entry point")
+    args = parser.parse_args()
+    cwd = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    print(profile_startup(cwd, args.target, args.entry_point.split(","),
+                          args.top))
+
+
+if __name__ == "__main__":
+    main()